@@ -2,211 +2,267 @@ import tkinter as tk
 from tkinter import messagebox
 from datetime import datetime
 import csv
+import gc
 import random
 import string
-
-class User:
-    def __init__(self, username, password, role):
-        self.username = username
-        self.password = password
-        self.role = role
-
-class Patient:
-    def __init__(self, patient_id, gender, race, age, ethnicity, insurance, zip_code):
-        self.patient_id = patient_id
-        self.gender = gender
-        self.race = race
-        self.age = age
-        self.ethnicity = ethnicity
-        self.insurance = insurance
-        self.zip_code = zip_code
-        self.visits = []
-
-    def add_visit(self, visit):
-        self.visits.append(visit)
-
-class Visit:
-    def __init__(self, visit_id, visit_time, department, chief_complaint):
-        self.visit_id = visit_id
-        self.visit_time = visit_time
-        self.department = department
-        self.chief_complaint = chief_complaint
-        self.notes = []
-
-    def add_note(self, note):
-        self.notes.append(note)
-
-class Note:
-    def __init__(self, note_id, note_type):
-        self.note_id = note_id
-        self.note_type = note_type
-
-class Hospital:
-    def __init__(self):
-        self.patients = {}
-
-    def add_patient(self, patient):
-        self.patients[patient.patient_id] = patient
-
-    def remove_patient(self, patient_id):
-        if patient_id in self.patients:
-            del self.patients[patient_id]
-            print("Patient and associated records removed successfully.")
-        else:
-            print("Patient not found.")
-
-    def retrieve_patient(self, patient_id):
-        if patient_id in self.patients:
-            patient = self.patients[patient_id]
-            return patient
-        else:
-            return None
-
-    def count_visits_on_date(self, date):
-        total_visits = 0
-        for patient in self.patients.values():
-            for visit in patient.visits:
-                if visit.visit_time.date() == date.date():
-                    total_visits += 1
-        return total_visits
-
-    def get_patient_count_by_insurance(self):
-        insurance_count = {}
-        for patient in self.patients.values():
-            if patient.insurance not in insurance_count:
-                insurance_count[patient.insurance] = 1
-            else:
-                insurance_count[patient.insurance] += 1
-        return insurance_count
-
-    def get_patient_count_by_demographics(self, attribute):
-        count_by_attribute = {}
-        for patient in self.patients.values():
-            value = getattr(patient, attribute)
-            if value not in count_by_attribute:
-                count_by_attribute[value] = 1
-            else:
-                count_by_attribute[value] += 1
-        return count_by_attribute
-
-    def get_patient_count_by_department(self):
-        department_count = {}
-        for patient in self.patients.values():
-            for visit in patient.visits:
-                department = visit.department
-                if department not in department_count:
-                    department_count[department] = 1
-                else:
-                    department_count[department] += 1
-        return department_count
-
-def read_patient_data(file_path):
+import os
+
+import metrics
+from audit_log import get_audit_logger
+from binary_snapshot import MappedHospital, open_binary_snapshot, source_state, write_binary_snapshot
+from credential_store import get_credential_store
+from hospital_client import DEFAULT_SERVER_URL, RemoteHospital
+from models import Hospital, Note, Patient, User, Visit
+from patient_csv import PATIENT_COLUMNS, iter_patient_batches, iter_patient_columns, parse_column, parse_visit_date
+from patient_journal import PatientJournal, journal_paths, read_journal, write_snapshot
+from sqlite_storage import SQLiteHospital
+from metrics import timed
+from task_runner import TaskRunner
+
+PATIENT_DATA_HEADER = list(PATIENT_COLUMNS)
+# Column position in PATIENT_COLUMNS -> hospital category the values are interned in
+INTERNED_COLUMNS = {PATIENT_COLUMNS.index(column): name for column, name in [
+    ('Gender', 'gender'), ('Race', 'race'), ('Ethnicity', 'ethnicity'), ('Insurance', 'insurance'), ('Zip_code', 'zip_code'),
+    ('Visit_department', 'department'), ('Chief_complaint', 'chief_complaint'), ('Note_type', 'note_type')]}
+
+@timed('read_patient_data')
+def read_patient_data(file_path, progress=None):
     hospital = Hospital()
-    with open(file_path, 'r') as file:
+    with hospital.bulk_load():
         if file_path.lower().endswith('.csv'):
-            reader = csv.DictReader(file)
-            for row in reader:
-                patient_id = row.get('Patient_ID')
-                if patient_id:
-                    gender = row.get('Gender', '')
-                    race = row.get('Race', '')
-                    age = int(row.get('Age', 0))
-                    ethnicity = row.get('Ethnicity', '')
-                    insurance = row.get('Insurance', '')
-                    zip_code = row.get('Zip_code', '')  # Check if Zip_code exists
-                    patient = Patient(patient_id, gender, race, age, ethnicity, insurance, zip_code)
-                    hospital.add_patient(patient)
-                    visit_id = row.get('Visit_ID', '')
-                    visit_time_str = row.get('Visit_time', '')
-                    visit_time = datetime.strptime(visit_time_str, '%Y-%m-%d') if visit_time_str else None
-                    visit_department = row.get('Visit_department', '')
-                    chief_complaint = row.get('Chief_complaint', '')
-                    if visit_id and visit_time and visit_department and chief_complaint:
-                        visit = Visit(visit_id, visit_time, visit_department, chief_complaint)
-                        patient.add_visit(visit)
+            visits = {}
+            for columns in iter_patient_columns(file_path, progress=progress):
+                add_patient_columns(hospital, columns, visits)
+            del visits
+        for record in read_journal(file_path):
+            apply_journal_record(hospital, record)
     return hospital
 
 
-def write_patient_data(file_path, hospital):
-    with open(file_path, 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Patient_ID', 'Gender', 'Race', 'Age', 'Ethnicity', 'Insurance', 'Zip code', 'Visit_ID', 'Visit_time', 'Visit_department', 'Chief_complaint'])
-        for patient in hospital.patients.values():
-            for visit in patient.visits:
-                writer.writerow([patient.patient_id, patient.gender, patient.race, patient.age, patient.ethnicity, patient.insurance, patient.zip_code, visit.visit_id, visit.visit_time.strftime('%Y-%m-%d'), visit.department, visit.chief_complaint])
+@timed('load_patient_data')
+def load_patient_data(file_path, progress=None, previous=None):
+    # The binary snapshot maps in without parsing; rebuild it whenever the CSV or journal moved on.
+    # previous is the hospital this one replaces, which may still have the old snapshot mapped.
+    hospital = open_binary_snapshot(file_path)
+    if hospital is None:
+        state = source_state(file_path)
+        hospital = read_patient_data(file_path, progress=progress)
+        if isinstance(previous, MappedHospital):
+            previous.close()
+        write_binary_snapshot(file_path, hospital, state)
+    return hospital
 
-def generate_key_statistics(hospital):
-    # Generate and display key statistics
-    total_patients = len(hospital.patients)
-    insurance_count = hospital.get_patient_count_by_insurance()
-    gender_count = hospital.get_patient_count_by_demographics('gender')
-    race_count = hospital.get_patient_count_by_demographics('race')
-    ethnicity_count = hospital.get_patient_count_by_demographics('ethnicity')
-    department_count = hospital.get_patient_count_by_department()
 
-    key_stats = f"Total Patients: {total_patients}\n"
-    key_stats += "Patients by Insurance:\n"
-    for insurance, count in insurance_count.items():
-        key_stats += f"{insurance}: {count}\n"
+def add_patient_columns(hospital, columns, visits=None):
+    # One batch from iter_patient_columns. Category columns are interned once per distinct value
+    # rather than per row, so a bulk load can put patients, visits and notes in place directly
+    # instead of going through add_patient, add_visit and add_note to intern them again.
+    # visits maps patient_id -> {visit_id: visit}; pass the same dict for every batch of a load
+    # so repeated visit IDs are found without scanning the patient's visits each time.
+    if visits is None:
+        visits = {}
+    columns = list(columns)
+    for position, name in INTERNED_COLUMNS.items():
+        columns[position] = parse_column(columns[position], hospital.categories[name].intern, '')
+    patients = hospital.patients
+    direct = not hospital.indexing
+    patient = visit = known = None
+    for patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_id, visit_time, visit_department, chief_complaint, note_id, note_type in zip(*columns):
+        if not patient_id:
+            continue
+        # Snapshots hold one row per visit and note, so a repeated ID is another visit or another
+        # note of the same patient; those rows are usually next to each other
+        if patient is None or patient.patient_id != patient_id:
+            patient = patients.get(patient_id)
+            if patient is None:
+                patient = Patient(patient_id, gender, race, age, ethnicity, insurance, zip_code)
+                if direct:
+                    patients[patient_id] = patient
+                    patient.hospital = hospital
+                else:
+                    hospital.add_patient(patient)
+            known = visits.get(patient_id)
+            if known is None:
+                known = visits[patient_id] = {visit.visit_id: visit for visit in patient.visits}
+            visit = None
+        if not (visit_id and visit_time and visit_department and chief_complaint):
+            continue
+        if visit is None or visit.visit_id != visit_id:
+            visit = known.get(visit_id)
+            if visit is None:
+                visit = known[visit_id] = Visit(visit_id, visit_time, visit_department, chief_complaint)
+                if direct:
+                    visit.patient = patient
+                    patient.visits.append(visit)
+                else:
+                    patient.add_visit(visit)
+        if note_id and note_type and visit.find_note(note_id) is None:
+            if direct:
+                visit.notes += (Note(note_id, note_type),)
+            else:
+                visit.add_note(Note(note_id, note_type))
+
+
+def import_patient_data(csv_path, db_path, progress=None):
+    # One-shot CSV (plus any pending journal) to SQLite import; replaces whatever the database held
+    hospital = SQLiteHospital(db_path)
+    with hospital.bulk_load():
+        hospital.clear()
+        for batch in iter_patient_batches(csv_path, progress=progress):
+            hospital.add_patient_rows(batch)
+        for record in read_journal(csv_path):
+            apply_journal_record(hospital, record)
+    return hospital
+
 
-    key_stats += "\nPatients by Gender:\n"
-    for gender, count in gender_count.items():
-        key_stats += f"{gender}: {count}\n"
+def sqlite_path(data_path):
+    return os.path.splitext(data_path)[0] + '.db'
 
-    key_stats += "\nPatients by Race:\n"
-    for race, count in race_count.items():
-        key_stats += f"{race}: {count}\n"
 
-    key_stats += "\nPatients by Ethnicity:\n"
-    for ethnicity, count in ethnicity_count.items():
-        key_stats += f"{ethnicity}: {count}\n"
+def open_hospital(data_path, engine='memory', progress=None):
+    if engine == 'memory':
+        return read_patient_data(data_path, progress=progress)
+    if engine == 'sqlite':
+        db_path = sqlite_path(data_path)
+        if not os.path.exists(db_path):
+            return import_patient_data(data_path, db_path, progress=progress)
+        return SQLiteHospital(db_path, data_path)
+    raise ValueError(f"Unknown storage engine: {engine}")
 
-    key_stats += "\nPatients by Visit Department:\n"
-    for department, count in department_count.items():
-        key_stats += f"{department}: {count}\n"
 
-    return key_stats
+def apply_journal_record(hospital, record):
+    op = record['op']
+    patient_id = record['patient_id']
+    if op == 'add_patient':
+        patient = Patient(patient_id, record['gender'], record['race'], record['age'], record['ethnicity'], record['insurance'], record['zip_code'])
+        hospital.add_patient(patient)
+    elif op == 'add_visit':
+        patient = hospital.retrieve_patient(patient_id)
+        # A segment replayed over a snapshot that already holds it must not duplicate visits
+        if patient and patient.find_visit(record['visit_id']) is None:
+            visit_time = parse_visit_date(record['visit_time'])
+            visit = Visit(record['visit_id'], visit_time, record['department'], record['chief_complaint'])
+            # Records written before notes were journaled have none
+            visit.notes = tuple(Note(note_id, note_type) for note_id, note_type in record.get('notes', ()))
+            patient.add_visit(visit)
+    elif op == 'add_note':
+        patient = hospital.retrieve_patient(patient_id)
+        visit = patient.find_visit(record['visit_id']) if patient else None
+        if visit is not None and visit.find_note(record['note_id']) is None:
+            visit.add_note(Note(record['note_id'], record['note_type']))
+    elif op == 'remove_patient':
+        hospital.discard_patient(patient_id)
+
+
+def write_patient_rows(file, patients):
+    writer = csv.writer(file)
+    writer.writerow(PATIENT_DATA_HEADER)
+    rows = 0
+    for patient in patients:
+        demographics = [patient.patient_id, patient.gender, patient.race, patient.age, patient.ethnicity, patient.insurance, patient.zip_code]
+        if not patient.visits:
+            writer.writerow(demographics + ['', '', '', '', '', ''])
+            rows += 1
+        for visit in patient.visits:
+            visit_fields = demographics + [visit.visit_id, visit.visit_time.strftime('%Y-%m-%d'), visit.department, visit.chief_complaint]
+            if not visit.notes:
+                writer.writerow(visit_fields + ['', ''])
+                rows += 1
+            for note in visit.notes:
+                writer.writerow(visit_fields + [note.note_id, note.note_type])
+                rows += 1
+    metrics.count('csv.rows_written', rows)
+
 
+@timed('write_patient_data')
+def write_patient_data(file_path, hospital):
+    write_snapshot(file_path, list(hospital.patients.values()), write_patient_rows)
+    # The snapshot now holds every journaled change
+    for path in journal_paths(file_path):
+        if os.path.exists(path):
+            open(path, 'w').close()
 
-def add_patient_ui(hospital, patient_id, visit_time, visit_department, chief_complaint):
+@timed('generate_key_statistics')
+def generate_key_statistics(hospital):
+    # Generate and display key statistics; single-dimension counts come straight from the live counters
+    sections = [
+        ("Patients by Insurance", hospital.count_by('insurance', unit='patient')),
+        ("Patients by Gender", hospital.count_by('gender', unit='patient')),
+        ("Patients by Race", hospital.count_by('race', unit='patient')),
+        ("Patients by Ethnicity", hospital.count_by('ethnicity', unit='patient')),
+        ("Patients by Visit Department", hospital.count_by('department')),
+        ("Notes by Type", hospital.get_note_count_by_type()),
+        ("Visits by Year", {start.year: visits for start, visits in hospital.get_visit_trend('year')}),
+    ]
+
+    lines = [f"Total Patients: {len(hospital.patients)}"]
+    for index, (title, counts) in enumerate(sections):
+        if index:
+            lines.append("")
+        lines.append(f"{title}:")
+        lines.extend(f"{value}: {count}" for value, count in counts.items())
+    return "\n".join(lines) + "\n"
+
+
+def new_visit_id():
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+
+def add_patient_ui(hospital, patient_id, visit_time, visit_department, chief_complaint, journal=None, visit_id=None, notes=()):
     if patient_id in hospital.patients:
         # Generate a unique visit ID
-        visit_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        visit_id = visit_id or new_visit_id()
 
-        # Create a new visit instance
+        # Create a new visit instance, with any notes written during it
         visit = Visit(visit_id, datetime.strptime(visit_time, '%Y-%m-%d'), visit_department, chief_complaint)
+        visit.notes = tuple(Note(note_id, note_type) for note_id, note_type in notes)
 
         # Add the visit to the patient's records
         hospital.patients[patient_id].add_visit(visit)
+        if journal:
+            journal.log_add_visit(patient_id, visit)
 
         return "Patient visit added successfully."
     else:
         return "Patient not found."
 
-def remove_patient_ui(hospital, patient_id):
+def add_new_patient(hospital, patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_time, visit_department, chief_complaint, journal=None):
+    # add_patient replaces a patient with the same ID, visits and all, so an existing ID is refused
+    if patient_id in hospital.patients:
+        return "Patient already exists."
+    patient = Patient(patient_id, gender, race, int(age), ethnicity, insurance, zip_code)
+    patient.add_visit(Visit(new_visit_id(), datetime.strptime(visit_time, '%Y-%m-%d'), visit_department, chief_complaint))
+    hospital.add_patient(patient)
+    if journal:
+        journal.log_add_patient(patient)
+    return "Patient added successfully."
+
+def add_note_ui(hospital, patient_id, visit_id, note_id, note_type, journal=None):
+    patient = hospital.retrieve_patient(patient_id)
+    visit = patient.find_visit(visit_id) if patient else None
+    if visit is None:
+        return "Visit not found."
+    if visit.find_note(note_id) is not None:
+        return "Note already exists."
+    note = Note(note_id, note_type)
+    visit.add_note(note)
+    if journal:
+        journal.log_add_note(patient_id, visit_id, note)
+    return "Note added successfully."
+
+def remove_patient_ui(hospital, patient_id, journal=None):
     if patient_id in hospital.patients:
         hospital.remove_patient(patient_id)
+        if journal:
+            journal.log_remove_patient(patient_id)
         return "Patient and associated records removed successfully."
     else:
         return "Patient not found."
 
 def retrieve_patient_ui(hospital, patient_id):
-    patient = hospital.retrieve_patient(patient_id)
-    if patient:
-        patient_info = f"Patient information for ID: {patient_id}\n"
-        patient_info += f"Gender: {patient.gender}\n"
-        patient_info += f"Race: {patient.race}\n"
-        patient_info += f"Age: {patient.age}\n"
-        patient_info += f"Ethnicity: {patient.ethnicity}\n"
-        patient_info += f"Insurance: {patient.insurance}\n"
-        patient_info += f"Zip code: {patient.zip_code}\n"
-        patient_info += "Visits:\n"
-        for visit in patient.visits:
-            patient_info += f"Visit ID: {visit.visit_id}\n"
-            patient_info += f"Visit time: {visit.visit_time.strftime('%Y-%m-%d')}\n"
-            patient_info += f"Department: {visit.department}\n"
-            patient_info += f"Chief complaint: {visit.chief_complaint}\n"
-        return patient_info
+    # Rendered once and cached until the patient's visits change
+    view = hospital.patient_view(patient_id)
+    if view:
+        return view.text()
     else:
         return "Patient not found."
 
@@ -218,13 +274,23 @@ def count_visits_ui(hospital, visit_date):
     except ValueError:
         return "Invalid date format. Please enter date in YYYY-MM-DD format."
 
+def search_visits_ui(hospital, complaint, department, since_date, limit=50):
+    try:
+        start_date = datetime.strptime(since_date, '%Y-%m-%d') if since_date else None
+    except ValueError:
+        return "Invalid date format. Please enter date in YYYY-MM-DD format."
+    visits = hospital.search_visits(complaint, department or None, start_date)
+    result = f"Visits with complaint containing '{complaint}': {len(visits)}\n"
+    for visit in visits[:limit]:
+        result += f"{visit.visit_time.strftime('%Y-%m-%d')} Patient {visit.patient.patient_id}, Visit {visit.visit_id}: {visit.department}, {visit.chief_complaint}\n"
+    if len(visits) > limit:
+        result += f"... and {len(visits) - limit} more\n"
+    return result
+
+@timed('validate_login')
 def validate_login(username, password):
-    # Modify for your own credential validation
-    valid_users = read_users('Project_credentials.csv')
-    for user in valid_users:
-        if user.username == username and user.password == password:
-            return user.role
-    return None
+    # Credentials are cached and only re-read when the file changes
+    return get_credential_store('Project_credentials.csv').authenticate(username, password)
 
 def read_users(file_path):
     users = []
@@ -239,35 +305,104 @@ def read_users(file_path):
     return users
 
 def write_usage_statistics(file_path, username, role, action):
-    with open(file_path, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([username, role, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), action])
+    # Queued and written in batches by a background thread; flushed at exit
+    get_audit_logger(file_path).log(username, role, action)
 
 WINDOW_WIDTH = 1300
 WINDOW_HEIGHT = 700
+VISITS_PER_PAGE = 20
 
-def main():
+def main(storage_engine=None):
+    storage_engine = storage_engine or os.environ.get('CDW_STORAGE_ENGINE', 'memory')
+    metrics.configure_from_environment()
     root = tk.Tk()
     root.title("Clinical Data Warehouse")
     root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
 
     hospital = None
+    journal = None
     current_user_role = None
+    # With the remote engine the patient data lives in hospital_server.py and this window is a thin client
+    remote = RemoteHospital(os.environ.get('CDW_SERVER_URL', DEFAULT_SERVER_URL)) if storage_engine == 'remote' else None
+    # Parsing, hashing, statistics and disk writes run here; the Tk thread only shows results
+    runner = TaskRunner(root)
+    loading_task = None
+
+    def show_error(error):
+        messagebox.showerror("Error", str(error))
+
+    def log_usage(username, role, action):
+        # The server records what a thin client does, so only local sessions write here
+        if not remote:
+            write_usage_statistics('usage_statistics.csv', username, role, action)
 
     def login():
-        nonlocal hospital, current_user_role
         username = username_entry.get()
         password = password_entry.get()
-        role = validate_login(username, password)
+        login_button.config(state=tk.DISABLED)
+        runner.submit(remote.login if remote else validate_login, username, password, on_done=lambda role: finish_login(username, role), on_error=login_failed)
+
+    def login_failed(error):
+        login_button.config(state=tk.NORMAL)
+        show_error(error)
+
+    def finish_login(username, role):
+        nonlocal current_user_role, loading_task
         if role:
             messagebox.showinfo("Login Successful", f"Welcome, {role}!")
             current_user_role = role
-            hospital = read_patient_data('Project_patient_information.csv')
-            show_menu()
-            write_usage_statistics('usage_statistics.csv', username, role, 'Login')
+            status_label.config(text="Loading patient data...")
+            cancel_button.grid(row=4, column=0, columnspan=2, padx=10, pady=10)
+            loading_task = runner.submit(load_hospital, on_done=lambda loaded: finish_loading(username, role, loaded),
+                                         on_error=loading_failed, on_progress=show_loading_progress, access='write', with_task=True)
         else:
+            login_button.config(state=tk.NORMAL)
             messagebox.showerror("Login Failed", "Invalid username or password")
-            write_usage_statistics('usage_statistics.csv', username, 'Unknown', 'Failed Login Attempt')
+            log_usage(username, 'Unknown', 'Failed Login Attempt')
+
+    def load_hospital(task):
+        if remote:
+            return remote, None
+        if storage_engine != 'memory':
+            return open_hospital('Project_patient_information.csv', storage_engine, progress=task.report_progress), None
+        # A collection holds the GIL and so stalls the Tk thread. Loading only allocates, and the
+        # census lives for the session, so skip collection while loading and then freeze it.
+        gc.disable()
+        try:
+            loaded = load_patient_data('Project_patient_information.csv', progress=task.report_progress, previous=hospital)
+            gc.freeze()
+        finally:
+            gc.enable()
+        return loaded, PatientJournal('Project_patient_information.csv', loaded, write_patient_rows)
+
+    def show_loading_progress(rows, bytes_read, total_bytes):
+        status_label.config(text=f"Loading patient data... {rows} rows ({bytes_read * 100 // max(total_bytes, 1)}%)")
+
+    def cancel_loading():
+        if loading_task:
+            loading_task.cancel()
+        loading_failed("Loading cancelled.")
+
+    def loading_failed(error):
+        status_label.config(text=str(error))
+        cancel_button.grid_remove()
+        login_button.config(state=tk.NORMAL)
+
+    def finish_loading(username, role, loaded):
+        nonlocal hospital, journal
+        if journal:
+            journal.close()
+        if isinstance(hospital, Hospital):
+            # The old census is frozen out of GC; dropping the patients lets refcounting free it
+            hospital.patients.clear()
+        elif isinstance(hospital, MappedHospital) and hospital is not loaded[0]:
+            hospital.close()
+        hospital, journal = loaded
+        status_label.config(text="")
+        cancel_button.grid_remove()
+        login_button.config(state=tk.NORMAL)
+        show_menu()
+        log_usage(username, role, 'Login')
 
     def show_menu():
         menu_window = tk.Toplevel(root)
@@ -290,6 +425,9 @@ def main():
             count_visits_button = tk.Button(menu_window, text="Count Visits", command=count_visits)
             count_visits_button.pack(pady=10)
 
+            search_visits_button = tk.Button(menu_window, text="Search Visits", command=search_visits)
+            search_visits_button.pack(pady=10)
+
         elif current_user_role == "admin":
             count_visits_button = tk.Button(menu_window, text="Count Visits", command=count_visits)
             count_visits_button.pack(pady=10)
@@ -302,12 +440,18 @@ def main():
 
     def generate_key_stats():
         if current_user_role in ["admin", "management"]:
-            stats = generate_key_statistics(hospital)
-            messagebox.showinfo("Key Statistics", stats)
-            write_usage_statistics('usage_statistics.csv', username_entry.get(), current_user_role, 'Generate Key Statistics')
+            if remote:
+                # Only the /statistics route logs the action on the server
+                runner.submit(remote.key_statistics, on_done=show_key_stats, on_error=show_error)
+            else:
+                runner.submit(generate_key_statistics, hospital, on_done=show_key_stats, on_error=show_error, access='read')
         else:
             messagebox.showerror("Unauthorized", "You are not authorized to view key statistics.")
 
+    def show_key_stats(stats):
+        messagebox.showinfo("Key Statistics", stats)
+        log_usage(username_entry.get(), current_user_role, 'Generate Key Statistics')
+
     def add_patient():
         add_patient_window = tk.Toplevel(root)
         add_patient_window.title("Add Patient")
@@ -323,7 +467,12 @@ def main():
         check_patient_button.grid(row=1, column=0, columnspan=2, padx=10, pady=10)
 
     def check_patient(patient_id, window):
-        if patient_id in hospital.patients:
+        # A thin client asks the server, so the lookup stays off the Tk thread
+        runner.submit(hospital.patients.__contains__, patient_id,
+                      on_done=lambda exists: patient_checked(patient_id, exists, window), on_error=show_error, access='read')
+
+    def patient_checked(patient_id, exists, window):
+        if exists:
             visit_time_window = tk.Toplevel(window)
             visit_time_window.title("Enter Visit Time")
             visit_time_window.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
@@ -414,21 +563,23 @@ def main():
         add_patient_button.grid(row=9, column=0, columnspan=2, padx=10, pady=10)
 
     def add_patient_with_details(patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_time, visit_department, chief_complaint, window):
-        patient = Patient(patient_id, gender, race, int(age), ethnicity, insurance, zip_code)
-        hospital.add_patient(patient)
-        add_patient_ui(hospital, patient_id, visit_time, visit_department, chief_complaint)
-        messagebox.showinfo("Patient Added", "Patient added successfully.")
+        runner.submit(add_new_patient, hospital, patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_time, visit_department, chief_complaint, journal,
+                      on_done=lambda result: patient_added(result, window), on_error=show_error, access='write')
+
+    def patient_added(result, window):
+        messagebox.showinfo("Patient Added", result)
         window.destroy()
-        write_patient_data('Project_patient_information.csv', hospital)
-        write_usage_statistics('usage_statistics.csv', username_entry.get(), current_user_role, 'Add Patient')
+        log_usage(username_entry.get(), current_user_role, 'Add Patient')
         show_menu()  # Return to menu after action
 
     def add_visit(patient_id, visit_time, visit_department, chief_complaint, window):
-        result = add_patient_ui(hospital, patient_id, visit_time, visit_department, chief_complaint)
+        runner.submit(add_patient_ui, hospital, patient_id, visit_time, visit_department, chief_complaint, journal,
+                      on_done=lambda result: visit_added(result, window), on_error=show_error, access='write')
+
+    def visit_added(result, window):
         messagebox.showinfo("Add Visit", result)
         window.destroy()
-        write_patient_data('Project_patient_information.csv', hospital)
-        write_usage_statistics('usage_statistics.csv', username_entry.get(), current_user_role, 'Add Visit')
+        log_usage(username_entry.get(), current_user_role, 'Add Visit')
         show_menu()  # Return to menu after action
 
     def remove_patient():
@@ -446,11 +597,13 @@ def main():
         remove_button.pack(pady=10)
 
     def remove(patient_id, window):
-        result = remove_patient_ui(hospital, patient_id)
+        runner.submit(remove_patient_ui, hospital, patient_id, journal,
+                      on_done=lambda result: patient_removed(result, window), on_error=show_error, access='write')
+
+    def patient_removed(result, window):
         messagebox.showinfo("Remove Patient", result)
         window.destroy()
-        write_patient_data('Project_patient_information.csv', hospital)
-        write_usage_statistics('usage_statistics.csv', username_entry.get(), current_user_role, 'Remove Patient')
+        log_usage(username_entry.get(), current_user_role, 'Remove Patient')
         show_menu()  # Return to menu after action
 
     def retrieve_patient():
@@ -468,10 +621,87 @@ def main():
         retrieve_button.pack(pady=10)
 
     def retrieve(patient_id, window):
-        result = retrieve_patient_ui(hospital, patient_id)
-        messagebox.showinfo("Retrieve Patient", result)
+        runner.submit(hospital.patient_view, patient_id,
+                      on_done=lambda view: patient_retrieved(view, window), on_error=show_error, access='read')
+
+    def patient_retrieved(view, window):
+        window.destroy()
+        log_usage(username_entry.get(), current_user_role, 'Retrieve Patient')
+        if view is None:
+            messagebox.showinfo("Retrieve Patient", "Patient not found.")
+            show_menu()  # Return to menu after action
+            return
+        show_patient_view(view)
+
+    def show_patient_view(view):
+        # Only the visits on the current page are rendered, however long the history is
+        view_window = tk.Toplevel(root)
+        view_window.title("Retrieve Patient")
+        view_window.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+
+        header_label = tk.Label(view_window, text=view.header, justify=tk.LEFT)
+        header_label.pack(pady=10)
+
+        visits_text = tk.Text(view_window, height=25, width=100)
+        visits_text.pack(pady=5)
+
+        page_frame = tk.Frame(view_window)
+        page_frame.pack(pady=5)
+
+        previous_button = tk.Button(page_frame, text="Previous", command=lambda: show_page(current_page[0] - VISITS_PER_PAGE))
+        previous_button.grid(row=0, column=0, padx=10)
+
+        page_label = tk.Label(page_frame, text="")
+        page_label.grid(row=0, column=1, padx=10)
+
+        next_button = tk.Button(page_frame, text="Next", command=lambda: show_page(current_page[0] + VISITS_PER_PAGE))
+        next_button.grid(row=0, column=2, padx=10)
+
+        page_tasks = []
+
+        close_button = tk.Button(view_window, text="Close", command=lambda: close_patient_view(view_window, page_tasks))
+        close_button.pack(pady=10)
+
+        current_page = [0]
+
+        def show_page(start):
+            start = max(0, min(start, (max(len(view), 1) - 1) // VISITS_PER_PAGE * VISITS_PER_PAGE))
+            # Only the newest page request is rendered
+            while page_tasks:
+                page_tasks.pop().cancel()
+            page_tasks.append(runner.submit(view.page, start, VISITS_PER_PAGE,
+                                            on_done=lambda text: page_rendered(start, text), on_error=show_error, access='read'))
+
+        def page_rendered(start, text):
+            if not view_window.winfo_exists():
+                return  # closed while the page was being rendered
+            current_page[0] = start
+            visits_text.config(state=tk.NORMAL)
+            visits_text.delete("1.0", tk.END)
+            visits_text.insert(tk.END, text or "No visits.\n")
+            visits_text.config(state=tk.DISABLED)
+            last = min(start + VISITS_PER_PAGE, len(view))
+            page_label.config(text=f"Visits {start + 1 if last else 0}-{last} of {len(view)}")
+            previous_button.config(state=tk.NORMAL if start > 0 else tk.DISABLED)
+            next_button.config(state=tk.NORMAL if last < len(view) else tk.DISABLED)
+
+        def scroll(event):
+            # Wheel past either end of the page turns it
+            down = getattr(event, 'num', None) == 5 or getattr(event, 'delta', 0) < 0
+            top, bottom = visits_text.yview()
+            if down and bottom >= 1.0:
+                show_page(current_page[0] + VISITS_PER_PAGE)
+            elif not down and top <= 0.0 and current_page[0] > 0:
+                show_page(current_page[0] - VISITS_PER_PAGE)
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            visits_text.bind(sequence, scroll, add="+")
+        show_page(0)
+
+    def close_patient_view(window, page_tasks):
+        while page_tasks:
+            page_tasks.pop().cancel()
         window.destroy()
-        write_usage_statistics('usage_statistics.csv', username_entry.get(), current_user_role, 'Retrieve Patient')
         show_menu()  # Return to menu after action
 
     def count_visits():
@@ -489,10 +719,80 @@ def main():
         count_button.pack(pady=10)
 
     def count(visit_date, window):
-        result = count_visits_ui(hospital, visit_date)
+        runner.submit(count_visits_ui, hospital, visit_date,
+                      on_done=lambda result: visits_counted(result, window), on_error=show_error, access='read')
+
+    def visits_counted(result, window):
         messagebox.showinfo("Count Visits", result)
         window.destroy()
-        write_usage_statistics('usage_statistics.csv', username_entry.get(), current_user_role, 'Count Visits')
+        log_usage(username_entry.get(), current_user_role, 'Count Visits')
+        show_menu()  # Return to menu after action
+
+    def search_visits():
+        search_visits_window = tk.Toplevel(root)
+        search_visits_window.title("Search Visits")
+        search_visits_window.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+
+        complaint_label = tk.Label(search_visits_window, text="Chief Complaint:")
+        complaint_label.pack(pady=5)
+
+        complaint_entry = tk.Entry(search_visits_window)
+        complaint_entry.pack(pady=5)
+
+        suggestions_listbox = tk.Listbox(search_visits_window, height=4)
+        suggestions_listbox.pack(pady=5)
+
+        department_label = tk.Label(search_visits_window, text="Department (optional):")
+        department_label.pack(pady=5)
+
+        department_entry = tk.Entry(search_visits_window)
+        department_entry.pack(pady=5)
+
+        since_label = tk.Label(search_visits_window, text="Since (YYYY-MM-DD, optional):")
+        since_label.pack(pady=5)
+
+        since_entry = tk.Entry(search_visits_window)
+        since_entry.pack(pady=5)
+
+        pending = []
+
+        search_button = tk.Button(search_visits_window, text="Search", command=lambda: search(complaint_entry.get(), department_entry.get(), since_entry.get(), search_visits_window, pending))
+        search_button.pack(pady=10)
+
+        def suggest(event):
+            # Only the newest keystroke's suggestions are shown
+            while pending:
+                pending.pop().cancel()
+            pending.append(runner.submit(hospital.suggest_complaints, complaint_entry.get(),
+                                         on_done=show_suggestions, on_error=show_error, access='read'))
+
+        def show_suggestions(suggestions):
+            if not search_visits_window.winfo_exists():
+                return  # closed while the suggestions were being found
+            suggestions_listbox.delete(0, tk.END)
+            for suggestion in suggestions:
+                suggestions_listbox.insert(tk.END, suggestion)
+
+        def choose_suggestion(event):
+            selection = suggestions_listbox.curselection()
+            if selection:
+                complaint_entry.delete(0, tk.END)
+                complaint_entry.insert(0, suggestions_listbox.get(selection[0]))
+
+        complaint_entry.bind("<KeyRelease>", suggest)
+        suggestions_listbox.bind("<<ListboxSelect>>", choose_suggestion)
+
+    def search(complaint, department, since_date, window, pending):
+        runner.submit(search_visits_ui, hospital, complaint, department, since_date,
+                      on_done=lambda result: visits_found(result, window, pending), on_error=show_error, access='read')
+
+    def visits_found(result, window, pending):
+        messagebox.showinfo("Search Visits", result)
+        # A suggestion still on its way would land in the destroyed listbox
+        while pending:
+            pending.pop().cancel()
+        window.destroy()
+        log_usage(username_entry.get(), current_user_role, 'Search Visits')
         show_menu()  # Return to menu after action
 
     login_frame = tk.Frame(root)
@@ -513,7 +813,15 @@ def main():
     login_button = tk.Button(login_frame, text="Login", command=login)
     login_button.grid(row=2, column=0, columnspan=2, padx=10, pady=10)
 
+    status_label = tk.Label(login_frame, text="")
+    status_label.grid(row=3, column=0, columnspan=2, padx=10, pady=10)
+
+    cancel_button = tk.Button(login_frame, text="Cancel", command=cancel_loading)
+
     root.mainloop()
+    runner.shutdown()
+    if journal:
+        journal.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+from datetime import date
+
+from columnar_store import PATIENT_CATEGORIES
+
+try:
+    import numpy as np
+except ImportError:  # The pure Python path below gives the same answers, just slower
+    np = None
+
+VISIT_DIMENSIONS = ('department', 'year', 'month', 'day', 'weekday')
+PATIENT_DIMENSIONS = PATIENT_CATEGORIES + ('age_band',)
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+AGE_BAND_WIDTH = 10
+# Above this many possible groups, counting sorts the keys instead of allocating a bincount table
+MAX_BINCOUNT_GROUPS = 1 << 24
+
+
+def age_band(age):
+    low = age // AGE_BAND_WIDTH * AGE_BAND_WIDTH
+    return f'{low}-{low + AGE_BAND_WIDTH - 1}'
+
+
+def month_label(ordinal):
+    day = date.fromordinal(ordinal)
+    return f'{day.year}-{day.month:02d}'
+
+
+class AnalyticsEngine:
+    # Group-by counts over hospital.columns; hospital.statistics answers the single-dimension cases
+    def __init__(self, hospital):
+        self.hospital = hospital
+
+    def count(self, group_by, unit='visit', where=None, start_date=None, end_date=None):
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        group_by = tuple(group_by)
+        where = where or {}
+        for name in group_by + tuple(where):
+            if name not in VISIT_DIMENSIONS and name not in PATIENT_DIMENSIONS:
+                raise ValueError(f"Unknown dimension: {name}")
+        if unit not in ('visit', 'patient'):
+            raise ValueError(f"Unknown unit: {unit}")
+
+        counts = self.count_from_statistics(group_by, unit, where, start_date, end_date)
+        if counts is not None:
+            return counts
+        visit_level = unit == 'visit' or start_date is not None or end_date is not None or any(
+            name in VISIT_DIMENSIONS for name in group_by + tuple(where))
+        if np is not None:
+            counts = self.numpy_count(group_by, unit, where, start_date, end_date, visit_level)
+        else:
+            counts = self.python_count(group_by, unit, where, start_date, end_date, visit_level)
+        if len(group_by) == 1:
+            return {key[0]: count for key, count in counts.items()}
+        return counts
+
+    def count_from_statistics(self, group_by, unit, where, start_date, end_date):
+        statistics = self.hospital.statistics
+        if len(group_by) != 1 or where or start_date is not None or end_date is not None or not self.hospital.indexing:
+            return None
+        name = group_by[0]
+        if unit == 'patient' and statistics.tracks(name):
+            return statistics.patient_count_by(name)
+        if unit == 'visit' and name == 'department':
+            return statistics.visit_count_by_department()
+        return None
+
+    def numpy_count(self, group_by, unit, where, start_date, end_date, visit_level):
+        columns = self.hospital.columns
+        alive = np.frombuffer(bytes(columns.patient_alive), dtype=np.uint8).astype(bool)
+        if visit_level:
+            patient = np.frombuffer(columns.visit_patient, dtype=np.int32)
+            day = np.frombuffer(columns.visit_day, dtype=np.int32)
+            mask = alive[patient]
+            if start_date is not None:
+                mask &= day >= start_date.toordinal()
+            if end_date is not None:
+                mask &= day <= end_date.toordinal()
+        else:
+            patient = np.arange(len(alive))
+            day = None
+            mask = alive
+        if not mask.any():
+            return {}
+
+        dimensions = {name: self.numpy_dimension(name, patient, day) for name in set(group_by) | set(where)}
+        for name, wanted in where.items():
+            codes, cardinality, decode = dimensions[name]
+            wanted = set(wanted) if isinstance(wanted, (list, tuple, set, frozenset)) else {wanted}
+            allowed = np.array([decode(code) in wanted for code in range(cardinality)], dtype=bool)
+            mask &= allowed[codes]
+
+        key = np.zeros(int(mask.sum()), dtype=np.int64)
+        groups = 1
+        for name in group_by:
+            codes, cardinality, decode = dimensions[name]
+            key = key * cardinality + codes[mask]
+            groups *= cardinality
+        if unit == 'patient' and visit_level:
+            # Distinct (group, patient) pairs, so a patient with many visits counts once per group
+            pairs = np.unique(key * len(alive) + patient[mask])
+            key = pairs // len(alive)
+
+        if groups <= MAX_BINCOUNT_GROUPS:
+            totals = np.bincount(key, minlength=groups)
+            keys = np.nonzero(totals)[0]
+            totals = totals[keys]
+        else:
+            keys, totals = np.unique(key, return_counts=True)
+
+        counts = {}
+        for combined, total in zip(keys.tolist(), totals.tolist()):
+            labels = []
+            for name in reversed(group_by):
+                codes, cardinality, decode = dimensions[name]
+                combined, code = divmod(combined, cardinality)
+                labels.append(decode(code))
+            counts[tuple(reversed(labels))] = total
+        return counts
+
+    def numpy_dimension(self, name, patient, day):
+        # Returns (codes per row, number of codes, code -> label)
+        columns = self.hospital.columns
+        if name in PATIENT_CATEGORIES:
+            dictionary = columns.dictionaries[name]
+            codes = np.frombuffer(columns.patient_columns[name], dtype=np.int32)[patient]
+            return codes, max(len(dictionary), 1), dictionary.decode
+        if name == 'age_band':
+            codes = np.frombuffer(columns.patient_age, dtype=np.int32)[patient] // AGE_BAND_WIDTH
+            codes = np.clip(codes, 0, None)
+            return codes, int(codes.max()) + 1 if len(codes) else 1, lambda code: age_band(code * AGE_BAND_WIDTH)
+        if name == 'department':
+            dictionary = columns.dictionaries['department']
+            return np.frombuffer(columns.visit_department, dtype=np.int32), max(len(dictionary), 1), dictionary.decode
+        first = int(day.min()) if len(day) else 1
+        last = int(day.max()) if len(day) else 1
+        if name == 'day':
+            return day - first, last - first + 1, lambda code: date.fromordinal(first + code)
+        if name == 'weekday':
+            return (day - 1) % 7, 7, WEEKDAYS.__getitem__
+        first_date = date.fromordinal(first)
+        # Lookup tables over the day range turn ordinals into years or months without per-row Python
+        offsets = np.arange(first, last + 1)
+        if name == 'year':
+            years = np.array([date.fromordinal(int(ordinal)).year for ordinal in offsets], dtype=np.int32)
+            return years[day - first] - first_date.year, int(years[-1]) - first_date.year + 1, lambda code: first_date.year + code
+        months = np.array([(lambda d: d.year * 12 + d.month - 1)(date.fromordinal(int(ordinal))) for ordinal in offsets], dtype=np.int32)
+        first_month = int(months[0])
+        return months[day - first] - first_month, int(months[-1]) - first_month + 1, lambda code: f'{(first_month + code) // 12}-{(first_month + code) % 12 + 1:02d}'
+
+    def python_count(self, group_by, unit, where, start_date, end_date, visit_level):
+        columns = self.hospital.columns
+        alive = columns.patient_alive
+        wanted = {name: set(value) if isinstance(value, (list, tuple, set, frozenset)) else {value} for name, value in where.items()}
+        start = start_date.toordinal() if start_date is not None else None
+        end = end_date.toordinal() if end_date is not None else None
+
+        def label(name, patient, day, department):
+            if name in PATIENT_CATEGORIES:
+                return columns.dictionaries[name].decode(columns.patient_columns[name][patient])
+            if name == 'age_band':
+                return age_band(columns.patient_age[patient])
+            if name == 'department':
+                return columns.dictionaries['department'].decode(department)
+            if name == 'year':
+                return date.fromordinal(day).year
+            if name == 'month':
+                return month_label(day)
+            if name == 'day':
+                return date.fromordinal(day)
+            return WEEKDAYS[(day - 1) % 7]
+
+        if visit_level:
+            rows = zip(columns.visit_patient, columns.visit_day, columns.visit_department)
+        else:
+            rows = ((patient, None, None) for patient in range(len(alive)))
+        counts = {}
+        seen = set()
+        for patient, day, department in rows:
+            if not alive[patient]:
+                continue
+            if start is not None and day < start or end is not None and day > end:
+                continue
+            if any(label(name, patient, day, department) not in values for name, values in wanted.items()):
+                continue
+            key = tuple(label(name, patient, day, department) for name in group_by)
+            if unit == 'patient' and visit_level:
+                if (key, patient) in seen:
+                    continue
+                seen.add((key, patient))
+            counts[key] = counts.get(key, 0) + 1
+        return counts
@@ -0,0 +1,175 @@
+import atexit
+import csv
+import gzip
+import io
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+OVERFLOW_POLICIES = ('block', 'drop')
+
+
+class FileLock:
+    # Advisory lock on a side file, so it still works after the log itself is rotated away
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+
+
+class AuditLogger:
+    def __init__(self, file_path, batch_size=1000, flush_interval=1.0, max_queue=100_000, overflow='block',
+                 max_bytes=10 * 2 ** 20, backup_count=5, compress=False):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.lock = FileLock(file_path + '.lock')
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        self.stamp = (None, '')
+        self.thread = threading.Thread(target=self.run, name='audit-log', daemon=True)
+        self.thread.start()
+
+    def log(self, username, role, action):
+        row = (username, role, self.timestamp(), action)
+        if self.overflow == 'block':
+            self.queue.put(row)
+            return True
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def timestamp(self):
+        # Formatting dominates the cost of log(); bursts reuse the string for the current second
+        second = int(time.time())
+        stamp_second, stamp = self.stamp
+        if second != stamp_second:
+            stamp = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+            self.stamp = (second, stamp)
+        return stamp
+
+    def run(self):
+        batch = []
+        deadline = None
+        stop = False
+        while not stop:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                row = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                row = ()
+            if row is None:
+                stop = True
+            elif row:
+                batch.append(row)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (stop or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                try:
+                    self.write_batch(batch)
+                except OSError as error:
+                    print(f"Could not write audit log {self.file_path}: {error}")
+                for _ in batch:
+                    self.queue.task_done()
+                batch = []
+                deadline = None
+            if row is None:
+                self.queue.task_done()
+
+    def write_batch(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        data = buffer.getvalue().encode()
+        with self.lock:
+            # One O_APPEND write per batch, so rows from other processes never interleave mid-line
+            fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if self.max_bytes and size >= self.max_bytes:
+                self.rotate()
+
+    def segment_path(self, index):
+        return f'{self.file_path}.{index}' + ('.gz' if self.compress else '')
+
+    def rotate(self):
+        # Caller holds the file lock
+        if self.backup_count <= 0:
+            os.remove(self.file_path)
+            return
+        oldest = self.segment_path(self.backup_count)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(self.segment_path(index)):
+                os.replace(self.segment_path(index), self.segment_path(index + 1))
+        if self.compress:
+            with open(self.file_path, 'rb') as source, gzip.open(self.segment_path(1), 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(self.file_path)
+        else:
+            os.replace(self.file_path, self.segment_path(1))
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def get_audit_logger(file_path):
+    with _loggers_lock:
+        logger = _loggers.get(file_path)
+        if logger is None:
+            logger = _loggers[file_path] = AuditLogger(file_path)
+        return logger
+
+
+@atexit.register
+def close_audit_loggers():
+    with _loggers_lock:
+        loggers = list(_loggers.values())
+    for logger in loggers:
+        logger.close()
@@ -0,0 +1,56 @@
+import argparse
+import random
+import time
+from array import array
+from datetime import datetime
+
+import bench_utils
+from bench_utils import FIRST_DAY
+
+from Keerthi_Project import Hospital
+
+QUERIES = [
+    ('department x insurance', dict(group_by=('department', 'insurance'))),
+    ('age band x race (patients)', dict(group_by=('age_band', 'race'), unit='patient')),
+    ('visits per month per department', dict(group_by=('month', 'department'))),
+    ('Medicare ED visits by year, 2005-2015', dict(group_by=('year',), where={'insurance': 'Medicare', 'department': 'Emergency department'},
+                                                  start_date=datetime(2005, 1, 1), end_date=datetime(2015, 12, 31))),
+]
+
+
+def make_columns(hospital, visits, visits_per_patient=5, seed=0):
+    # Fill the column store directly: 5M Visit objects would dwarf the query being measured
+    rng = random.Random(seed)
+    columns = hospital.columns
+    patients = visits // visits_per_patient
+    for name, values in [('gender', bench_utils.GENDERS), ('race', bench_utils.RACES),
+                         ('ethnicity', bench_utils.ETHNICITIES), ('insurance', bench_utils.INSURANCES)]:
+        for value in values:
+            columns.dictionaries[name].encode(value)
+        columns.patient_columns[name] = array('i', [rng.randrange(len(values)) for _ in range(patients)])
+    for department in bench_utils.DEPARTMENTS:
+        columns.dictionaries['department'].encode(department)
+    columns.patient_age = array('i', [rng.randint(0, 100) for _ in range(patients)])
+    columns.patient_alive = bytearray(b'\x01') * patients
+    first = FIRST_DAY.toordinal()
+    columns.visit_patient = array('i', [i // visits_per_patient for i in range(patients * visits_per_patient)])
+    columns.visit_day = array('i', [first + rng.randrange(365 * 20) for _ in range(len(columns.visit_patient))])
+    columns.visit_department = array('i', [rng.randrange(len(bench_utils.DEPARTMENTS)) for _ in range(len(columns.visit_patient))])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, default=5_000_000)
+    args = parser.parse_args()
+    hospital = Hospital()
+    make_columns(hospital, args.visits)
+    print(f'{args.visits:,} visits')
+    for label, query in QUERIES:
+        start = time.perf_counter()
+        result = hospital.count_by(**query)
+        elapsed = time.perf_counter() - start
+        print(f'{label:>40}: {elapsed * 1000:8.1f} ms, {len(result)} groups')
+
+
+if __name__ == '__main__':
+    main()
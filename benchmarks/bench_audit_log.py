@@ -0,0 +1,47 @@
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import bench_utils  # noqa: F401  (puts the project on sys.path)
+
+from audit_log import AuditLogger
+
+BURST = 100_000
+LEGACY_EVENTS = 10_000
+
+
+def legacy_write(file_path, username, role, action):
+    # write_usage_statistics before batching: open, write one row, close
+    with open(file_path, 'a', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow([username, role, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), action])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, 'legacy.csv')
+        start = time.perf_counter()
+        for i in range(LEGACY_EVENTS):
+            legacy_write(legacy_path, 'USER%d' % (i % 50), 'nurse', 'Retrieve Patient')
+        legacy = LEGACY_EVENTS / (time.perf_counter() - start)
+
+        for compress in (False, True):
+            path = os.path.join(directory, f'batched_{compress}.csv')
+            logger = AuditLogger(path, max_bytes=2 * 2 ** 20, compress=compress)
+            start = time.perf_counter()
+            for i in range(BURST):
+                logger.log('USER%d' % (i % 50), 'nurse', 'Retrieve Patient')
+            enqueued = time.perf_counter() - start
+            logger.flush()
+            flushed = time.perf_counter() - start
+            logger.close()
+            segments = sorted(name for name in os.listdir(directory) if name.startswith(f'batched_{compress}.csv.'))
+            print(f'batched (rotation every 2 MiB, gzip={compress}): {BURST / enqueued:,.0f} events/s enqueued, '
+                  f'{BURST / flushed:,.0f} events/s on disk, segments: {segments}')
+        print(f'per-event open/append/close: {legacy:,.0f} events/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import time
+from datetime import datetime
+
+from bench_utils import make_hospital, time_call
+
+from complaint_index import tokenize
+from Keerthi_Project import Patient, Visit
+
+QUERIES = [
+    ('pain', 'Emergency department', datetime(2010, 1, 1)),
+    ('back pain', None, None),
+    ('fever', 'Radiology', datetime(2020, 1, 1)),
+]
+PREFIXES = ['p', 'pa', 'back p', 'inf']
+
+
+def scan(hospital, query, department, start_date):
+    # What a search had to do before the index
+    tokens = tokenize(query)
+    results = []
+    for patient in hospital.patients.values():
+        for visit in patient.visits:
+            if department is not None and visit.department != department:
+                continue
+            if start_date is not None and visit.visit_time < start_date:
+                continue
+            words = tokenize(visit.chief_complaint)
+            if all(token in words for token in tokens):
+                results.append(visit)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, default=1_000_000)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    hospital = make_hospital(args.visits)
+    print(f'{args.visits} visits built and indexed in {time.perf_counter() - start:.1f} s')
+
+    print(f"{'query':<45} {'matches':>8} {'index ms':>9} {'scan ms':>9}")
+    for query, department, start_date in QUERIES:
+        matches = len(hospital.search_visits(query, department, start_date))
+        assert matches == len(scan(hospital, query, department, start_date))
+        indexed = time_call(hospital.search_visits, query, department, start_date, repeat=3)
+        scanned = time_call(scan, hospital, query, department, start_date, repeat=1)
+        label = f"'{query}' in {department or 'any department'} since {start_date.date() if start_date else 'ever'}"
+        print(f'{label:<45} {matches:>8} {indexed * 1e3:>9.2f} {scanned * 1e3:>9.1f}')
+
+    for prefix in PREFIXES:
+        elapsed = time_call(hospital.suggest_complaints, prefix, repeat=100)
+        print(f"type-ahead '{prefix}': {elapsed * 1e6:.1f} us -> {hospital.suggest_complaints(prefix)}")
+
+    # Upkeep on the write path: new visits with a fresh complaint, then removing their patients
+    count = 10_000
+    patients = [Patient(f'new{i}', 'Male', 'White', 40, 'Unknown', 'Medicare', '53000') for i in range(count)]
+    start = time.perf_counter()
+    for i, patient in enumerate(patients):
+        hospital.add_patient(patient)
+        patient.add_visit(Visit(f'new{i}', datetime(2024, 1, 1), 'Radiology', f'rash {i % 100}'))
+    added = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for patient in patients:
+        hospital.discard_patient(patient.patient_id)
+    removed = (time.perf_counter() - start) / count
+    print(f'add patient + visit: {added * 1e6:.1f} us, remove patient: {removed * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from bench_utils import make_hospital, time_call
+
+SIZES = [10_000, 100_000, 1_000_000]
+DAY = datetime(2010, 6, 15)
+RANGE_START = datetime(2005, 1, 1)
+RANGE_END = datetime(2014, 12, 31)
+
+
+def scan_count_on_date(hospital, date):
+    # The pre-index implementation of Hospital.count_visits_on_date
+    total_visits = 0
+    for patient in hospital.patients.values():
+        for visit in patient.visits:
+            if visit.visit_time.date() == date.date():
+                total_visits += 1
+    return total_visits
+
+
+def scan_count_between(hospital, start, end):
+    total_visits = 0
+    for patient in hospital.patients.values():
+        for visit in patient.visits:
+            if start <= visit.visit_time <= end:
+                total_visits += 1
+    return total_visits
+
+
+def main():
+    print(f"{'visits':>10} {'scan day ms':>12} {'index day us':>13} {'scan range ms':>14} {'index range us':>15} {'histogram us':>13}")
+    for size in SIZES:
+        hospital = make_hospital(size)
+        assert scan_count_on_date(hospital, DAY) == hospital.count_visits_on_date(DAY)
+        assert scan_count_between(hospital, RANGE_START, RANGE_END) == hospital.count_visits_between(RANGE_START, RANGE_END)
+        scan_day = time_call(scan_count_on_date, hospital, DAY, repeat=3)
+        index_day = time_call(hospital.count_visits_on_date, DAY, repeat=100)
+        scan_range = time_call(scan_count_between, hospital, RANGE_START, RANGE_END, repeat=3)
+        index_range = time_call(hospital.count_visits_between, RANGE_START, RANGE_END, repeat=100)
+        histogram = time_call(hospital.get_visit_histogram, DAY, datetime(2010, 7, 15), repeat=100)
+        print(f'{size:>10} {scan_day * 1e3:>12.1f} {index_day * 1e6:>13.2f} {scan_range * 1e3:>14.1f} {index_range * 1e6:>15.2f} {histogram * 1e6:>13.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from bench_utils import make_hospital
+
+from Keerthi_Project import Hospital, Patient, Visit, read_patient_data, write_patient_data
+from patient_csv import iter_patient_batches, iter_patient_columns
+
+
+def legacy_read_patient_data(file_path):
+    # read_patient_data before streaming ingestion: DictReader and strptime on every row
+    hospital = Hospital()
+    with hospital.bulk_load(), open(file_path, 'r') as file:
+        for row in csv.DictReader(file):
+            patient_id = row.get('Patient_ID')
+            if patient_id:
+                patient = Patient(patient_id, row.get('Gender', ''), row.get('Race', ''), int(row.get('Age', 0)), row.get('Ethnicity', ''), row.get('Insurance', ''), row.get('Zip_code', ''))
+                hospital.add_patient(patient)
+                visit_time_str = row.get('Visit_time', '')
+                visit_time = datetime.strptime(visit_time_str, '%Y-%m-%d') if visit_time_str else None
+                if row.get('Visit_ID') and visit_time:
+                    patient.add_visit(Visit(row['Visit_ID'], visit_time, row.get('Visit_department', ''), row.get('Chief_complaint', '')))
+    return hospital
+
+
+def legacy_parse(file_path):
+    rows = 0
+    with open(file_path, 'r') as file:
+        for row in csv.DictReader(file):
+            datetime.strptime(row['Visit_time'], '%Y-%m-%d')
+            int(row.get('Age', 0))
+            rows += 1
+    return rows
+
+
+def stream_parse(file_path):
+    rows = 0
+    for batch in iter_patient_batches(file_path):
+        rows += len(batch)
+    return rows
+
+
+def column_parse(file_path):
+    rows = 0
+    for columns in iter_patient_columns(file_path):
+        rows += len(columns[0])
+    return rows
+
+
+def rows_per_second(func, file_path, rows):
+    start = time.perf_counter()
+    func(file_path)
+    return rows / (time.perf_counter() - start)
+
+
+def peak_memory(func, file_path):
+    tracemalloc.start()
+    func(file_path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'rows':>10} {'mode':>25} {'rows/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            file_path = os.path.join(directory, f'patients_{rows}.csv')
+            write_patient_data(file_path, make_hospital(rows))
+            for name, func in [('legacy parse', legacy_parse), ('streaming parse', stream_parse), ('column parse', column_parse),
+                               ('legacy read_patient_data', legacy_read_patient_data), ('read_patient_data', read_patient_data)]:
+                print(f'{rows:>10} {name:>25} {rows_per_second(func, file_path, rows):>12,.0f}')
+            # Peak stays at roughly one batch no matter how large the file is
+            print(f'{rows:>10} {"streaming peak MiB":>25} {peak_memory(stream_parse, file_path):>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
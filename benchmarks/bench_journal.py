@@ -0,0 +1,45 @@
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from bench_utils import make_hospital
+
+from Keerthi_Project import PatientJournal, Visit, write_patient_data, write_patient_rows
+
+SIZES = [100, 10_000, 100_000, 1_000_000]
+MUTATIONS = 200
+
+
+def journal_latencies(hospital, data_path):
+    journal = PatientJournal(data_path, hospital, write_patient_rows, compact_threshold=10 ** 9)
+    patient_id = next(iter(hospital.patients))
+    latencies = []
+    for i in range(MUTATIONS):
+        visit = Visit('B%d' % i, datetime(2024, 1, 1), 'Radiology', 'injury')
+        hospital.patients[patient_id].add_visit(visit)
+        start = time.perf_counter()
+        journal.log_add_visit(patient_id, visit)
+        latencies.append(time.perf_counter() - start)
+    journal.close()
+    return latencies
+
+
+def main():
+    print(f"{'visits':>10} {'journal p50 ms':>15} {'journal p99 ms':>15} {'full rewrite ms':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            hospital = make_hospital(size)
+            data_path = os.path.join(directory, f'patients_{size}.csv')
+            start = time.perf_counter()
+            write_patient_data(data_path, hospital)
+            rewrite = time.perf_counter() - start
+            latencies = sorted(journal_latencies(hospital, data_path))
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+            print(f'{size:>10} {p50:>15.3f} {p99:>15.3f} {rewrite * 1000:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
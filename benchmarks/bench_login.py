@@ -0,0 +1,59 @@
+import csv
+import os
+import random
+import string
+import tempfile
+
+from bench_utils import time_call
+
+from Keerthi_Project import read_users
+from credential_store import CredentialStore, hash_password
+
+SIZES = [2_000, 20_000, 200_000]
+ROLES = ['admin', 'nurse', 'clinician', 'management']
+
+
+def random_token(rng):
+    return ''.join(rng.choices(string.ascii_uppercase + string.digits, k=7))
+
+
+def write_credentials(file_path, size, hashed_user):
+    rng = random.Random(size)
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['', 'username', 'password', 'role'])
+        for i in range(size - 1):
+            writer.writerow([i, random_token(rng), random_token(rng), rng.choice(ROLES)])
+        # The user we log in as sits at the end, the worst case for a linear scan
+        writer.writerow([size - 1, 'BENCHUSER', hash_password('secret') if hashed_user else 'secret', 'admin'])
+
+
+def scan_login(file_path, username, password):
+    # The pre-cache validate_login
+    for user in read_users(file_path):
+        if user.username == username and user.password == password:
+            return user.role
+    return None
+
+
+def main():
+    print(f"{'users':>8} {'scan ms':>9} {'cold load ms':>13} {'cached plain us':>16} {'cached hashed ms':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            plain_path = os.path.join(directory, f'plain_{size}.csv')
+            hashed_path = os.path.join(directory, f'hashed_{size}.csv')
+            write_credentials(plain_path, size, False)
+            write_credentials(hashed_path, size, True)
+            scan = time_call(scan_login, plain_path, 'BENCHUSER', 'secret', repeat=3)
+            cold = time_call(lambda: CredentialStore(plain_path).load(), repeat=3)
+            plain_store = CredentialStore(plain_path)
+            hashed_store = CredentialStore(hashed_path)
+            assert plain_store.authenticate('BENCHUSER', 'secret') == 'admin'
+            assert hashed_store.authenticate('BENCHUSER', 'secret') == 'admin'
+            cached_plain = time_call(plain_store.authenticate, 'BENCHUSER', 'secret', repeat=100)
+            cached_hashed = time_call(hashed_store.authenticate, 'BENCHUSER', 'secret', repeat=5)
+            print(f'{size:>8} {scan * 1e3:>9.1f} {cold * 1e3:>13.1f} {cached_plain * 1e6:>16.1f} {cached_hashed * 1e3:>17.1f}')
+
+
+if __name__ == '__main__':
+    main()
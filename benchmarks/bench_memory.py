@@ -0,0 +1,73 @@
+import argparse
+import csv
+import gc
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from bench_utils import make_hospital
+
+from Keerthi_Project import read_patient_data, write_patient_data
+
+
+class LegacyPatient:
+    # Patient, Visit and Note as they were before __slots__ and interning
+    def __init__(self, patient_id, gender, race, age, ethnicity, insurance, zip_code):
+        self.patient_id = patient_id
+        self.gender = gender
+        self.race = race
+        self.age = age
+        self.ethnicity = ethnicity
+        self.insurance = insurance
+        self.zip_code = zip_code
+        self.visits = []
+
+
+class LegacyVisit:
+    def __init__(self, visit_id, visit_time, department, chief_complaint):
+        self.visit_id = visit_id
+        self.visit_time = visit_time
+        self.department = department
+        self.chief_complaint = chief_complaint
+        self.notes = []
+
+
+def legacy_load(file_path):
+    patients = {}
+    with open(file_path, 'r') as file:
+        for row in csv.DictReader(file):
+            patient = patients.get(row['Patient_ID'])
+            if patient is None:
+                patient = patients[row['Patient_ID']] = LegacyPatient(row['Patient_ID'], row['Gender'], row['Race'], int(row['Age']), row['Ethnicity'], row['Insurance'], row['Zip_code'])
+            patient.visits.append(LegacyVisit(row['Visit_ID'], datetime.strptime(row['Visit_time'], '%Y-%m-%d'), row['Visit_department'], row['Chief_complaint']))
+    return patients
+
+
+def retained_bytes(loader, file_path):
+    gc.collect()
+    tracemalloc.start()
+    data = loader(file_path)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, default=200_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'patients.csv')
+        write_patient_data(file_path, make_hospital(args.visits))
+        before = retained_bytes(legacy_load, file_path)
+        after = retained_bytes(read_patient_data, file_path)
+    print(f'visits: {args.visits}')
+    print(f'before: {before / args.visits:.0f} bytes/visit')
+    print(f'after:  {after / args.visits:.0f} bytes/visit (objects, indexes and columns)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+from bench_utils import make_hospital
+
+import metrics
+from Keerthi_Project import generate_key_statistics
+
+
+def noop():
+    return None
+
+
+@metrics.timed('noop')
+def timed_noop():
+    return None
+
+
+def with_timer():
+    with metrics.timer('noop'):
+        return None
+
+
+def with_count():
+    metrics.count('noop')
+
+
+def per_call(func, calls, repeat=5):
+    # Best of several runs, so scheduler noise does not swamp differences of a few ns
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = (time.perf_counter() - start) / calls
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    args = parser.parse_args()
+    baseline = per_call(noop, args.calls)
+    print(f"{'':<28} {'disabled ns':>12} {'enabled ns':>11}")
+    print(f"{'plain call':<28} {baseline * 1e9:>12.0f} {'':>11}")
+    for label, func in [('@timed', timed_noop), ('with timer()', with_timer), ('count()', with_count)]:
+        metrics.registry.enabled = False
+        disabled = per_call(func, args.calls)
+        metrics.registry.enabled = True
+        enabled = per_call(func, args.calls)
+        metrics.registry.enabled = False
+        print(f'{label:<28} {(disabled - baseline) * 1e9:>12.0f} {(enabled - baseline) * 1e9:>11.0f}  (over a plain call)')
+
+    # The same comparison on a real instrumented hot path
+    hospital = make_hospital(100_000)
+    calls = 5_000
+    raw = per_call(lambda: generate_key_statistics.__wrapped__(hospital), calls)
+    disabled = per_call(lambda: generate_key_statistics(hospital), calls)
+    print(f'generate_key_statistics: {raw * 1e6:.2f} us raw, {disabled * 1e6:.2f} us instrumented while disabled '
+          f'({(disabled - raw) / raw * 100:+.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from bench_utils import FIRST_DAY, make_hospital, time_call
+
+from Keerthi_Project import generate_key_statistics, read_patient_data, write_patient_data
+
+LOOKUPS = 1000
+
+
+def nested_loop_notes(hospital, note_type, department, start_date, end_date):
+    # What a query had to do before the note index
+    results = []
+    for patient in hospital.patients.values():
+        for visit in patient.visits:
+            if visit.department == department and start_date <= visit.visit_time <= end_date:
+                for note in visit.notes:
+                    if note.note_type == note_type:
+                        results.append((patient, visit, note))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, nargs='+', default=[500_000, 1_000_000])
+    parser.add_argument('--notes-per-visit', type=int, default=2)
+    args = parser.parse_args()
+    print(f"{'notes':>10} {'load s':>7} {'bytes/note':>11} {'index query ms':>15} {'nested loop ms':>15} {'retrieve us':>12} {'statistics ms':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for visits in args.visits:
+            csv_path = os.path.join(directory, f'notes_{visits}.csv')
+            write_patient_data(csv_path, make_hospital(visits, notes_per_visit=0))
+            gc.collect()
+            tracemalloc.start()
+            without_notes = read_patient_data(csv_path)
+            base = tracemalloc.get_traced_memory()[0]
+            del without_notes
+            tracemalloc.stop()
+
+            write_patient_data(csv_path, make_hospital(visits, notes_per_visit=args.notes_per_visit))
+            gc.collect()
+            start = time.perf_counter()
+            hospital = read_patient_data(csv_path)
+            load = time.perf_counter() - start
+            note_total = len(hospital.notes)
+            del hospital
+            gc.collect()
+            tracemalloc.start()
+            hospital = read_patient_data(csv_path)
+            per_note = (tracemalloc.get_traced_memory()[0] - base) / note_total
+            tracemalloc.stop()
+
+            # "All discharge notes in Radiology last month"
+            end_date = FIRST_DAY + timedelta(days=365 * 24)
+            start_date = end_date - timedelta(days=30)
+            query = ('discharge note', 'Radiology', start_date, end_date)
+            assert len(hospital.find_notes(*query)) == len(nested_loop_notes(hospital, *query))
+            indexed = time_call(hospital.find_notes, *query, repeat=3)
+            nested = time_call(nested_loop_notes, hospital, *query, repeat=3)
+            note_ids = random.Random(0).sample(list(hospital.notes.by_id), LOOKUPS)
+            start = time.perf_counter()
+            for note_id in note_ids:
+                hospital.retrieve_note(note_id)
+            retrieve = (time.perf_counter() - start) / LOOKUPS
+            statistics = time_call(generate_key_statistics, hospital, repeat=3)
+            print(f'{note_total:>10} {load:>7.1f} {per_note:>11.0f} {indexed * 1e3:>15.2f} {nested * 1e3:>15.1f} {retrieve * 1e6:>12.2f} {statistics * 1e3:>14.2f}')
+            del hospital
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from bench_utils import COMPLAINTS, DEPARTMENTS, FIRST_DAY, make_hospital, time_call
+
+from Keerthi_Project import VISITS_PER_PAGE, Patient, Visit, retrieve_patient_ui
+
+
+def legacy_retrieve_patient_ui(hospital, patient_id):
+    # retrieve_patient_ui before the view cache: the whole history, concatenated on every call
+    patient = hospital.retrieve_patient(patient_id)
+    patient_info = f"Patient information for ID: {patient_id}\n"
+    for visit in patient.visits:
+        patient_info += f"Visit ID: {visit.visit_id}\n"
+        patient_info += f"Visit time: {visit.visit_time.strftime('%Y-%m-%d')}\n"
+        patient_info += f"Department: {visit.department}\n"
+        patient_info += f"Chief complaint: {visit.chief_complaint}\n"
+    return patient_info
+
+
+def open_view(hospital, patient_id):
+    # What the Tk view does when a patient is opened: the view and its first page
+    view = hospital.patient_view(patient_id)
+    return view.page(0, VISITS_PER_PAGE)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--histories', type=int, nargs='+', default=[10, 1_000, 100_000])
+    args = parser.parse_args()
+    hospital = make_hospital(100_000)
+    rng = random.Random(0)
+    print(f"{'visits':>8} {'legacy ms':>10} {'cold open us':>13} {'warm open us':>13} {'full text cold ms':>18} {'cached us':>10}")
+    for history in args.histories:
+        patient = Patient(f'long{history}', 'Female', 'White', 70, 'Unknown', 'Medicare', '53000')
+        hospital.add_patient(patient)
+        for i in range(history):
+            patient.add_visit(Visit(f'long{history}-{i}', FIRST_DAY + timedelta(days=rng.randint(0, 8000)), rng.choice(DEPARTMENTS), rng.choice(COMPLAINTS)))
+        legacy = time_call(legacy_retrieve_patient_ui, hospital, patient.patient_id, repeat=3)
+
+        start = time.perf_counter()
+        open_view(hospital, patient.patient_id)
+        cold = time.perf_counter() - start
+        warm = time_call(open_view, hospital, patient.patient_id, repeat=100)
+
+        hospital.views.invalidate(patient.patient_id)
+        start = time.perf_counter()
+        retrieve_patient_ui(hospital, patient.patient_id)
+        full = time.perf_counter() - start
+        cached = time_call(retrieve_patient_ui, hospital, patient.patient_id, repeat=100)
+        print(f'{history:>8} {legacy * 1e3:>10.2f} {cold * 1e6:>13.1f} {warm * 1e6:>13.1f} {full * 1e3:>18.2f} {cached * 1e6:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
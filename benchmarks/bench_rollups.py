@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from bench_utils import make_hospital, time_call
+
+SIZES = [10_000, 100_000, 1_000_000]
+RANGE_START = datetime(2003, 3, 15)
+RANGE_END = datetime(2019, 11, 20)
+
+
+def scan_trend(hospital, start, end):
+    # Monthly visits per department and insurance by walking every visit
+    counts = {}
+    for patient in hospital.patients.values():
+        for visit in patient.visits:
+            if start <= visit.visit_time <= end:
+                key = (visit.department, patient.insurance, visit.visit_time.year, visit.visit_time.month)
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def rollup_trend(hospital, start, end):
+    return hospital.get_visit_trend('month', start, end, split_by=('department', 'insurance'))
+
+
+def main():
+    print(f"{'visits':>10} {'scan ms':>9} {'rollup ms':>10} {'weekly ms':>10} {'daily ms':>9} {'derive ms':>11}")
+    for size in SIZES:
+        hospital = make_hospital(size)
+        scanned = scan_trend(hospital, RANGE_START, RANGE_END)
+        rolled = {(department, insurance, start.year, start.month): visits
+                  for (department, insurance), points in rollup_trend(hospital, RANGE_START, RANGE_END).items()
+                  for start, visits in points if visits}
+        assert scanned == rolled
+        scan = time_call(scan_trend, hospital, RANGE_START, RANGE_END, repeat=3)
+        rollup = time_call(rollup_trend, hospital, RANGE_START, RANGE_END, repeat=20)
+        weekly = time_call(hospital.get_visit_trend, 'week', None, None, None, None, 'department', repeat=20)
+        daily = time_call(hospital.get_visit_trend, 'day', repeat=20)
+        derive = time_call(hospital.rollups.derive, repeat=3)
+        print(f'{size:>10} {scan * 1e3:>9.1f} {rollup * 1e3:>10.2f} {weekly * 1e3:>10.2f} {daily * 1e3:>9.2f} {derive * 1e3:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from bench_utils import make_hospital
+
+from patient_shards import export_patient_shards, import_patient_shards
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+    print(f'{os.cpu_count()} cores, {args.visits} visits')
+    with tempfile.TemporaryDirectory() as directory:
+        source = make_hospital(args.visits)
+        # Visits span 24 years, so this is the two dozen shards of a nightly feed
+        export_patient_shards(source, os.path.join(directory, 'feed'), 'year')
+        shards = sorted(glob.glob(os.path.join(directory, 'feed', '*.csv')))
+        print(f'{len(shards)} shards')
+        print(f"{'workers':>8} {'import s':>9} {'speedup':>8} {'export s':>9} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            hospital = import_patient_shards(shards, workers=workers)
+            imported = time.perf_counter() - start
+            start = time.perf_counter()
+            export_patient_shards(hospital, os.path.join(directory, f'export_{workers}'), 'year', workers=workers)
+            exported = time.perf_counter() - start
+            del hospital
+            baseline = baseline or (imported, exported)
+            print(f'{workers:>8} {imported:>9.2f} {baseline[0] / imported:>8.2f} {exported:>9.2f} {baseline[1] / exported:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from bench_utils import make_hospital, time_call
+
+from binary_snapshot import snapshot_path
+from Keerthi_Project import generate_key_statistics, load_patient_data, read_patient_data, write_patient_data
+
+LOOKUPS = 1000
+
+
+def login_to_menu(load, csv_path):
+    # What the user waits for after logging in: the census loaded and the first answers back
+    start = time.perf_counter()
+    hospital = load(csv_path)
+    hospital.count_visits_on_date(datetime(2010, 6, 15))
+    return time.perf_counter() - start, hospital
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'visits':>10} {'load':>9} {'login->menu ms':>15} {'retrieve us':>12} {'statistics ms':>14} {'first write ms':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for visits in args.visits:
+            csv_path = os.path.join(directory, f'patients_{visits}.csv')
+            source = make_hospital(visits)
+            patient_ids = random.Random(0).sample(list(source.patients), LOOKUPS)
+            write_patient_data(csv_path, source)
+            del source
+            start = time.perf_counter()
+            load_patient_data(csv_path)
+            print(f'{visits:>10} parse and write snapshot: {time.perf_counter() - start:.1f} s, '
+                  f'{os.path.getsize(snapshot_path(csv_path)) / 2 ** 20:.0f} MiB')
+
+            for name, load in [('csv', read_patient_data), ('snapshot', load_patient_data)]:
+                elapsed, hospital = login_to_menu(load, csv_path)
+                start = time.perf_counter()
+                for patient_id in patient_ids:
+                    hospital.retrieve_patient(patient_id)
+                retrieve = (time.perf_counter() - start) / LOOKUPS
+                statistics = time_call(generate_key_statistics, hospital, repeat=3)
+                start = time.perf_counter()
+                hospital.remove_patient(patient_ids[0])
+                write = time.perf_counter() - start
+                print(f'{visits:>10} {name:>9} {elapsed * 1e3:>15.1f} {retrieve * 1e6:>12.1f} {statistics * 1e3:>14.2f} {write * 1e3:>15.1f}')
+                del hospital
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+from bench_utils import make_hospital, time_call
+
+from Keerthi_Project import generate_key_statistics
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def scan_statistics(hospital):
+    # The five passes the report used to make
+    by_attribute = {}
+    for attribute in ('insurance', 'gender', 'race', 'ethnicity'):
+        counts = by_attribute.setdefault(attribute, {})
+        for patient in hospital.patients.values():
+            value = getattr(patient, attribute)
+            counts[value] = counts.get(value, 0) + 1
+    departments = {}
+    for patient in hospital.patients.values():
+        for visit in patient.visits:
+            departments[visit.department] = departments.get(visit.department, 0) + 1
+    return by_attribute, departments
+
+
+def main():
+    print(f"{'visits':>10} {'scan ms':>10} {'report us':>10} {'rebuild ms':>11}")
+    for size in SIZES:
+        hospital = make_hospital(size)
+        scan = time_call(scan_statistics, hospital, repeat=3)
+        report = time_call(generate_key_statistics, hospital, repeat=100)
+        rebuild = time_call(hospital.rebuild_indexes, repeat=1)
+        print(f'{size:>10} {scan * 1e3:>10.1f} {report * 1e6:>10.1f} {rebuild * 1e3:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from bench_utils import make_hospital, time_call
+
+from Keerthi_Project import SQLiteHospital, generate_key_statistics, import_patient_data, read_patient_data, write_patient_data
+
+LOOKUPS = 1000
+
+
+def retrieve_latency(hospital, patient_ids):
+    start = time.perf_counter()
+    for patient_id in patient_ids:
+        hospital.retrieve_patient(patient_id)
+    return (time.perf_counter() - start) / len(patient_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'visits':>10} {'engine':>7} {'cold start ms':>14} {'retrieve us':>12} {'statistics ms':>14} {'count day ms':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for visits in args.visits:
+            csv_path = os.path.join(directory, f'patients_{visits}.csv')
+            db_path = os.path.join(directory, f'patients_{visits}.db')
+            source = make_hospital(visits)
+            patient_ids = random.Random(0).sample(list(source.patients), LOOKUPS)
+            write_patient_data(csv_path, source)
+            del source
+            start = time.perf_counter()
+            import_patient_data(csv_path, db_path).close()
+            print(f'{visits:>10} one-shot import into SQLite: {time.perf_counter() - start:.1f} s')
+
+            engines = [('memory', lambda: read_patient_data(csv_path)), ('sqlite', lambda: SQLiteHospital(db_path))]
+            for name, open_engine in engines:
+                start = time.perf_counter()
+                hospital = open_engine()
+                hospital.count_visits_on_date(datetime(2010, 6, 15))  # first answer, not just an open handle
+                cold = time.perf_counter() - start
+                retrieve = retrieve_latency(hospital, patient_ids)
+                statistics = time_call(generate_key_statistics, hospital, repeat=3)
+                count = time_call(hospital.count_visits_on_date, datetime(2010, 6, 15), repeat=3)
+                print(f'{visits:>10} {name:>7} {cold * 1e3:>14.1f} {retrieve * 1e6:>12.1f} {statistics * 1e3:>14.2f} {count * 1e3:>13.3f}')
+                del hospital
+
+
+if __name__ == '__main__':
+    main()
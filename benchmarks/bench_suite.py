@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bench_utils import time_call
+
+from Keerthi_Project import generate_key_statistics, read_patient_data, validate_login, write_patient_data
+from synthetic_data import write_synthetic_credentials, write_synthetic_data
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+LOOKUPS = 10_000
+USERS = 2000
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIRECTORY)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def per_call(func, arguments):
+    start = time.perf_counter()
+    for argument in arguments:
+        func(argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def bench_size(rows, data_directory, repeat):
+    data_path = os.path.join(data_directory, f'synthetic_{rows}.csv')
+    # Generated files are reused between runs; the same size always gives the same data
+    if not os.path.exists(data_path):
+        write_synthetic_data(data_path + '.tmp', rows)
+        os.replace(data_path + '.tmp', data_path)
+    rng = random.Random(rows)
+    result = {}
+
+    result['read_patient_data'] = time_call(read_patient_data, data_path, repeat=repeat)
+    hospital = read_patient_data(data_path)
+    patient_ids = list(hospital.patients)
+    result['patients'] = len(patient_ids)
+    result['visits'] = sum(len(patient.visits) for patient in hospital.patients.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        result['write_patient_data'] = time_call(write_patient_data, os.path.join(directory, 'out.csv'), hospital, repeat=repeat)
+
+    # The first query right after loading; the rest are the steady state
+    result['count_visits_on_date_first'] = time_call(hospital.count_visits_on_date, datetime(2010, 6, 15))
+    days = [datetime(rng.randint(2000, 2019), rng.randint(1, 12), rng.randint(1, 28)) for _ in range(LOOKUPS)]
+    result['count_visits_on_date'] = per_call(hospital.count_visits_on_date, days)
+    result['generate_key_statistics'] = time_call(generate_key_statistics, hospital, repeat=max(repeat, 3))
+    result['get_visit_trend'] = time_call(hospital.get_visit_trend, 'month', None, None, None, None, ('department', 'insurance'), repeat=5)
+    result['retrieve_patient'] = per_call(hospital.retrieve_patient, [rng.choice(patient_ids) for _ in range(LOOKUPS)])
+    del hospital, patient_ids
+    return result
+
+
+def bench_login(data_directory):
+    # validate_login reads Project_credentials.csv from the working directory
+    directory = os.path.join(data_directory, 'credentials')
+    os.makedirs(directory, exist_ok=True)
+    credentials_path = os.path.join(directory, 'Project_credentials.csv')
+    write_synthetic_credentials(credentials_path, USERS)
+    with open(credentials_path) as file:
+        _, username, password, _ = file.read().splitlines()[-1].split(',')
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        cold = time_call(validate_login, username, password)
+        warm = time_call(validate_login, username, password, repeat=100)
+        assert validate_login(username, password)
+    finally:
+        os.chdir(previous)
+    return {'validate_login_cold': cold, 'validate_login': warm}
+
+
+def compare(previous_path, results):
+    with open(previous_path) as file:
+        previous = json.load(file)
+    print(f"\nCompared with {previous['commit']} ({previous['created']}); ratio > 1 is slower now")
+    print(f"{'size':>10} {'operation':>28} {'before s':>10} {'now s':>10} {'ratio':>7}")
+    groups = [('login', previous['login'], results['login'])]
+    groups += [(size, previous['sizes'].get(size, {}), now) for size, now in results['sizes'].items()]
+    for size, before, now in groups:
+        for name, value in now.items():
+            if name in before and isinstance(value, float) and before[name]:
+                print(f"{size:>10} {name:>28} {before[name]:>10.3g} {value:>10.3g} {value / before[name]:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the core operations on synthetic data and save the results as JSON.')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma-separated CSV row counts, up to 10000000')
+    parser.add_argument('--data-directory', default=os.path.join(tempfile.gettempdir(), 'cdw_bench_data'),
+                        help='where generated CSVs are kept between runs')
+    parser.add_argument('--output', help='results file (default: results/<commit>.json next to this script)')
+    parser.add_argument('--compare', help='an earlier results file to compare against')
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.data_directory, exist_ok=True)
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'units': 'seconds per call',
+        'login': bench_login(args.data_directory),
+        'sizes': {},
+    }
+    print(f"validate_login: {results['login']['validate_login'] * 1e6:.1f} us (cold {results['login']['validate_login_cold'] * 1e3:.1f} ms)")
+    for rows in [int(size) for size in args.sizes.split(',')]:
+        result = results['sizes'][str(rows)] = bench_size(rows, args.data_directory, args.repeat)
+        print(f"{rows:>10} rows: " + ', '.join(f"{name} {value:.3g}s" if isinstance(value, float) else f"{name} {value}"
+                                              for name, value in result.items()), flush=True)
+
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Saved {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
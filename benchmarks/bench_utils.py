@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Keerthi_Project import Hospital, Note, Patient, Visit
+
+DEPARTMENTS = ['Emergency department', 'Radiology', 'Cardiology', 'Surgery', 'Pediatrics', 'Psychiatry', 'Neorology', 'Head and Neck', 'Obstetrics and gynaecology']
+INSURANCES = ['None', 'Blueshield', 'Medicare', 'Medicaid', 'Unknown']
+RACES = ['Pacific Islanders', 'Unknown', 'Black', 'White', 'Asian', 'Native Americans']
+GENDERS = ['Male', 'Female', 'Non-binary']
+ETHNICITIES = ['Hispanic', 'Non-Hispanic', 'Unknown', 'Other']
+NOTE_TYPES = ['progress note', 'admission note', 'social work note', 'discharge note', 'oncology note']
+COMPLAINTS = ['injury', 'back pain', 'fatigue', 'infection', 'fever', 'chest pain', 'headache', 'Unknown']
+FIRST_DAY = datetime(2000, 1, 1)
+
+
+def make_hospital(visit_count, visits_per_patient=5, seed=0, notes_per_visit=0):
+    rng = random.Random(seed)
+    hospital = Hospital()
+    patient = None
+    for i in range(visit_count):
+        if i % visits_per_patient == 0:
+            patient = Patient(str(100000 + i), rng.choice(GENDERS), rng.choice(RACES), rng.randint(0, 100), rng.choice(ETHNICITIES), rng.choice(INSURANCES), str(rng.randint(53000, 53999)))
+            hospital.add_patient(patient)
+        visit_time = FIRST_DAY + timedelta(days=rng.randint(0, 365 * 24))
+        visit = Visit(str(i), visit_time, rng.choice(DEPARTMENTS), rng.choice(COMPLAINTS))
+        patient.add_visit(visit)
+        for n in range(notes_per_visit):
+            visit.add_note(Note(f'{i}-{n}', rng.choice(NOTE_TYPES)))
+    return hospital
+
+
+def time_call(func, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
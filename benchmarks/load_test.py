@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_utils import COMPLAINTS, DEPARTMENTS, make_hospital
+
+from Keerthi_Project import write_patient_data
+
+SERVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hospital_server.py')
+# Share of each operation in the mix for the two kinds of user; every tenth client is an admin
+CLINICIAN_WORKLOAD = [('retrieve', 60), ('count_visits', 15), ('suggest', 12), ('add_visit', 13)]
+ADMIN_WORKLOAD = [('count_visits', 50), ('statistics', 50)]
+OPERATIONS = ['retrieve', 'count_visits', 'suggest', 'add_visit', 'statistics']
+
+
+class Client:
+    # One keep-alive connection; requests on it are sequential, like one Tk window
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.token = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n'
+        if self.token:
+            head += f'Authorization: Bearer {self.token}\r\n'
+        self.writer.write(head.encode() + b'\r\n' + payload)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        data = json.loads(await self.reader.readexactly(length))
+        if status >= 400:
+            raise RuntimeError(f'{method} {path}: {status} {data.get("error")}')
+        return data
+
+    async def login(self, username, password):
+        self.token = (await self.request('POST', '/login', {'username': username, 'password': password}))['token']
+
+    def close(self):
+        self.writer.close()
+
+
+async def run_client(number, args, patient_ids, deadline, latencies):
+    rng = random.Random(number)
+    client = Client(args.host, args.port)
+    await client.connect()
+    if number % 10 == 9:
+        await client.login('admin', 'secret')
+        workload = ADMIN_WORKLOAD
+    else:
+        await client.login(f'user{number % 4}', 'secret')
+        workload = CLINICIAN_WORKLOAD
+    operations = [name for name, _ in workload]
+    weights = [weight for _, weight in workload]
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        patient_id = rng.choice(patient_ids)
+        start = time.perf_counter()
+        if operation == 'retrieve':
+            await client.request('GET', f'/patients/{patient_id}')
+        elif operation == 'count_visits':
+            await client.request('GET', f'/visits/count?date=2010-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+        elif operation == 'suggest':
+            await client.request('GET', f'/complaints/suggest?text={rng.choice(COMPLAINTS)[:2]}')
+        elif operation == 'add_visit':
+            await client.request('POST', f'/patients/{patient_id}/visits', {
+                'visit_time': '2024-01-15', 'visit_department': rng.choice(DEPARTMENTS), 'chief_complaint': rng.choice(COMPLAINTS)})
+        else:
+            await client.request('GET', '/statistics')
+        latencies.setdefault(operation, []).append(time.perf_counter() - start)
+    client.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def write_credentials(file_path):
+    # Plain passwords keep login cheap; this measures the server, not PBKDF2
+    roles = ['clinician', 'nurse', 'clinician', 'nurse']
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['', 'username', 'password', 'role'])
+        for i, role in enumerate(roles):
+            writer.writerow([i, f'user{i}', 'secret', role])
+        writer.writerow([len(roles), 'admin', 'secret', 'admin'])
+
+
+async def wait_for_server(host, port, timeout=600):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run_load(args, patient_ids):
+    await wait_for_server(args.host, args.port)
+    latencies = {}
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[run_client(number, args, patient_ids, deadline, latencies) for number in range(args.clients)])
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive hospital_server.py with concurrent clients and report throughput and latency.')
+    parser.add_argument('--visits', type=int, default=100_000)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--engine', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8799)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'Project_patient_information.csv')
+        hospital = make_hospital(args.visits)
+        patient_ids = list(hospital.patients)
+        write_patient_data(data_path, hospital)
+        del hospital
+        write_credentials(os.path.join(directory, 'Project_credentials.csv'))
+        server = subprocess.Popen([sys.executable, SERVER, '--host', args.host, '--port', str(args.port), '--data', data_path,
+                                   '--engine', args.engine], cwd=directory)
+        try:
+            latencies, elapsed = asyncio.run(run_load(args, patient_ids))
+        finally:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{args.clients} clients, {args.visits} visits, {args.engine} engine, {elapsed:.1f} s")
+    print(f"{'operation':>14} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for operation in OPERATIONS:
+        values = latencies.get(operation, [])
+        if values:
+            print(f"{operation:>14} {len(values):>9} {len(values) / elapsed:>8.0f} {percentile(values, 0.5) * 1e3:>8.1f} {percentile(values, 0.99) * 1e3:>8.1f}")
+    everything = [value for values in latencies.values() for value in values]
+    print(f"{'all':>14} {total:>9} {total / elapsed:>8.0f} {percentile(everything, 0.5) * 1e3:>8.1f} {percentile(everything, 0.99) * 1e3:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
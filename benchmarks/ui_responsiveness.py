@@ -0,0 +1,105 @@
+import argparse
+import gc
+import heapq
+import itertools
+import os
+import tempfile
+import time
+
+from bench_utils import make_hospital
+
+from Keerthi_Project import (PatientJournal, add_patient_ui, count_visits_ui, generate_key_statistics, read_patient_data,
+                             remove_patient_ui, retrieve_patient_ui, write_patient_data, write_patient_rows)
+from task_runner import TaskRunner
+
+
+class HeadlessRoot:
+    # Just enough of tk.Tk for TaskRunner: an after() timer queue and a loop that records stalls
+    def __init__(self):
+        self.timers = []
+        self.counter = itertools.count()
+        self.max_stall = 0.0
+
+    def after(self, milliseconds, callback):
+        heapq.heappush(self.timers, (time.perf_counter() + milliseconds / 1000, next(self.counter), callback))
+
+    def run_until(self, done, tick=0.001):
+        # A stall is any iteration that takes longer than its idle tick, including waiting for the GIL
+        last = time.perf_counter()
+        while not done():
+            while self.timers and self.timers[0][0] <= time.perf_counter():
+                _, _, callback = heapq.heappop(self.timers)
+                callback()
+            time.sleep(tick)
+            now = time.perf_counter()
+            self.max_stall = max(self.max_stall, now - last - tick)
+            last = now
+
+
+def actions(data_path, state):
+    # The same calls main() makes for each button, in the order a session would
+    def load():
+        gc.disable()
+        try:
+            state['hospital'] = read_patient_data(data_path)
+            gc.freeze()
+        finally:
+            gc.enable()
+        state['journal'] = PatientJournal(data_path, state['hospital'], write_patient_rows, compact_threshold=10 ** 9)
+    patient_id = lambda: next(iter(state['hospital'].patients))
+    return [
+        ('load', 'write', load),
+        ('statistics', 'read', lambda: generate_key_statistics(state['hospital'])),
+        ('add visit', 'write', lambda: add_patient_ui(state['hospital'], patient_id(), '2024-01-01', 'Radiology', 'injury', state['journal'])),
+        ('retrieve', 'read', lambda: retrieve_patient_ui(state['hospital'], patient_id())),
+        ('count', 'read', lambda: count_visits_ui(state['hospital'], '2010-06-15')),
+        ('remove', 'write', lambda: remove_patient_ui(state['hospital'], patient_id(), state['journal'])),
+    ]
+
+
+def run_inline(data_path):
+    root = HeadlessRoot()
+    pending = actions(data_path, {})
+    for _, _, action in pending:
+        root.after(0, action)
+    root.run_until(lambda: not root.timers)
+    return root.max_stall
+
+
+def run_pooled(data_path):
+    root = HeadlessRoot()
+    runner = TaskRunner(root)
+    state = {}
+    remaining = list(actions(data_path, state))
+
+    def next_action(_=None):
+        # Chained like the UI: each button press follows the previous result
+        if remaining:
+            _, access, action = remaining.pop(0)
+            runner.submit(action, on_done=next_action, access=access)
+        else:
+            state['finished'] = True
+
+    next_action()
+    root.run_until(lambda: state.get('finished'))
+    runner.shutdown()
+    state['journal'].close()
+    return root.max_stall
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--visits', type=int, default=200_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'patients.csv')
+        write_patient_data(data_path, make_hospital(args.visits))
+        inline = run_inline(data_path)
+        pooled = run_pooled(data_path)
+    print(f'{args.visits:,} visits')
+    print(f'max event-loop stall, work on the Tk thread: {inline * 1000:8.1f} ms')
+    print(f'max event-loop stall, work on TaskRunner:    {pooled * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+from complaint_index import suggest_from_counts
+from models import Hospital, Note, Patient, Visit
+from patient_views import PatientViewCache
+from patient_journal import journal_paths
+from visit_rollups import VisitRollups
+
+MAGIC = b'CDWSNAP\0'
+VERSION = 4
+# magic, version, byte order, CSV size, CSV mtime, journal segment sizes, patients, visits
+HEADER = struct.Struct('<8sII6Q')
+SECTION = struct.Struct('<QQ')
+SECTIONS = (
+    ('string_offsets', 'Q'), ('strings', 'B'),
+    ('patient_id', 'I'), ('gender', 'I'), ('race', 'I'), ('ethnicity', 'I'), ('insurance', 'I'), ('zip_code', 'I'),
+    ('age', 'i'), ('first_visit', 'I'), ('visit_count', 'I'), ('id_order', 'I'),
+    ('visit_id', 'I'), ('visit_day', 'i'), ('department', 'I'), ('chief_complaint', 'I'), ('first_note', 'I'), ('note_count', 'I'),
+    ('note_id', 'I'), ('note_type', 'I'),
+    ('day_keys', 'i'), ('day_counts', 'I'), ('aggregates', 'B'),
+    ('rollup_first', 'i'), ('rollup_department', 'I'), ('rollup_insurance', 'I'), ('rollup_visits', 'i'),
+)
+PATIENT_AGGREGATES = ('gender', 'race', 'ethnicity', 'insurance')
+BYTE_ORDER = 1 if sys.byteorder == 'little' else 2
+
+
+def snapshot_path(data_path):
+    return os.path.splitext(data_path)[0] + '.cdw'
+
+
+def source_state(data_path):
+    # What the snapshot was built from: the CSV plus however much of each journal segment existed
+    stat = os.stat(data_path)
+    journal_sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in journal_paths(data_path)]
+    return (stat.st_size, stat.st_mtime_ns, *journal_sizes)
+
+
+def write_binary_snapshot(data_path, hospital, state=None):
+    state = state or source_state(data_path)
+    strings = {}
+
+    def code(value):
+        value = str(value)
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    columns = {name: array(typecode) for name, typecode in SECTIONS}
+    patient_codes = []
+    for patient in hospital.patients.values():
+        patient_codes.append(code(patient.patient_id))
+        columns['patient_id'].append(patient_codes[-1])
+        for name in ('gender', 'race', 'ethnicity', 'insurance', 'zip_code'):
+            columns[name].append(code(getattr(patient, name)))
+        columns['age'].append(patient.age)
+        columns['first_visit'].append(len(columns['visit_id']))
+        columns['visit_count'].append(len(patient.visits))
+        for visit in patient.visits:
+            columns['visit_id'].append(code(visit.visit_id))
+            columns['visit_day'].append(visit.visit_time.toordinal())
+            columns['department'].append(code(visit.department))
+            columns['chief_complaint'].append(code(visit.chief_complaint))
+            columns['first_note'].append(len(columns['note_id']))
+            columns['note_count'].append(len(visit.notes))
+            for note in visit.notes:
+                columns['note_id'].append(code(note.note_id))
+                columns['note_type'].append(code(note.note_type))
+    # Only the day rollups are stored, one run of days per (department, insurance) cell; the
+    # coarser grains are merged from them on load
+    days = hospital.rollups.tables['day']
+    if days.first is not None:
+        columns['rollup_first'].append(days.first)
+        for (department, insurance), visits in days.cells.items():
+            columns['rollup_department'].append(code(department))
+            columns['rollup_insurance'].append(code(insurance))
+            columns['rollup_visits'].extend(visits)
+
+    blob = bytearray()
+    for value in strings:
+        columns['string_offsets'].append(len(blob))
+        blob += value.encode()
+    columns['string_offsets'].append(len(blob))
+    columns['strings'] = array('B', blob)
+    ordered = list(strings)
+    columns['id_order'] = array('I', sorted(range(len(patient_codes)), key=lambda row: ordered[patient_codes[row]]))
+
+    day_counts = {}
+    for day in columns['visit_day']:
+        day_counts[day] = day_counts.get(day, 0) + 1
+    columns['day_keys'] = array('i', sorted(day_counts))
+    columns['day_counts'] = array('I', [day_counts[day] for day in columns['day_keys']])
+    aggregates = {name: list(hospital.count_by(name, unit='patient').items()) for name in ('gender', 'race', 'ethnicity', 'insurance')}
+    aggregates['department'] = list(hospital.count_by('department').items())
+    aggregates['note_type'] = list(hospital.get_note_count_by_type().items())
+    aggregates['chief_complaint'] = list(hospital.complaints.visit_counts.items())
+    columns['aggregates'] = array('B', json.dumps(aggregates).encode())
+
+    temp_path = snapshot_path(data_path) + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, *state, len(patient_codes), len(columns['visit_id'])))
+        directory_at = file.tell()
+        file.write(b'\0' * SECTION.size * len(SECTIONS))
+        directory = []
+        for name, _ in SECTIONS:
+            # 8-byte alignment so every section can be cast in place
+            file.write(b'\0' * (-file.tell() % 8))
+            directory.append((file.tell(), len(columns[name]) * columns[name].itemsize))
+            columns[name].tofile(file)
+        file.seek(directory_at)
+        for entry in directory:
+            file.write(SECTION.pack(*entry))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, snapshot_path(data_path))
+
+
+class MappedPatients:
+    def __init__(self, hospital):
+        self.hospital = hospital
+
+    def __contains__(self, patient_id):
+        return self.hospital.find_row(patient_id) is not None
+
+    def __getitem__(self, patient_id):
+        patient = self.hospital.retrieve_patient(patient_id)
+        if patient is None:
+            raise KeyError(patient_id)
+        return patient
+
+    def get(self, patient_id, default=None):
+        patient = self.hospital.retrieve_patient(patient_id)
+        return default if patient is None else patient
+
+    def __len__(self):
+        return self.hospital.patient_total
+
+    def __iter__(self):
+        for row in range(self.hospital.patient_total):
+            yield self.hospital.string(self.hospital.columns['patient_id'][row])
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        for row in range(self.hospital.patient_total):
+            yield self.hospital.build_patient(row)
+
+    def items(self):
+        for patient in self.values():
+            yield patient.patient_id, patient
+
+
+class MappedHospital:
+    # Serves lookups and counts straight from the mapped snapshot. The first change builds a
+    # full Hospital from it, and every call is delegated to that from then on.
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = view = memoryview(self.map)
+        magic, version, byte_order, *state = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or byte_order != BYTE_ORDER:
+            raise ValueError(f"{path} is not a readable snapshot")
+        self.state = tuple(state[:4])
+        self.patient_total, self.visit_total = state[4:]
+        self.columns = {}
+        for index, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(self.map, HEADER.size + index * SECTION.size)
+            self.columns[name] = view[offset:offset + length].cast(typecode)
+        self.aggregates = {name: dict(items) for name, items in json.loads(bytes(self.columns['aggregates'])).items()}
+        self.rollups = None
+        self.full = None
+        # Readers that need the full census may arrive together; only the first one builds it
+        self.materialize_lock = threading.Lock()
+        self.patients = MappedPatients(self)
+        self.views = PatientViewCache()
+
+    def string(self, index):
+        offsets = self.columns['string_offsets']
+        return bytes(self.columns['strings'][offsets[index]:offsets[index + 1]]).decode()
+
+    def find_row(self, patient_id):
+        order = self.columns['id_order']
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(self.columns['patient_id'][order[middle]]) < patient_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and self.string(self.columns['patient_id'][order[low]]) == patient_id:
+            return order[low]
+        return None
+
+    def build_patient(self, row, strings=None, days=None):
+        column = self.columns
+        string = strings.__getitem__ if strings is not None else self.string
+        patient = Patient(string(column['patient_id'][row]), string(column['gender'][row]), string(column['race'][row]),
+                          column['age'][row], string(column['ethnicity'][row]), string(column['insurance'][row]),
+                          string(column['zip_code'][row]))
+        first = column['first_visit'][row]
+        for visit in range(first, first + column['visit_count'][row]):
+            day = column['visit_day'][visit]
+            visit_time = days.get(day) if days is not None else None
+            if visit_time is None:
+                visit_time = datetime.fromordinal(day)
+                if days is not None:
+                    days[day] = visit_time
+            built = Visit(string(column['visit_id'][visit]), visit_time, string(column['department'][visit]),
+                          string(column['chief_complaint'][visit]))
+            first_note = column['first_note'][visit]
+            if column['note_count'][visit]:
+                built.notes = tuple(Note(string(column['note_id'][note]), string(column['note_type'][note]))
+                                    for note in range(first_note, first_note + column['note_count'][visit]))
+            built.patient = patient
+            patient.visits.append(built)
+        return patient
+
+    def close(self):
+        # Every view into the map has to be released before the map can close. Windows cannot
+        # replace a file that is still mapped, so this comes before the snapshot is rewritten.
+        for column in self.columns.values():
+            column.release()
+        self.view.release()
+        self.map.close()
+
+    def materialize(self):
+        if self.full is not None:
+            return self.full
+        with self.materialize_lock:
+            if self.full is not None:
+                return self.full
+            offsets = self.columns['string_offsets']
+            blob = bytes(self.columns['strings'])
+            strings = [blob[offsets[index]:offsets[index + 1]].decode() for index in range(len(offsets) - 1)]
+            hospital = Hospital()
+            days = {}
+            with hospital.bulk_load():
+                for row in range(self.patient_total):
+                    hospital.add_patient(self.build_patient(row, strings, days))
+            self.patients = hospital.patients
+            self.full = hospital
+            return hospital
+
+    # Reads
+
+    def retrieve_patient(self, patient_id):
+        if self.full is not None:
+            return self.full.retrieve_patient(patient_id)
+        row = self.find_row(patient_id)
+        if row is None:
+            return None
+        patient = self.build_patient(row)
+        patient.hospital = self
+        return patient
+
+    def patient_view(self, patient_id):
+        if self.full is not None:
+            return self.full.patient_view(patient_id)
+        return self.views.get(patient_id, self.retrieve_patient)
+
+    def count_visits_on_date(self, day):
+        if self.full is not None:
+            return self.full.count_visits_on_date(day)
+        keys = self.columns['day_keys']
+        ordinal = day.toordinal()
+        index = bisect_left(keys, ordinal)
+        return self.columns['day_counts'][index] if index < len(keys) and keys[index] == ordinal else 0
+
+    def count_visits_between(self, start_date, end_date):
+        if self.full is not None:
+            return self.full.count_visits_between(start_date, end_date)
+        keys = self.columns['day_keys']
+        first = bisect_left(keys, start_date.toordinal())
+        last = bisect_right(keys, end_date.toordinal())
+        return sum(self.columns['day_counts'][first:last])
+
+    def get_visit_histogram(self, start_date, end_date):
+        if self.full is not None:
+            return self.full.get_visit_histogram(start_date, end_date)
+        keys = self.columns['day_keys']
+        first = bisect_left(keys, start_date.toordinal())
+        last = bisect_right(keys, end_date.toordinal())
+        return [(date.fromordinal(keys[index]), self.columns['day_counts'][index]) for index in range(first, last)]
+
+    def get_visit_trend(self, grain='month', start_date=None, end_date=None, department=None, insurance=None, split_by=()):
+        if self.full is not None:
+            return self.full.get_visit_trend(grain, start_date, end_date, department, insurance, split_by)
+        if self.rollups is None:
+            column = self.columns
+            cells = {}
+            if len(column['rollup_department']):
+                length = len(column['rollup_visits']) // len(column['rollup_department'])
+                for index in range(len(column['rollup_department'])):
+                    cell = (self.string(column['rollup_department'][index]), self.string(column['rollup_insurance'][index]))
+                    cells[cell] = array('i', column['rollup_visits'][index * length:(index + 1) * length])
+            self.rollups = VisitRollups()
+            self.rollups.load_days(column['rollup_first'][0] if cells else None, cells)
+        return self.rollups.trend(grain, start_date, end_date, department, insurance, split_by)
+
+    def count_by(self, group_by, unit='visit', where=None, start_date=None, end_date=None):
+        name = group_by if isinstance(group_by, str) else group_by[0] if len(group_by) == 1 else None
+        if self.full is None and name and not where and start_date is None and end_date is None:
+            if unit == 'patient' and name in PATIENT_AGGREGATES:
+                return dict(self.aggregates[name])
+            if unit == 'visit' and name == 'department':
+                return dict(self.aggregates['department'])
+        return self.materialize().count_by(group_by, unit, where, start_date, end_date)
+
+    def get_patient_count_by_insurance(self):
+        return self.count_by('insurance', unit='patient')
+
+    def get_patient_count_by_demographics(self, attribute):
+        if self.full is None and attribute in PATIENT_AGGREGATES:
+            return dict(self.aggregates[attribute])
+        return self.materialize().get_patient_count_by_demographics(attribute)
+
+    def get_patient_count_by_department(self):
+        return self.count_by('department')
+
+    def get_note_count_by_type(self):
+        if self.full is not None:
+            return self.full.get_note_count_by_type()
+        return dict(self.aggregates['note_type'])
+
+    def retrieve_note(self, note_id):
+        return self.materialize().retrieve_note(note_id)
+
+    def search_visits(self, query, department=None, start_date=None, end_date=None, prefix=False):
+        return self.materialize().search_visits(query, department, start_date, end_date, prefix)
+
+    def suggest_complaints(self, text, limit=10):
+        # Type-ahead starts before anything is searched, so it must not build the full census
+        if self.full is not None:
+            return self.full.suggest_complaints(text, limit)
+        return suggest_from_counts(self.aggregates['chief_complaint'], text, limit)
+
+    def find_notes(self, note_type=None, department=None, start_date=None, end_date=None):
+        return self.materialize().find_notes(note_type, department, start_date, end_date)
+
+    # Writes
+
+    def add_patient(self, patient):
+        self.materialize().add_patient(patient)
+
+    def on_visit_added(self, patient, visit):
+        # patient came from the snapshot; the same visit goes onto the materialized copy
+        patient.hospital = None
+        self.materialize().patients[patient.patient_id].add_visit(visit)
+
+    def on_note_added(self, patient, visit, note):
+        patient.hospital = None
+        self.materialize().patients[patient.patient_id].find_visit(visit.visit_id).add_note(note)
+
+    def discard_patient(self, patient_id):
+        return self.materialize().discard_patient(patient_id)
+
+    def remove_patient(self, patient_id):
+        self.materialize().remove_patient(patient_id)
+
+
+def open_binary_snapshot(data_path):
+    # Returns a MappedHospital, or None when the snapshot is missing or older than the CSV and journal
+    path = snapshot_path(data_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        hospital = MappedHospital(path)
+    except (ValueError, struct.error, OSError):
+        return None
+    if hospital.state != source_state(data_path):
+        hospital.close()
+        return None
+    return hospital
@@ -0,0 +1,88 @@
+from array import array
+from operator import attrgetter
+
+PATIENT_CATEGORIES = ('gender', 'race', 'ethnicity', 'insurance')
+VISIT_CATEGORIES = ('department',)
+# Repetitive strings that are interned on the objects but not kept as columns
+INTERNED_ONLY = ('zip_code', 'chief_complaint', 'note_type')
+
+
+class CategoryDictionary:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+    def intern(self, value):
+        return self.values[self.encode(value)]
+
+
+def make_dictionaries():
+    return {name: CategoryDictionary() for name in PATIENT_CATEGORIES + VISIT_CATEGORIES + INTERNED_ONLY}
+
+
+def encode_column(dictionary, values):
+    # Each distinct value is encoded once, in order of first appearance
+    codes = {value: dictionary.encode(value) for value in dict.fromkeys(values)}
+    return map(codes.__getitem__, values)
+
+
+class ColumnStore:
+    # Patients and visits as parallel int arrays; removed patients are tombstoned, not deleted
+    def __init__(self, dictionaries):
+        self.dictionaries = dictionaries
+        self.patient_columns = {name: array('i') for name in PATIENT_CATEGORIES}
+        self.patient_age = array('i')
+        self.patient_alive = bytearray()
+        self.visit_patient = array('i')
+        self.visit_day = array('i')
+        self.visit_department = array('i')
+        self.removed_patients = 0
+
+    def add_patient(self, patient):
+        row = len(self.patient_alive)
+        for name, column in self.patient_columns.items():
+            column.append(self.dictionaries[name].encode(getattr(patient, name)))
+        self.patient_age.append(patient.age)
+        self.patient_alive.append(1)
+        return row
+
+    def add_patients(self, patients):
+        # Bulk form of add_patient; returns the row of the first patient
+        first = len(self.patient_alive)
+        for name, column in self.patient_columns.items():
+            column.extend(encode_column(self.dictionaries[name], list(map(attrgetter(name), patients))))
+        self.patient_age.extend(map(attrgetter('age'), patients))
+        self.patient_alive.extend(bytes([1]) * len(patients))
+        return first
+
+    def remove_patient(self, row):
+        if self.patient_alive[row]:
+            self.patient_alive[row] = 0
+            self.removed_patients += 1
+
+    def add_visit(self, patient_row, visit):
+        self.visit_patient.append(patient_row)
+        self.visit_day.append(visit.visit_time.toordinal())
+        self.visit_department.append(self.dictionaries['department'].encode(visit.department))
+
+    def add_visits(self, patient_rows, ordinals, departments):
+        # Bulk form of add_visit over parallel lists; departments are encoded once per distinct value
+        self.visit_patient.extend(patient_rows)
+        self.visit_day.extend(ordinals)
+        self.visit_department.extend(encode_column(self.dictionaries['department'], departments))
+
+    def needs_compaction(self):
+        return self.removed_patients > 1000 and self.removed_patients * 2 > len(self.patient_alive)
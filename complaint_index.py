@@ -0,0 +1,182 @@
+import re
+from itertools import groupby
+from operator import attrgetter
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def complaint_matches(query_tokens, complaint_tokens, prefix=False):
+    # Every query token has to appear in the complaint; with prefix the last one may be unfinished
+    for position, token in enumerate(query_tokens):
+        if prefix and position == len(query_tokens) - 1:
+            if not any(candidate.startswith(token) for candidate in complaint_tokens):
+                return False
+        elif token not in complaint_tokens:
+            return False
+    return True
+
+
+def rank_suggestions(complaint_counts, complaints, limit):
+    # Most frequent first, then alphabetical
+    return sorted(complaints, key=lambda complaint: (-complaint_counts[complaint], complaint))[:limit]
+
+
+def suggest_from_counts(complaint_counts, text, limit=10):
+    # Type-ahead without an index, for engines that only know each complaint's visit count
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    complaints = [complaint for complaint in complaint_counts if complaint_matches(tokens, set(tokenize(complaint)), prefix=True)]
+    return rank_suggestions(complaint_counts, complaints, limit)
+
+
+class PrefixTrie:
+    # Maps every word start of a complaint ("back pain", "pain") to the complaint, for type-ahead
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key, value):
+        node = self.root
+        for character in key:
+            node = node.setdefault(character, {})
+        node.setdefault(None, set()).add(value)
+
+    def remove(self, key, value):
+        path = [self.root]
+        for character in key:
+            node = path[-1].get(character)
+            if node is None:
+                return
+            path.append(node)
+        values = path[-1].get(None)
+        if values is None:
+            return
+        values.discard(value)
+        if not values:
+            del path[-1][None]
+        # Prune the branch back up to the first node still in use
+        for depth in range(len(key), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][key[depth - 1]]
+
+    def values_with_prefix(self, prefix):
+        node = self.root
+        for character in prefix:
+            node = node.get(character)
+            if node is None:
+                return set()
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for character, child in node.items():
+                if character is None:
+                    found.update(child)
+                else:
+                    stack.append(child)
+        return found
+
+
+def word_starts(complaint):
+    text = complaint.lower()
+    return [text[match.start():] for match in TOKEN_PATTERN.finditer(text)]
+
+
+class ComplaintIndex:
+    # Chief complaints repeat a lot, so tokens point at distinct complaint strings and each
+    # complaint keeps its visits bucketed by department
+    def __init__(self):
+        self.postings = {}  # token -> set of complaints
+        self.visits = {}  # complaint -> {department: set of visits}
+        self.visit_counts = {}  # complaint -> number of visits
+        self.trie = PrefixTrie()
+
+    def __len__(self):
+        return sum(self.visit_counts.values())
+
+    def add(self, visit):
+        complaint = visit.chief_complaint
+        count = self.visit_counts.get(complaint, 0)
+        if count == 0:
+            for token in tokenize(complaint):
+                self.postings.setdefault(token, set()).add(complaint)
+            for key in word_starts(complaint):
+                self.trie.add(key, complaint)
+        self.visit_counts[complaint] = count + 1
+        self.visits.setdefault(complaint, {}).setdefault(visit.department, set()).add(visit)
+
+    def add_visits(self, visits):
+        # Bulk form of add: one sort groups the visits by complaint and department
+        key = attrgetter('chief_complaint', 'department')
+        for (complaint, department), group in groupby(sorted(visits, key=key), key):
+            group = set(group)
+            count = self.visit_counts.get(complaint, 0)
+            if count == 0:
+                for token in tokenize(complaint):
+                    self.postings.setdefault(token, set()).add(complaint)
+                for word in word_starts(complaint):
+                    self.trie.add(word, complaint)
+            self.visit_counts[complaint] = count + len(group)
+            self.visits.setdefault(complaint, {}).setdefault(department, set()).update(group)
+
+    def remove(self, visit):
+        complaint = visit.chief_complaint
+        departments = self.visits.get(complaint)
+        bucket = departments.get(visit.department) if departments else None
+        if bucket is None or visit not in bucket:
+            return
+        bucket.discard(visit)
+        if not bucket:
+            del departments[visit.department]
+        count = self.visit_counts[complaint] - 1
+        if count:
+            self.visit_counts[complaint] = count
+            return
+        # Last visit with this complaint: forget the complaint entirely
+        del self.visit_counts[complaint]
+        del self.visits[complaint]
+        for token in tokenize(complaint):
+            complaints = self.postings[token]
+            complaints.discard(complaint)
+            if not complaints:
+                del self.postings[token]
+        for key in word_starts(complaint):
+            self.trie.remove(key, complaint)
+
+    def matching_complaints(self, query, prefix=False):
+        tokens = tokenize(query)
+        if not tokens:
+            return set(self.visit_counts)
+        if prefix:
+            complaints = self.trie.values_with_prefix(tokens[-1])
+        else:
+            complaints = self.postings.get(tokens[-1], set())
+        return {complaint for complaint in complaints if complaint_matches(tokens, set(tokenize(complaint)), prefix)}
+
+    def search(self, query, department=None, start_date=None, end_date=None, prefix=False):
+        # Visits whose complaint contains every word of query; dates are inclusive
+        first = start_date.toordinal() if start_date is not None else None
+        last = end_date.toordinal() if end_date is not None else None
+        results = []
+        for complaint in self.matching_complaints(query, prefix):
+            departments = self.visits[complaint]
+            buckets = departments.values() if department is None else [departments.get(department, ())]
+            for bucket in buckets:
+                for visit in bucket:
+                    if first is not None or last is not None:
+                        day = visit.visit_time.toordinal()
+                        if (first is not None and day < first) or (last is not None and day > last):
+                            continue
+                    results.append(visit)
+        results.sort(key=attrgetter('visit_time'))
+        return results
+
+    def suggest(self, text, limit=10):
+        # Complaints with a word starting with the last word typed, most frequent first
+        complaints = self.matching_complaints(text, prefix=True) if tokenize(text) else set()
+        return rank_suggestions(self.visit_counts, complaints, limit)
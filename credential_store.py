@@ -0,0 +1,150 @@
+import argparse
+import csv
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from collections import Counter
+
+import metrics
+
+HASH_SCHEME = 'pbkdf2_sha256'
+HASH_ITERATIONS = 200_000
+
+
+def hash_password(password, iterations=HASH_ITERATIONS, salt=None):
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f'{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}'
+
+
+def is_hashed(stored):
+    return stored.startswith(HASH_SCHEME + '$')
+
+
+def hash_iterations(stored):
+    return int(stored.split('$')[1])
+
+
+def verify_password(password, stored, iterations=HASH_ITERATIONS):
+    if not is_hashed(stored):
+        # Rows not converted yet pay the same PBKDF2 cost as hashed rows and unknown usernames,
+        # so response time tells neither which usernames exist nor which rows are plaintext
+        verify_password(password, dummy_hash(iterations))
+        return hmac.compare_digest(password.encode(), stored.encode())
+    _, iterations, salt, expected = stored.split('$')
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+@functools.lru_cache(maxsize=None)
+def dummy_hash(iterations):
+    # Unknown usernames are checked against this so they cost as much as a wrong password;
+    # it must use the iteration count of the stored rows or the two still time differently
+    return hash_password(secrets.token_hex(8), iterations)
+
+
+class CredentialStore:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.users = {}  # username -> (stored password, role)
+        self.iterations = HASH_ITERATIONS  # most common count among the hashed rows
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        mtime = os.stat(self.file_path).st_mtime_ns
+        with self.lock:
+            if mtime == self.mtime:
+                metrics.count('credentials.cache_hits')
+                return
+            metrics.count('credentials.reloads')
+            users = {}
+            iterations = Counter()
+            with open(self.file_path, 'r', newline='') as file:
+                for row in csv.DictReader(file):
+                    stored = row.get('password') or ''
+                    users[row.get('username')] = (stored, row.get('role'))
+                    if is_hashed(stored):
+                        iterations[hash_iterations(stored)] += 1
+            self.users = users
+            self.iterations = iterations.most_common(1)[0][0] if iterations else HASH_ITERATIONS
+            self.mtime = mtime
+
+    def authenticate(self, username, password):
+        self.load()
+        entry = self.users.get(username)
+        if entry is None:
+            verify_password(password, dummy_hash(self.iterations))
+            return None
+        stored, role = entry
+        if not verify_password(password, stored, self.iterations):
+            return None
+        if not is_hashed(stored):
+            # Migrate on login: the row is hashed the first time its password is confirmed
+            self.rehash(username, password, role)
+        return role
+
+    def rehash(self, username, password, role):
+        stored = hash_password(password, self.iterations)
+        with self.lock:
+            try:
+                update_passwords(self.file_path, lambda name, old: stored if name == username and not is_hashed(old) else old)
+                mtime = os.stat(self.file_path).st_mtime_ns
+            except OSError:
+                # A read-only credentials file keeps working in plaintext
+                return
+            if self.mtime is not None:
+                self.users[username] = (stored, role)
+                self.mtime = mtime
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_credential_store(file_path):
+    with _stores_lock:
+        store = _stores.get(file_path)
+        if store is None:
+            store = _stores[file_path] = CredentialStore(file_path)
+        return store
+
+
+def update_passwords(file_path, new_password):
+    # new_password(username, stored) gives the value to keep; returns how many rows changed
+    with open(file_path, 'r', newline='') as file:
+        rows = list(csv.reader(file))
+    header = rows[0]
+    username_column = header.index('username')
+    password_column = header.index('password')
+    changed = 0
+    for row in rows[1:]:
+        if len(row) > password_column:
+            value = new_password(row[username_column], row[password_column])
+            if value != row[password_column]:
+                row[password_column] = value
+                changed += 1
+    if changed:
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'w', newline='') as file:
+            csv.writer(file).writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    return changed
+
+
+def migrate_credentials(file_path, iterations=HASH_ITERATIONS):
+    return update_passwords(file_path, lambda username, stored: stored if is_hashed(stored) else hash_password(stored, iterations))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replace plaintext passwords in a credentials CSV with salted hashes.')
+    parser.add_argument('file_path', nargs='?', default='Project_credentials.csv')
+    parser.add_argument('--iterations', type=int, default=HASH_ITERATIONS)
+    args = parser.parse_args()
+    count = migrate_credentials(args.file_path, args.iterations)
+    print(f"Migrated {count} passwords in {args.file_path}.")
@@ -0,0 +1,250 @@
+import http.client
+import json
+import threading
+from datetime import date
+from urllib.parse import quote, urlencode, urlsplit
+
+from models import Note, Patient, Visit
+from patient_csv import parse_visit_date
+from patient_views import PatientView
+
+DEFAULT_SERVER_URL = 'http://127.0.0.1:8765'
+
+
+class ServerError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def patient_to_json(patient, with_visits=True):
+    data = {
+        'patient_id': patient.patient_id,
+        'gender': patient.gender,
+        'race': patient.race,
+        'age': patient.age,
+        'ethnicity': patient.ethnicity,
+        'insurance': patient.insurance,
+        'zip_code': patient.zip_code,
+    }
+    if with_visits:
+        data['visits'] = [visit_to_json(visit) for visit in patient.visits]
+    return data
+
+
+def visit_to_json(visit):
+    return {
+        'visit_id': visit.visit_id,
+        'visit_time': visit.visit_time.strftime('%Y-%m-%d'),
+        'department': visit.department,
+        'chief_complaint': visit.chief_complaint,
+        'notes': [[note.note_id, note.note_type] for note in visit.notes],
+    }
+
+
+def patient_from_json(data):
+    patient = Patient(data['patient_id'], data['gender'], data['race'], data['age'], data['ethnicity'], data['insurance'], data['zip_code'])
+    for visit_data in data.get('visits', ()):
+        visit = visit_from_json(visit_data)
+        visit.patient = patient
+        patient.visits.append(visit)
+    return patient
+
+
+def visit_from_json(data):
+    visit = Visit(data['visit_id'], parse_visit_date(data['visit_time']), data['department'], data['chief_complaint'])
+    visit.notes = tuple(Note(note_id, note_type) for note_id, note_type in data.get('notes', ()))
+    return visit
+
+
+class RemotePatients:
+    # hospital.patients for a thin client: membership and lookups go to the server. Lookups return
+    # the demographics only, enough to add a visit to; retrieve_patient fetches the visit history.
+    def __init__(self, hospital):
+        self.hospital = hospital
+
+    def __contains__(self, patient_id):
+        return self.hospital.request('HEAD', f'/patients/{quote(patient_id, safe="")}', missing_ok=True) is not None
+
+    def __getitem__(self, patient_id):
+        patient = self.get(patient_id)
+        if patient is None:
+            raise KeyError(patient_id)
+        return patient
+
+    def get(self, patient_id, default=None):
+        data = self.hospital.request('GET', f'/patients/{quote(patient_id, safe="")}?visits=0', missing_ok=True)
+        if data is None:
+            return default
+        patient = patient_from_json(data['patient'])
+        patient.hospital = self.hospital
+        return patient
+
+    def __len__(self):
+        return self.hospital.request('GET', '/patients')['count']
+
+
+class RemoteHospital:
+    # Same interface as Hospital, backed by hospital_server over HTTP/JSON; one connection per thread
+    def __init__(self, server_url=DEFAULT_SERVER_URL, timeout=30):
+        parts = urlsplit(server_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.token = None
+        self.local = threading.local()
+        self.patients = RemotePatients(self)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def request(self, method, path, body=None, missing_ok=False):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body).encode() if body is not None else None
+        for attempt in range(2):
+            connection = self.connection()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = json.loads(response.read() or b'{}')
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closes idle keep-alive connections; reconnect once
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+        if response.status == 404 and missing_ok:
+            return None
+        if response.status >= 400:
+            raise ServerError(response.status, data.get('error', response.reason))
+        return data
+
+    def login(self, username, password):
+        # Returns the role, or None for bad credentials, like validate_login
+        try:
+            data = self.request('POST', '/login', {'username': username, 'password': password})
+        except ServerError as error:
+            if error.status == 401:
+                return None
+            raise
+        self.token = data['token']
+        return data['role']
+
+    def add_patient(self, patient):
+        # One request for the patient and its visits; the server refuses an ID it already holds
+        self.request('POST', '/patients', patient_to_json(patient))
+        patient.hospital = self
+
+    def on_visit_added(self, patient, visit):
+        data = visit_to_json(visit)
+        self.request('POST', f'/patients/{quote(patient.patient_id, safe="")}/visits', {
+            'visit_id': data['visit_id'],
+            'visit_time': data['visit_time'],
+            'visit_department': data['department'],
+            'chief_complaint': data['chief_complaint'],
+            'notes': data['notes'],
+        })
+
+    def on_note_added(self, patient, visit, note):
+        self.request('POST', f'/patients/{quote(patient.patient_id, safe="")}/visits/{quote(visit.visit_id, safe="")}/notes',
+                     {'note_id': note.note_id, 'note_type': note.note_type})
+
+    def discard_patient(self, patient_id):
+        patient = self.patients.get(patient_id)
+        if patient is None or self.request('DELETE', f'/patients/{quote(patient_id, safe="")}', missing_ok=True) is None:
+            return None
+        patient.hospital = None
+        return patient
+
+    def remove_patient(self, patient_id):
+        if self.discard_patient(patient_id) is not None:
+            print("Patient and associated records removed successfully.")
+        else:
+            print("Patient not found.")
+
+    def retrieve_patient(self, patient_id):
+        data = self.request('GET', f'/patients/{quote(patient_id, safe="")}', missing_ok=True)
+        if data is None:
+            return None
+        patient = patient_from_json(data['patient'])
+        patient.hospital = self
+        return patient
+
+    def patient_view(self, patient_id):
+        # Not cached: other clients may change the patient at any time
+        patient = self.retrieve_patient(patient_id)
+        return PatientView(patient) if patient is not None else None
+
+    def key_statistics(self):
+        # The server builds the report and writes the audit row for it
+        return self.request('GET', '/statistics')['result']
+
+    def count_visits_on_date(self, day):
+        return self.request('GET', '/visits/count?' + urlencode({'date': day.strftime('%Y-%m-%d')}))['count']
+
+    def search_visits(self, query, department=None, start_date=None, end_date=None, prefix=False):
+        parameters = {'complaint': query, 'prefix': int(prefix)}
+        if department:
+            parameters['department'] = department
+        if start_date is not None:
+            parameters['since'] = start_date.strftime('%Y-%m-%d')
+        if end_date is not None:
+            parameters['until'] = end_date.strftime('%Y-%m-%d')
+        visits = []
+        for data in self.request('GET', '/visits/search?' + urlencode(parameters))['visits']:
+            visit = visit_from_json(data)
+            visit.patient = Patient(data['patient_id'], None, None, None, None, None, None)
+            visits.append(visit)
+        return visits
+
+    def suggest_complaints(self, text, limit=10):
+        return self.request('GET', '/complaints/suggest?' + urlencode({'text': text, 'limit': limit}))['suggestions']
+
+    def count_by(self, group_by, unit='visit', where=None, start_date=None, end_date=None):
+        if where or start_date is not None or end_date is not None:
+            raise ValueError("Filtered counts are not available from the server")
+        names = (group_by,) if isinstance(group_by, str) else tuple(group_by)
+        data = self.request('GET', '/counts?' + urlencode({'group_by': ','.join(names), 'unit': unit}))
+        counts = {}
+        for labels, count in data['counts']:
+            labels = tuple(date.fromisoformat(value) if name == 'day' else value for name, value in zip(names, labels))
+            counts[labels if len(names) > 1 else labels[0]] = count
+        return counts
+
+    def get_visit_trend(self, grain='month', start_date=None, end_date=None, department=None, insurance=None, split_by=()):
+        if isinstance(department, (list, tuple, set, frozenset)) or isinstance(insurance, (list, tuple, set, frozenset)):
+            raise ValueError("The server filters on one department and one insurance at a time")
+        split_by = (split_by,) if isinstance(split_by, str) else tuple(split_by)
+        parameters = {'grain': grain, 'split_by': ','.join(split_by)}
+        if start_date is not None:
+            parameters['since'] = start_date.strftime('%Y-%m-%d')
+        if end_date is not None:
+            parameters['until'] = end_date.strftime('%Y-%m-%d')
+        if department:
+            parameters['department'] = department
+        if insurance:
+            parameters['insurance'] = insurance
+        series = {}
+        for labels, points in self.request('GET', '/visits/trend?' + urlencode(parameters))['series']:
+            series[tuple(labels) if len(labels) > 1 else labels[0] if labels else ()] = [(date.fromisoformat(start), visits) for start, visits in points]
+        if not split_by:
+            return series.get((), [])
+        return series
+
+    def get_patient_count_by_insurance(self):
+        return self.count_by('insurance', unit='patient')
+
+    def get_patient_count_by_demographics(self, attribute):
+        return self.count_by(attribute, unit='patient')
+
+    def get_patient_count_by_department(self):
+        return self.count_by('department')
+
+    def get_note_count_by_type(self):
+        return dict(self.request('GET', '/notes/counts')['counts'])
@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import gc
+import json
+import secrets
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import metrics
+from hospital_client import patient_to_json, visit_from_json, visit_to_json
+from models import Patient
+from Keerthi_Project import (PatientJournal, add_new_patient, add_note_ui, add_patient_ui, count_visits_ui, generate_key_statistics, load_patient_data,
+                             open_hospital, remove_patient_ui, retrieve_patient_ui, validate_login, write_patient_rows,
+                             write_usage_statistics)
+from task_runner import ReadWriteLock
+
+MAX_BODY = 1 << 20
+IDLE_TIMEOUT = 60
+WRITE_BATCH_LIMIT = 256
+# What each role may do, mirroring the Tk menu
+PERMISSIONS = {
+    'patients': {'clinician', 'nurse'},
+    'count_visits': {'clinician', 'nurse', 'admin'},
+    'statistics': {'admin', 'management'},
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_day(text, name):
+    try:
+        return datetime.strptime(text, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a date in YYYY-MM-DD format")
+
+
+def note_pairs(body):
+    notes = body.get('notes') or []
+    if not isinstance(notes, list) or not all(isinstance(note, list) and len(note) == 2 and all(note) for note in notes):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'notes must be a list of [note_id, note_type] pairs')
+    return [(str(note_id), str(note_type)) for note_id, note_type in notes]
+
+
+def require(body, *names):
+    missing = [name for name in names if body.get(name) in (None, '')]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing fields: {', '.join(missing)}")
+    return [str(body[name]) for name in names]
+
+
+class HospitalServer:
+    # Reads run concurrently under the read side of a readers-writer lock. Writes are queued and
+    # applied in batches under one write lock, with one journal fsync per batch, and each client
+    # gets its answer once its batch is on disk.
+    def __init__(self, hospital, journal=None, workers=8, batch_limit=WRITE_BATCH_LIMIT):
+        self.hospital = hospital
+        self.journal = journal
+        self.lock = ReadWriteLock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batch_limit = batch_limit
+        self.sessions = {}  # token -> (username, role)
+        self.writes = None
+        self.writer_task = None
+
+    async def start(self, host, port):
+        self.writes = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self.write_loop())
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def stop(self):
+        if self.writer_task:
+            self.writer_task.cancel()
+        self.executor.shutdown(wait=True)
+        if self.journal:
+            self.journal.close()
+
+    # Reads and writes
+
+    def read_locked(self, func, *args):
+        with self.lock.read_locked():
+            return func(*args)
+
+    async def read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.read_locked, func, *args)
+
+    async def write(self, func, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((func, args, future))
+        return await future
+
+    async def write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            while len(batch) < self.batch_limit and not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+            try:
+                outcomes = await loop.run_in_executor(self.executor, self.apply_batch, batch)
+            except Exception as error:
+                # The batch as a whole failed (say the journal could not sync): fail its requests, keep writing
+                failure = HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, f'Write failed: {error!r}')
+                outcomes = [(False, failure)] * len(batch)
+            for (_, _, future), (ok, value) in zip(batch, outcomes):
+                if not future.cancelled():
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+
+    def apply_batch(self, batch):
+        outcomes = []
+        # SQLite commits the whole batch as one transaction
+        transaction = getattr(self.hospital, 'transaction', nullcontext)
+        with self.lock.write_locked(), transaction():
+            for func, args, _ in batch:
+                try:
+                    outcomes.append((True, func(*args)))
+                except Exception as error:
+                    outcomes.append((False, error))
+            if self.journal:
+                self.journal.sync()
+        metrics.count('server.write_batches')
+        metrics.count('server.writes', len(batch))
+        return outcomes
+
+    # HTTP
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': 'Malformed request'}, keep_alive=False)
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                try:
+                    status, payload = HTTPStatus.OK, await self.dispatch(method, target, headers, body)
+                except HTTPError as error:
+                    status, payload = error.status, {'error': str(error)}
+                except Exception as error:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': repr(error)}
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self.respond(writer, status, payload, keep_alive, with_body=method != 'HEAD')
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive, with_body=True):
+        data = json.dumps(payload).encode()
+        head = f'HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n'
+        if not keep_alive:
+            head += 'Connection: close\r\n'
+        # HEAD answers carry the headers a GET would, without the body
+        writer.write(head.encode('latin-1') + b'\r\n' + (data if with_body else b''))
+        await writer.drain()
+
+    def authorize(self, headers, permission, action=None):
+        token = headers.get('authorization', '').removeprefix('Bearer ').strip()
+        session = self.sessions.get(token)
+        if session is None:
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, 'Log in first')
+        username, role = session
+        if role not in PERMISSIONS[permission]:
+            raise HTTPError(HTTPStatus.FORBIDDEN, f'{role} users may not do this')
+        if action:
+            write_usage_statistics('usage_statistics.csv', username, role, action)
+        return session
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        path = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            body = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Body must be JSON')
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Body must be a JSON object')
+        hospital = self.hospital
+
+        if method == 'POST' and path == ['login']:
+            username, password = require(body, 'username', 'password')
+            role = await asyncio.get_running_loop().run_in_executor(self.executor, validate_login, username, password)
+            if not role:
+                write_usage_statistics('usage_statistics.csv', username, 'Unknown', 'Failed Login Attempt')
+                raise HTTPError(HTTPStatus.UNAUTHORIZED, 'Invalid username or password')
+            token = secrets.token_hex(16)
+            self.sessions[token] = (username, role)
+            write_usage_statistics('usage_statistics.csv', username, role, 'Login')
+            return {'token': token, 'role': role}
+
+        if path[0] == 'patients':
+            if method == 'GET' and len(path) == 1:
+                self.authorize(headers, 'statistics')
+                return {'count': await self.read(len, hospital.patients)}
+            if method == 'HEAD' and len(path) == 2:
+                # Existence checks before a write; not a retrieval, so not logged
+                self.authorize(headers, 'patients')
+                if not await self.read(hospital.patients.__contains__, path[1]):
+                    raise HTTPError(HTTPStatus.NOT_FOUND, 'Patient not found.')
+                return {}
+            if method == 'GET' and len(path) == 2:
+                # Only the full record with its visit history counts as Retrieve Patient;
+                # visits=0 is the demographics lookup the thin client makes before adding a visit
+                with_visits = query.get('visits') != '0'
+                self.authorize(headers, 'patients', 'Retrieve Patient' if with_visits else None)
+                patient = await self.read(self.patient_json, path[1], with_visits)
+                if not patient:
+                    raise HTTPError(HTTPStatus.NOT_FOUND, 'Patient not found.')
+                return {'patient': patient}
+            if method == 'GET' and len(path) == 3 and path[2] == 'summary':
+                self.authorize(headers, 'patients', 'Retrieve Patient')
+                return {'result': await self.read(retrieve_patient_ui, hospital, path[1])}
+            if method == 'POST' and len(path) == 1:
+                self.authorize(headers, 'patients', 'Add Patient')
+                patient_id, gender, race, age, ethnicity, insurance, zip_code = require(
+                    body, 'patient_id', 'gender', 'race', 'age', 'ethnicity', 'insurance', 'zip_code')
+                if not age.isdigit():
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, 'age must be a whole number')
+                if body.get('visit_time'):
+                    visit_time, visit_department, chief_complaint = require(body, 'visit_time', 'visit_department', 'chief_complaint')
+                    parse_day(visit_time, 'visit_time')
+                    result = await self.write(add_new_patient, hospital, patient_id, gender, race, age, ethnicity, insurance,
+                                              zip_code, visit_time, visit_department, chief_complaint, self.journal)
+                else:
+                    patient = Patient(patient_id, gender, race, int(age), ethnicity, insurance, zip_code)
+                    try:
+                        for visit_data in body.get('visits') or ():
+                            patient.add_visit(visit_from_json(visit_data))
+                    except (AttributeError, KeyError, TypeError, ValueError):
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, 'visits must hold visit_id, visit_time, department and chief_complaint')
+                    result = await self.write(self.add_patient_record, patient)
+                # Checked inside the write batch, so of two concurrent adds of one ID only the first gets in
+                if result == "Patient already exists.":
+                    raise HTTPError(HTTPStatus.CONFLICT, result)
+                return {'result': result}
+            if method == 'POST' and len(path) == 3 and path[2] == 'visits':
+                self.authorize(headers, 'patients', 'Add Visit')
+                visit_time, visit_department, chief_complaint = require(body, 'visit_time', 'visit_department', 'chief_complaint')
+                parse_day(visit_time, 'visit_time')
+                result = await self.write(add_patient_ui, hospital, path[1], visit_time, visit_department, chief_complaint,
+                                          self.journal, body.get('visit_id'), note_pairs(body))
+                if result == "Patient not found.":
+                    raise HTTPError(HTTPStatus.NOT_FOUND, result)
+                return {'result': result}
+            if method == 'POST' and len(path) == 5 and path[2] == 'visits' and path[4] == 'notes':
+                self.authorize(headers, 'patients', 'Add Note')
+                note_id, note_type = require(body, 'note_id', 'note_type')
+                result = await self.write(add_note_ui, hospital, path[1], path[3], note_id, note_type, self.journal)
+                if result == "Visit not found.":
+                    raise HTTPError(HTTPStatus.NOT_FOUND, result)
+                if result == "Note already exists.":
+                    raise HTTPError(HTTPStatus.CONFLICT, result)
+                return {'result': result}
+            if method == 'DELETE' and len(path) == 2:
+                self.authorize(headers, 'patients', 'Remove Patient')
+                result = await self.write(remove_patient_ui, hospital, path[1], self.journal)
+                if result == "Patient not found.":
+                    raise HTTPError(HTTPStatus.NOT_FOUND, result)
+                return {'result': result}
+
+        if method == 'GET' and path == ['visits', 'count']:
+            self.authorize(headers, 'count_visits', 'Count Visits')
+            parse_day(query.get('date'), 'date')
+            count, result = await self.read(self.count_visits, query['date'])
+            return {'count': count, 'result': result}
+
+        if method == 'GET' and path == ['visits', 'search']:
+            self.authorize(headers, 'patients', 'Search Visits')
+            since = parse_day(query['since'], 'since') if query.get('since') else None
+            until = parse_day(query['until'], 'until') if query.get('until') else None
+            visits = await self.read(self.search_json, query.get('complaint', ''), query.get('department') or None, since, until,
+                                     query.get('prefix') == '1')
+            return {'visits': visits}
+
+        if method == 'GET' and path == ['complaints', 'suggest']:
+            self.authorize(headers, 'patients')
+            limit = int(query.get('limit', 10)) if query.get('limit', '10').isdigit() else 10
+            return {'suggestions': await self.read(hospital.suggest_complaints, query.get('text', ''), limit)}
+
+        if method == 'GET' and path == ['statistics']:
+            self.authorize(headers, 'statistics', 'Generate Key Statistics')
+            return {'result': await self.read(generate_key_statistics, hospital)}
+
+        if method == 'GET' and path == ['counts']:
+            self.authorize(headers, 'statistics')
+            names = tuple(name for name in query.get('group_by', '').split(',') if name)
+            if not names:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'group_by is required')
+            try:
+                counts = await self.read(hospital.count_by, names, query.get('unit', 'visit'))
+            except ValueError as error:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+            return {'counts': [[[str(label) for label in (key if len(names) > 1 else (key,))], count] for key, count in counts.items()]}
+
+        if method == 'GET' and path == ['visits', 'trend']:
+            self.authorize(headers, 'statistics')
+            since = parse_day(query['since'], 'since') if query.get('since') else None
+            until = parse_day(query['until'], 'until') if query.get('until') else None
+            split_by = tuple(name for name in query.get('split_by', '').split(',') if name)
+            try:
+                trend = await self.read(hospital.get_visit_trend, query.get('grain', 'month'), since, until,
+                                        query.get('department') or None, query.get('insurance') or None, split_by)
+            except ValueError as error:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+            groups = trend.items() if split_by else [((), trend)]
+            return {'series': [[[label for label in (group if isinstance(group, tuple) else (group,))],
+                                [[start.isoformat(), visits] for start, visits in points]] for group, points in groups]}
+
+        if method == 'GET' and path == ['notes', 'counts']:
+            self.authorize(headers, 'statistics')
+            return {'counts': list((await self.read(hospital.get_note_count_by_type)).items())}
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, f'No route for {method} {url.path}')
+
+    def patient_json(self, patient_id, with_visits):
+        patient = self.hospital.retrieve_patient(patient_id)
+        return patient_to_json(patient, with_visits) if patient else None
+
+    def search_json(self, query, department, start_date, end_date, prefix):
+        visits = self.hospital.search_visits(query, department, start_date, end_date, prefix)
+        return [dict(visit_to_json(visit), patient_id=visit.patient.patient_id) for visit in visits]
+
+    def count_visits(self, visit_date):
+        return self.hospital.count_visits_on_date(datetime.strptime(visit_date, '%Y-%m-%d')), count_visits_ui(self.hospital, visit_date)
+
+    def add_patient_record(self, patient):
+        # A new patient with any visits it came with; an existing one keeps its record and history
+        if patient.patient_id in self.hospital.patients:
+            return "Patient already exists."
+        self.hospital.add_patient(patient)
+        if self.journal:
+            self.journal.log_add_patient(patient)
+        return "Patient added successfully."
+
+
+def load_for_serving(data_path, engine):
+    if engine != 'memory':
+        return open_hospital(data_path, engine), None
+    gc.disable()
+    try:
+        hospital = load_patient_data(data_path)
+        gc.freeze()
+    finally:
+        gc.enable()
+    return hospital, PatientJournal(data_path, hospital, write_patient_rows, sync_each=False)
+
+
+async def serve(host, port, data_path, engine):
+    metrics.configure_from_environment()
+    hospital, journal = load_for_serving(data_path, engine)
+    server = HospitalServer(hospital, journal)
+    listener = await server.start(host, port)
+    # Stop cleanly on SIGTERM too, so the journal is synced and closed
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    print(f"Serving {data_path} ({engine}) on http://{host}:{port}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the patient data to Tk thin clients and other programs over HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', default='Project_patient_information.csv')
+    parser.add_argument('--engine', choices=('memory', 'sqlite'), default='memory')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.data, args.engine))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,192 @@
+import atexit
+import cProfile
+import csv
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
+
+# Set to a .json or .csv path to collect metrics and write them there at exit
+METRICS_ENV = 'CDW_METRICS'
+# Set to a path to run every thread under cProfile and write the merged stats there at exit
+PROFILE_ENV = 'CDW_PROFILE'
+SAMPLE_LIMIT = 10_000  # per timer; once full, new samples overwrite the oldest
+PERCENTILES = (50, 90, 99)
+CSV_COLUMNS = ['metric', 'kind', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'value']
+
+
+class Timer:
+    def __init__(self):
+        self.samples = array('d')
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if len(self.samples) < SAMPLE_LIMIT:
+            self.samples.append(seconds)
+        else:
+            self.samples[self.count % SAMPLE_LIMIT] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentiles(self, wanted=PERCENTILES):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {p: 0.0 for p in wanted}
+        # Nearest rank
+        return {p: ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] for p in wanted}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.add(seconds)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+
+    def summary(self):
+        with self.lock:
+            timers = {}
+            for name, timer in self.timers.items():
+                percentiles = timer.percentiles()
+                timers[name] = {
+                    'count': timer.count,
+                    'total_ms': timer.total * 1e3,
+                    'mean_ms': timer.total / timer.count * 1e3,
+                    **{f'p{p}_ms': value * 1e3 for p, value in percentiles.items()},
+                    'max_ms': timer.max * 1e3,
+                }
+            return {'timers': timers, 'counters': dict(self.counters)}
+
+    def export(self, file_path):
+        summary = self.summary()
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'w', newline='') as file:
+            if file_path.lower().endswith('.csv'):
+                writer = csv.DictWriter(file, CSV_COLUMNS)
+                writer.writeheader()
+                for name, values in summary['timers'].items():
+                    writer.writerow({'metric': name, 'kind': 'timer', **{key: round(value, 4) for key, value in values.items()}})
+                for name, value in summary['counters'].items():
+                    writer.writerow({'metric': name, 'kind': 'counter', 'value': value})
+            else:
+                json.dump(summary, file, indent=2)
+        os.replace(temp_path, file_path)
+
+
+class Profiler:
+    # cProfile only sees the thread it was enabled on, so each thread gets its own profile and
+    # they are merged when saved
+    def __init__(self):
+        self.active = False
+        self.profiles = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.active = True
+        self.profile_thread()
+
+    def profile_thread(self):
+        if not self.active or getattr(self.local, 'profile', None) is not None:
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler already owns this thread
+            return
+        self.local.profile = profile
+        with self.lock:
+            self.profiles.append(profile)
+
+    def save(self, file_path):
+        self.active = False
+        local = getattr(self.local, 'profile', None)
+        if local is not None:
+            local.disable()
+        with self.lock:
+            profiles = list(self.profiles)
+        if profiles:
+            pstats.Stats(*profiles).dump_stats(file_path)
+
+
+registry = MetricsRegistry()
+profiler = Profiler()
+_disabled = nullcontext()
+
+
+def timed(name=None):
+    # Decorator; while metrics are off the wrapper only checks one flag
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.record(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _timing(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.record(name, time.perf_counter() - start)
+
+
+def timer(name):
+    return _timing(name) if registry.enabled else _disabled
+
+
+def count(name, amount=1):
+    if registry.enabled:
+        registry.increment(name, amount)
+
+
+def profile_thread():
+    # Called at the start of work on threads the profiler has not seen yet
+    if profiler.active:
+        profiler.profile_thread()
+
+
+def configure_from_environment(environ=os.environ):
+    metrics_path = environ.get(METRICS_ENV)
+    profile_path = environ.get(PROFILE_ENV)
+    if metrics_path:
+        registry.enabled = True
+        atexit.register(registry.export, metrics_path)
+    if profile_path:
+        profiler.start()
+        atexit.register(profiler.save, profile_path)
@@ -0,0 +1,286 @@
+import gc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+from itertools import chain, repeat
+from operator import attrgetter
+
+from analytics import AnalyticsEngine
+from columnar_store import ColumnStore, make_dictionaries
+from complaint_index import ComplaintIndex
+from note_index import NoteIndex
+from patient_views import PatientViewCache
+from statistics_engine import StatisticsEngine
+from visit_index import VisitDateIndex
+from visit_rollups import VisitRollups
+
+class User:
+    __slots__ = ('username', 'password', 'role')
+
+    def __init__(self, username, password, role):
+        self.username = username
+        self.password = password
+        self.role = role
+
+class Patient:
+    __slots__ = ('patient_id', 'gender', 'race', 'age', 'ethnicity', 'insurance', 'zip_code', 'visits', 'hospital', 'row')
+
+    def __init__(self, patient_id, gender, race, age, ethnicity, insurance, zip_code):
+        self.patient_id = patient_id
+        self.gender = gender
+        self.race = race
+        self.age = age
+        self.ethnicity = ethnicity
+        self.insurance = insurance
+        self.zip_code = zip_code
+        self.visits = []
+        self.hospital = None
+        self.row = None  # position in the hospital's column store
+
+    def add_visit(self, visit):
+        self.visits.append(visit)
+        visit.patient = self
+        if self.hospital is not None:
+            self.hospital.on_visit_added(self, visit)
+
+    def find_visit(self, visit_id):
+        # Newest first: the rows of one visit are written next to each other
+        for visit in reversed(self.visits):
+            if visit.visit_id == visit_id:
+                return visit
+        return None
+
+class Visit:
+    __slots__ = ('visit_id', 'visit_time', 'department', 'chief_complaint', 'notes', 'patient')
+
+    def __init__(self, visit_id, visit_time, department, chief_complaint):
+        self.visit_id = visit_id
+        self.visit_time = visit_time
+        self.department = department
+        self.chief_complaint = chief_complaint
+        # Most visits never get a note, so they share the empty tuple instead of owning a list
+        self.notes = ()
+        self.patient = None
+
+    def find_note(self, note_id):
+        for note in self.notes:
+            if note.note_id == note_id:
+                return note
+        return None
+
+    def add_note(self, note):
+        self.notes = self.notes + (note,)
+        if self.patient is not None and self.patient.hospital is not None:
+            self.patient.hospital.on_note_added(self.patient, self, note)
+
+class Note:
+    __slots__ = ('note_id', 'note_type')
+
+    def __init__(self, note_id, note_type):
+        self.note_id = note_id
+        self.note_type = note_type
+
+class Hospital:
+    def __init__(self):
+        self.patients = {}
+        self.categories = make_dictionaries()
+        self.columns = ColumnStore(self.categories)
+        self.visit_dates = VisitDateIndex()
+        self.notes = NoteIndex(self.categories['note_type'])
+        self.complaints = ComplaintIndex()
+        self.statistics = StatisticsEngine()
+        self.rollups = VisitRollups()
+        self.analytics = AnalyticsEngine(self)
+        self.views = PatientViewCache()
+        self.indexing = True
+
+    @contextmanager
+    def bulk_load(self):
+        # Skip per-record index upkeep while loading and rebuild everything in one pass at the end.
+        # A load only allocates, so cyclic collection is paused too: otherwise every full pass
+        # walks the whole census built so far.
+        self.indexing = False
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            yield self
+        finally:
+            self.indexing = True
+            try:
+                self.rebuild_indexes()
+            finally:
+                if collecting:
+                    gc.enable()
+
+    def rebuild_indexes(self):
+        columns = ColumnStore(self.categories)
+        notes = NoteIndex(self.categories['note_type'])
+        complaints = ComplaintIndex()
+        statistics = StatisticsEngine()
+        rollups = VisitRollups()
+        # Everything is indexed a column at a time through the bulk form of each index
+        patients = list(self.patients.values())
+        rows = range(columns.add_patients(patients), len(columns.patient_alive))
+        for patient, row in zip(patients, rows):
+            patient.row = row
+        statistics.count_patients(patients)
+        visit_counts = list(map(len, map(attrgetter('visits'), patients)))
+        visits = list(chain.from_iterable(map(attrgetter('visits'), patients)))
+        visit_rows = list(chain.from_iterable(map(repeat, rows, visit_counts)))
+        insurances = list(chain.from_iterable(map(repeat, map(attrgetter('insurance'), patients), visit_counts)))
+        ordinals = list(map(date.toordinal, map(attrgetter('visit_time'), visits)))
+        departments = list(map(attrgetter('department'), visits))
+        columns.add_visits(visit_rows, ordinals, departments)
+        complaints.add_visits(visits)
+        statistics.count_visits(visits)
+        rollups.add_days(ordinals, departments, insurances)
+        rollups.derive()
+        for visit in filter(attrgetter('notes'), visits):
+            for note in visit.notes:
+                notes.add(visit.patient, visit, note)
+        self.columns = columns
+        # The date index builds its range-count tree once from the day totals
+        self.visit_dates = VisitDateIndex(Counter(ordinals))
+        self.notes = notes
+        self.complaints = complaints
+        self.statistics = statistics
+        self.rollups = rollups
+
+    def intern_patient(self, patient):
+        categories = self.categories
+        patient.gender = categories['gender'].intern(patient.gender)
+        patient.race = categories['race'].intern(patient.race)
+        patient.ethnicity = categories['ethnicity'].intern(patient.ethnicity)
+        patient.insurance = categories['insurance'].intern(patient.insurance)
+        patient.zip_code = categories['zip_code'].intern(patient.zip_code)
+
+    def intern_visit(self, visit):
+        visit.department = self.categories['department'].intern(visit.department)
+        visit.chief_complaint = self.categories['chief_complaint'].intern(visit.chief_complaint)
+        for note in visit.notes:
+            self.intern_note(note)
+
+    def intern_note(self, note):
+        note.note_type = self.categories['note_type'].intern(note.note_type)
+
+    def add_patient(self, patient):
+        self.discard_patient(patient.patient_id)
+        self.patients[patient.patient_id] = patient
+        patient.hospital = self
+        self.intern_patient(patient)
+        for visit in patient.visits:
+            visit.patient = patient
+            self.intern_visit(visit)
+        if self.indexing:
+            patient.row = self.columns.add_patient(patient)
+            self.statistics.add_patient(patient)
+            for visit in patient.visits:
+                self.columns.add_visit(patient.row, visit)
+                self.visit_dates.add(visit.visit_time)
+                self.complaints.add(visit)
+                self.rollups.add_visit(visit, patient.insurance)
+                for note in visit.notes:
+                    self.notes.add(patient, visit, note)
+
+    def on_visit_added(self, patient, visit):
+        self.views.invalidate(patient.patient_id)
+        self.intern_visit(visit)
+        if self.indexing:
+            self.columns.add_visit(patient.row, visit)
+            self.visit_dates.add(visit.visit_time)
+            self.complaints.add(visit)
+            self.statistics.count_visit(visit)
+            self.rollups.add_visit(visit, patient.insurance)
+            for note in visit.notes:
+                self.notes.add(patient, visit, note)
+
+    def on_note_added(self, patient, visit, note):
+        self.views.invalidate(patient.patient_id)
+        self.intern_note(note)
+        if self.indexing:
+            self.notes.add(patient, visit, note)
+            self.statistics.count_note(note)
+
+    def discard_patient(self, patient_id):
+        patient = self.patients.pop(patient_id, None)
+        if patient is not None:
+            patient.hospital = None
+            self.views.invalidate(patient_id)
+            if self.indexing:
+                self.columns.remove_patient(patient.row)
+                self.statistics.remove_patient(patient)
+                for visit in patient.visits:
+                    self.visit_dates.remove(visit.visit_time)
+                    self.complaints.remove(visit)
+                    self.rollups.remove_visit(visit, patient.insurance)
+                    for note in visit.notes:
+                        self.notes.remove(note)
+                if self.columns.needs_compaction():
+                    self.rebuild_indexes()
+        return patient
+
+    def remove_patient(self, patient_id):
+        if self.discard_patient(patient_id) is not None:
+            print("Patient and associated records removed successfully.")
+        else:
+            print("Patient not found.")
+
+    def retrieve_patient(self, patient_id):
+        if patient_id in self.patients:
+            patient = self.patients[patient_id]
+            return patient
+        else:
+            return None
+
+    def patient_view(self, patient_id):
+        return self.views.get(patient_id, self.retrieve_patient)
+
+    def retrieve_note(self, note_id):
+        # (patient, visit, note) or None
+        return self.notes.get(note_id)
+
+    def find_notes(self, note_type=None, department=None, start_date=None, end_date=None):
+        return self.notes.find(note_type, department, start_date, end_date)
+
+    def search_visits(self, query, department=None, start_date=None, end_date=None, prefix=False):
+        # Visits (oldest first) whose chief complaint contains every word of query
+        return self.complaints.search(query, department, start_date, end_date, prefix)
+
+    def suggest_complaints(self, text, limit=10):
+        return self.complaints.suggest(text, limit)
+
+    def count_visits_on_date(self, date):
+        return self.visit_dates.count_on(date)
+
+    def count_visits_between(self, start_date, end_date):
+        return self.visit_dates.count_between(start_date, end_date)
+
+    def get_visit_histogram(self, start_date, end_date):
+        return self.visit_dates.histogram(start_date, end_date)
+
+    def get_visit_trend(self, grain='month', start_date=None, end_date=None, department=None, insurance=None, split_by=()):
+        return self.rollups.trend(grain, start_date, end_date, department, insurance, split_by)
+
+    def count_by(self, group_by, unit='visit', where=None, start_date=None, end_date=None):
+        return self.analytics.count(group_by, unit, where, start_date, end_date)
+
+    def get_patient_count_by_insurance(self):
+        return self.statistics.patient_count_by('insurance')
+
+    def get_patient_count_by_demographics(self, attribute):
+        if self.statistics.tracks(attribute):
+            return self.statistics.patient_count_by(attribute)
+        count_by_attribute = {}
+        for patient in self.patients.values():
+            value = getattr(patient, attribute)
+            if value not in count_by_attribute:
+                count_by_attribute[value] = 1
+            else:
+                count_by_attribute[value] += 1
+        return count_by_attribute
+
+    def get_patient_count_by_department(self):
+        return self.statistics.visit_count_by_department()
+
+    def get_note_count_by_type(self):
+        return self.statistics.note_count_by_type()
@@ -0,0 +1,58 @@
+class NoteIndex:
+    # Notes by Note_ID and by dictionary-encoded note type and department, so a query only walks
+    # the notes of the type and department asked for instead of every patient, visit and note
+    def __init__(self, note_types):
+        self.note_types = note_types  # CategoryDictionary shared with the hospital
+        self.by_id = {}  # note_id -> (patient, visit, note)
+        self.by_type = []  # type code -> {department: {note_id: (patient, visit, note)}}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, patient, visit, note):
+        previous = self.by_id.get(note.note_id)
+        if previous is not None:
+            self.remove(previous[2])
+        code = self.note_types.encode(note.note_type)
+        while len(self.by_type) <= code:
+            self.by_type.append({})
+        entry = (patient, visit, note)
+        self.by_id[note.note_id] = entry
+        self.by_type[code].setdefault(visit.department, {})[note.note_id] = entry
+
+    def remove(self, note):
+        entry = self.by_id.get(note.note_id)
+        if entry is not None and entry[2] is note:
+            del self.by_id[note.note_id]
+            departments = self.by_type[self.note_types.encode(note.note_type)]
+            notes = departments[entry[1].department]
+            del notes[note.note_id]
+            if not notes:
+                del departments[entry[1].department]
+
+    def get(self, note_id):
+        return self.by_id.get(note_id)
+
+    def find(self, note_type=None, department=None, start_date=None, end_date=None):
+        # Returns (patient, visit, note) entries; dates are inclusive
+        if note_type is None:
+            groups = self.by_type
+        else:
+            code = self.note_types.codes.get(note_type)
+            if code is None or code >= len(self.by_type):
+                return []
+            groups = [self.by_type[code]]
+        if department is None:
+            entries = [entry for departments in groups for notes in departments.values() for entry in notes.values()]
+        else:
+            entries = [entry for departments in groups for entry in departments.get(department, {}).values()]
+        first = start_date.toordinal() if start_date is not None else None
+        last = end_date.toordinal() if end_date is not None else None
+        if first is None and last is None:
+            return entries
+        results = []
+        for entry in entries:
+            day = entry[1].visit_time.toordinal()
+            if (first is None or day >= first) and (last is None or day <= last):
+                results.append(entry)
+        return results
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+
+JOURNAL_SUFFIX = '.journal'
+COMPACTING_SUFFIX = '.journal.compacting'
+
+
+def journal_paths(data_path):
+    # Older segment first: a compaction that was interrupted leaves its segment behind
+    return [data_path + COMPACTING_SUFFIX, data_path + JOURNAL_SUFFIX]
+
+
+def read_journal(data_path):
+    for path in journal_paths(data_path):
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as file:
+            for line in file:
+                if not line.endswith('\n'):
+                    # Torn write from a crash mid-append, the record never completed
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    break
+
+
+def fsync_directory(path):
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(data_path, patients, write_rows):
+    # Write to a temp file and rename over the original so readers never see a partial CSV
+    temp_path = data_path + '.tmp'
+    with open(temp_path, 'w', newline='') as file:
+        write_rows(file, patients)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, data_path)
+    fsync_directory(data_path)
+
+
+class PatientJournal:
+    def __init__(self, data_path, hospital, write_rows, compact_threshold=1000, sync_each=True):
+        self.data_path = data_path
+        self.journal_path = data_path + JOURNAL_SUFFIX
+        self.compacting_path = data_path + COMPACTING_SUFFIX
+        self.hospital = hospital
+        self.write_rows = write_rows
+        self.compact_threshold = compact_threshold
+        # With sync_each off the caller groups records and calls sync() once per group
+        self.sync_each = sync_each
+        self.lock = threading.Lock()
+        self.compaction_thread = None
+        self.records_since_compaction = 0
+
+        if os.path.exists(self.compacting_path):
+            # The hospital was loaded with this segment replayed, so a fresh snapshot covers it
+            write_snapshot(self.data_path, list(self.hospital.patients.values()), self.write_rows)
+            open(self.journal_path, 'w').close()
+            os.remove(self.compacting_path)
+        elif os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r') as file:
+                self.records_since_compaction = sum(1 for _ in file)
+        self.file = open(self.journal_path, 'a')
+
+    def append(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            if self.sync_each:
+                os.fsync(self.file.fileno())
+            self.records_since_compaction += 1
+            if self.records_since_compaction >= self.compact_threshold:
+                self.start_compaction()
+
+    def log_add_patient(self, patient):
+        self.append({
+            'op': 'add_patient',
+            'patient_id': patient.patient_id,
+            'gender': patient.gender,
+            'race': patient.race,
+            'age': patient.age,
+            'ethnicity': patient.ethnicity,
+            'insurance': patient.insurance,
+            'zip_code': patient.zip_code,
+        })
+        # A patient added together with visits replays as the patient followed by each visit
+        for visit in patient.visits:
+            self.log_add_visit(patient.patient_id, visit)
+
+    def log_add_visit(self, patient_id, visit):
+        self.append({
+            'op': 'add_visit',
+            'patient_id': patient_id,
+            'visit_id': visit.visit_id,
+            'visit_time': visit.visit_time.strftime('%Y-%m-%d'),
+            'department': visit.department,
+            'chief_complaint': visit.chief_complaint,
+            'notes': [[note.note_id, note.note_type] for note in visit.notes],
+        })
+
+    def log_add_note(self, patient_id, visit_id, note):
+        self.append({
+            'op': 'add_note',
+            'patient_id': patient_id,
+            'visit_id': visit_id,
+            'note_id': note.note_id,
+            'note_type': note.note_type,
+        })
+
+    def log_remove_patient(self, patient_id):
+        self.append({'op': 'remove_patient', 'patient_id': patient_id})
+
+    def sync(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def start_compaction(self):
+        # Caller holds self.lock
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return
+        if os.path.exists(self.compacting_path):
+            return
+        # Patients are captured now; anything that changes afterwards lands in the new segment
+        patients = list(self.hospital.patients.values())
+        if not self.sync_each:
+            os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.journal_path, self.compacting_path)
+        self.file = open(self.journal_path, 'a')
+        self.records_since_compaction = 0
+        self.compaction_thread = threading.Thread(target=self.compact, args=(patients,))
+        self.compaction_thread.start()
+
+    def compact(self, patients):
+        write_snapshot(self.data_path, patients, self.write_rows)
+        os.remove(self.compacting_path)
+
+    def wait_for_compaction(self):
+        thread = self.compaction_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self):
+        self.wait_for_compaction()
+        with self.lock:
+            if not self.sync_each:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            self.file.close()
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import os
+import pickle
+import re
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from models import Hospital, Note, Patient, Visit
+from patient_csv import PATIENT_COLUMNS, iter_patient_batches
+from patient_journal import write_snapshot
+
+PARTITIONS = ('year', 'department')
+# Patients with no visits have neither a year nor a department
+NO_VISITS_SHARD = 'no_visits'
+
+
+def shard_partition(patient_id, partitions):
+    # Stable across processes, unlike hash() of a str
+    return zlib.crc32(patient_id.encode()) % partitions
+
+
+def partition_path(directory, index, partition):
+    return os.path.join(directory, f'{index}_{partition}.pickle')
+
+
+def split_shard(job):
+    # Runs in a worker process: parses one shard and writes its rows out in one file per
+    # partition of Patient_IDs, so every patient's rows end up with the same merge worker
+    file_path, directory, index, partitions = job
+    buckets = [[] for _ in range(partitions)]
+    for batch in iter_patient_batches(file_path, batch_size=100_000):
+        for row in batch:
+            if row[0]:
+                buckets[shard_partition(row[0], partitions)].append(row)
+    for partition, rows in enumerate(buckets):
+        with open(partition_path(directory, index, partition), 'wb') as file:
+            pickle.dump(rows, file, pickle.HIGHEST_PROTOCOL)
+    return file_path
+
+
+def merge_partition(job):
+    # Runs in a worker process: merges one partition from every shard, in shard order
+    directory, shard_count, partition = job
+    rows = []
+    for index in range(shard_count):
+        with open(partition_path(directory, index, partition), 'rb') as file:
+            rows.extend(pickle.load(file))
+    return merge_patient_rows(rows)
+
+
+def merge_patient_rows(rows):
+    # Shards overlap at the edges of each feed: the first row seen for a Patient_ID keeps its
+    # demographics, and a visit or note already merged for that patient is not added twice.
+    # Returns the merged patients as column batches, which pickle much smaller than row tuples.
+    patients = {}  # patient_id -> (demographics, {visit_id: (visit fields, {note_id: note_type})})
+    for patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_id, visit_time, visit_department, chief_complaint, note_id, note_type in rows:
+        if not patient_id:
+            continue
+        patient = patients.get(patient_id)
+        if patient is None:
+            patient = patients[patient_id] = ((gender, race, age, ethnicity, insurance, zip_code), {})
+        if not (visit_id and visit_time and visit_department and chief_complaint):
+            continue
+        visits = patient[1]
+        visit = visits.get(visit_id)
+        if visit is None:
+            visit = visits[visit_id] = ((visit_time, visit_department, chief_complaint), {})
+        if note_id and note_type and note_id not in visit[1]:
+            visit[1][note_id] = note_type
+    patient_columns = ([], [], [], [], [], [], [], [])  # patient_id, demographics, visit count
+    visit_columns = ([], [], [], [], [])  # visit_id, visit_time, department, chief complaint, note count
+    note_columns = ([], [])  # note_id, note_type
+    for patient_id, (demographics, visits) in patients.items():
+        patient_columns[0].append(patient_id)
+        for column, value in zip(patient_columns[1:7], demographics):
+            column.append(value)
+        patient_columns[7].append(len(visits))
+        for visit_id, (fields, notes) in visits.items():
+            visit_columns[0].append(visit_id)
+            for column, value in zip(visit_columns[1:4], fields):
+                column.append(value)
+            visit_columns[4].append(len(notes))
+            note_columns[0].extend(notes)
+            note_columns[1].extend(notes.values())
+    return patient_columns, visit_columns, note_columns
+
+
+def add_patient_columns(hospital, columns):
+    patient_columns, visit_columns, note_columns = columns
+    visits = zip(*visit_columns)
+    notes = zip(*note_columns)
+    for patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_count in zip(*patient_columns):
+        patient = Patient(patient_id, gender, race, age, ethnicity, insurance, zip_code)
+        for visit_id, visit_time, department, chief_complaint, note_count in islice(visits, visit_count):
+            visit = Visit(visit_id, visit_time, department, chief_complaint)
+            if note_count:
+                visit.notes = tuple(Note(note_id, note_type) for note_id, note_type in islice(notes, note_count))
+            patient.visits.append(visit)
+        hospital.add_patient(patient)
+
+
+def run_parallel(func, items, workers):
+    if workers == 1 or len(items) < 2:
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map keeps the input order, so the merge is the same whatever finishes first
+        yield from executor.map(func, items)
+
+
+def import_patient_shards(file_paths, workers=None, progress=None):
+    # Parses every shard in a process pool, then merges each partition of Patient_IDs in the pool
+    # too; the parent only builds the merged patients into one Hospital
+    file_paths = list(file_paths)
+    partitions = workers or os.cpu_count() or 1
+    hospital = Hospital()
+    with hospital.bulk_load():
+        if partitions == 1:
+            rows = []
+            for done, file_path in enumerate(file_paths, 1):
+                for batch in iter_patient_batches(file_path, batch_size=100_000):
+                    rows.extend(batch)
+                if progress:
+                    progress(done, len(file_paths))
+            add_patient_columns(hospital, merge_patient_rows(rows))
+            return hospital
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = [(file_path, directory, index, partitions) for index, file_path in enumerate(file_paths)]
+            for done, _ in enumerate(run_parallel(split_shard, jobs, workers), 1):
+                if progress:
+                    progress(done, len(file_paths))
+            jobs = [(directory, len(file_paths), partition) for partition in range(partitions)]
+            for columns in run_parallel(merge_partition, jobs, workers):
+                add_patient_columns(hospital, columns)
+    return hospital
+
+
+def write_shard_rows(file, rows):
+    writer = csv.writer(file)
+    writer.writerow(PATIENT_COLUMNS)
+    for patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_id, visit_time, visit_department, chief_complaint, note_id, note_type in rows:
+        writer.writerow([patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_id,
+                         visit_time.strftime('%Y-%m-%d') if visit_time else '', visit_department, chief_complaint, note_id, note_type])
+
+
+def write_shard(job):
+    file_path, rows = job
+    write_snapshot(file_path, rows, write_shard_rows)
+    return file_path, len(rows)
+
+
+def shard_name(key):
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(key)).strip('_') or 'unknown'
+
+
+def partition_rows(hospital, partition):
+    if partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition: {partition}")
+    shards = {}
+    for patient in hospital.patients.values():
+        demographics = (patient.patient_id, patient.gender, patient.race, patient.age, patient.ethnicity, patient.insurance, patient.zip_code)
+        if not patient.visits:
+            shards.setdefault(NO_VISITS_SHARD, []).append(demographics + ('', None, '', '', '', ''))
+        for visit in patient.visits:
+            key = visit.visit_time.year if partition == 'year' else visit.department
+            rows = shards.setdefault(key, [])
+            visit_fields = demographics + (visit.visit_id, visit.visit_time, visit.department, visit.chief_complaint)
+            if not visit.notes:
+                rows.append(visit_fields + ('', ''))
+            for note in visit.notes:
+                rows.append(visit_fields + (note.note_id, note.note_type))
+    return shards
+
+
+def export_patient_shards(hospital, directory, partition='year', prefix='patients', workers=None):
+    # Writes one CSV per year of Visit_time or per department, each readable by read_patient_data;
+    # returns {path: row count}
+    os.makedirs(directory, exist_ok=True)
+    jobs = [(os.path.join(directory, f'{prefix}_{shard_name(key)}.csv'), rows)
+            for key, rows in partition_rows(hospital, partition).items()]
+    # Largest shards first so one big year does not start last and hold up the pool
+    jobs.sort(key=lambda job: len(job[1]), reverse=True)
+    return dict(run_parallel(write_shard, jobs, workers))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge CSV shards into one patient file, or split one into shards.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    merge = commands.add_parser('import', help='merge shards into a patient CSV, replacing its contents')
+    merge.add_argument('file_path')
+    merge.add_argument('shards', nargs='+')
+    split = commands.add_parser('export', help='write a patient CSV out as shards')
+    split.add_argument('file_path')
+    split.add_argument('directory')
+    split.add_argument('--by', choices=PARTITIONS, default='year')
+    for command in (merge, split):
+        command.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    from Keerthi_Project import read_patient_data, write_patient_data
+    if args.command == 'import':
+        hospital = import_patient_shards(args.shards, workers=args.workers)
+        write_patient_data(args.file_path, hospital)
+        print(f"Merged {len(args.shards)} shards into {args.file_path}: {len(hospital.patients)} patients.")
+    else:
+        written = export_patient_shards(read_patient_data(args.file_path), args.directory, args.by, workers=args.workers)
+        print(f"Wrote {len(written)} shards to {args.directory}.")
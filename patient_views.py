@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+import metrics
+
+VIEW_CACHE_SIZE = 256
+
+
+def format_day(day):
+    # Same text as strftime('%Y-%m-%d') for four-digit years, without the format parsing
+    return f"{day.year:04d}-{day.month:02d}-{day.day:02d}"
+
+
+def render_patient_header(patient):
+    return (
+        f"Patient information for ID: {patient.patient_id}\n"
+        f"Gender: {patient.gender}\n"
+        f"Race: {patient.race}\n"
+        f"Age: {patient.age}\n"
+        f"Ethnicity: {patient.ethnicity}\n"
+        f"Insurance: {patient.insurance}\n"
+        f"Zip code: {patient.zip_code}\n"
+        "Visits:\n"
+    )
+
+
+def render_visit(visit):
+    lines = [
+        f"Visit ID: {visit.visit_id}\n",
+        f"Visit time: {format_day(visit.visit_time)}\n",
+        f"Department: {visit.department}\n",
+        f"Chief complaint: {visit.chief_complaint}\n",
+    ]
+    lines.extend(f"Note {note.note_id}: {note.note_type}\n" for note in visit.notes)
+    return "".join(lines)
+
+
+class PatientView:
+    # Renders a patient's visits on demand; opening the view costs the same for 1 visit or 10,000
+    def __init__(self, patient):
+        self.patient = patient
+        self.header = render_patient_header(patient)
+        self.rendered = {}  # visit position -> text
+        self.full_text = None
+
+    def __len__(self):
+        return len(self.patient.visits)
+
+    def visit_text(self, index):
+        text = self.rendered.get(index)
+        if text is None:
+            text = self.rendered[index] = render_visit(self.patient.visits[index])
+        return text
+
+    def page(self, start, count):
+        return "".join(self.visit_text(index) for index in range(max(start, 0), min(start + count, len(self))))
+
+    def text(self):
+        if self.full_text is None:
+            self.full_text = self.header + self.page(0, len(self))
+        return self.full_text
+
+
+class PatientViewCache:
+    # Least recently used patient views; the engine drops a patient's view whenever its visits change
+    def __init__(self, capacity=VIEW_CACHE_SIZE):
+        self.capacity = capacity
+        self.views = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, patient_id, retrieve_patient):
+        with self.lock:
+            view = self.views.get(patient_id)
+            if view is not None:
+                self.views.move_to_end(patient_id)
+                self.hits += 1
+                metrics.count('patient_view.cache_hits')
+                return view
+        patient = retrieve_patient(patient_id)
+        if patient is None:
+            return None
+        view = PatientView(patient)
+        metrics.count('patient_view.cache_misses')
+        with self.lock:
+            self.misses += 1
+            self.views[patient_id] = view
+            self.views.move_to_end(patient_id)
+            while len(self.views) > self.capacity:
+                self.views.popitem(last=False)
+        return view
+
+    def invalidate(self, patient_id):
+        with self.lock:
+            self.views.pop(patient_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
@@ -0,0 +1,506 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+from analytics import PATIENT_DIMENSIONS, VISIT_DIMENSIONS
+from complaint_index import complaint_matches, suggest_from_counts, tokenize
+from models import Note, Patient, Visit
+from patient_views import PatientViewCache
+from patient_csv import iter_patient_batches, parse_visit_date
+from visit_rollups import check_trend_arguments, period_index, trend_result
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    gender TEXT, race TEXT, age INTEGER, ethnicity TEXT, insurance TEXT, zip_code TEXT
+);
+CREATE TABLE IF NOT EXISTS visits (
+    patient_id TEXT NOT NULL,
+    visit_id TEXT NOT NULL,
+    visit_time TEXT NOT NULL,
+    department TEXT NOT NULL,
+    chief_complaint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_patient_id ON visits (patient_id);
+CREATE INDEX IF NOT EXISTS visits_visit_time ON visits (visit_time);
+CREATE INDEX IF NOT EXISTS visits_department ON visits (department);
+CREATE INDEX IF NOT EXISTS visits_chief_complaint ON visits (chief_complaint);
+CREATE UNIQUE INDEX IF NOT EXISTS visits_patient_visit ON visits (patient_id, visit_id);
+CREATE TABLE IF NOT EXISTS notes (
+    patient_id TEXT NOT NULL,
+    visit_id TEXT NOT NULL,
+    note_id TEXT NOT NULL,
+    note_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_patient_id ON notes (patient_id);
+CREATE UNIQUE INDEX IF NOT EXISTS notes_note_id ON notes (note_id);
+CREATE INDEX IF NOT EXISTS notes_note_type ON notes (note_type);
+CREATE TABLE IF NOT EXISTS visit_rollups (
+    day TEXT NOT NULL,
+    department TEXT NOT NULL,
+    insurance TEXT NOT NULL,
+    visits INTEGER NOT NULL,
+    PRIMARY KEY (day, department, insurance)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS visits_rollup_insert AFTER INSERT ON visits BEGIN
+    INSERT INTO visit_rollups VALUES (NEW.visit_time, NEW.department,
+        COALESCE((SELECT insurance FROM patients WHERE patient_id = NEW.patient_id), ''), 1)
+        ON CONFLICT (day, department, insurance) DO UPDATE SET visits = visits + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS visits_rollup_delete AFTER DELETE ON visits BEGIN
+    UPDATE visit_rollups SET visits = visits - 1 WHERE day = OLD.visit_time AND department = OLD.department
+        AND insurance = COALESCE((SELECT insurance FROM patients WHERE patient_id = OLD.patient_id), '');
+    DELETE FROM visit_rollups WHERE day = OLD.visit_time AND department = OLD.department AND visits <= 0;
+END;
+"""
+# PRAGMA user_version: 1 once repeated visit rows are gone and visits are unique per patient,
+# 2 once notes dropped by the first importer have been read back from the CSV
+SCHEMA_VERSION = 2
+# The first importer wrote one visit row per CSV row, so a visit with several notes appears several times
+REMOVE_REPEATED_VISITS = """
+DELETE FROM visits WHERE rowid NOT IN (SELECT MIN(rowid) FROM visits GROUP BY patient_id, visit_id)
+"""
+# Only for visits still held; a patient removed since the import stays removed
+BACKFILL_NOTE = """
+INSERT OR IGNORE INTO notes SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM visits WHERE patient_id = ? AND visit_id = ?)
+"""
+# Databases created before the rollup table existed are filled in once when opened
+FILL_ROLLUPS = """
+INSERT INTO visit_rollups
+SELECT v.visit_time, v.department, COALESCE(p.insurance, ''), COUNT(*)
+FROM visits v LEFT JOIN patients p ON p.patient_id = v.patient_id
+GROUP BY v.visit_time, v.department, COALESCE(p.insurance, '')
+"""
+# First day of each period as 'YYYY-MM-DD', for visit_rollups.day
+PERIOD_SQL = {
+    'day': 'day',
+    'week': "date(day, '-' || ((CAST(strftime('%w', day) AS INTEGER) + 6) % 7) || ' days')",
+    'month': "substr(day, 1, 7) || '-01'",
+    'year': "substr(day, 1, 4) || '-01-01'",
+}
+
+INSERT_PATIENT = "INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_VISIT = "INSERT INTO visits VALUES (?, ?, ?, ?, ?)"
+INSERT_NOTE = "INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?)"
+DELETE_PATIENT = "DELETE FROM patients WHERE patient_id = ?"
+DELETE_VISITS = "DELETE FROM visits WHERE patient_id = ?"
+DELETE_NOTES = "DELETE FROM notes WHERE patient_id = ?"
+SELECT_PATIENT = "SELECT gender, race, age, ethnicity, insurance, zip_code FROM patients WHERE patient_id = ?"
+SELECT_VISITS = "SELECT visit_id, visit_time, department, chief_complaint FROM visits WHERE patient_id = ? ORDER BY rowid"
+SELECT_NOTES = "SELECT visit_id, note_id, note_type FROM notes WHERE patient_id = ? ORDER BY rowid"
+
+# SQL producing the same labels as AnalyticsEngine for each dimension
+DIMENSION_SQL = {
+    'gender': 'p.gender',
+    'race': 'p.race',
+    'ethnicity': 'p.ethnicity',
+    'insurance': 'p.insurance',
+    'age_band': "((p.age / 10) * 10) || '-' || ((p.age / 10) * 10 + 9)",
+    'department': 'v.department',
+    'year': 'CAST(substr(v.visit_time, 1, 4) AS INTEGER)',
+    'month': 'substr(v.visit_time, 1, 7)',
+    'day': 'v.visit_time',
+    'weekday': "CASE strftime('%w', v.visit_time) WHEN '0' THEN 'Sunday' WHEN '1' THEN 'Monday' WHEN '2' THEN 'Tuesday' "
+               "WHEN '3' THEN 'Wednesday' WHEN '4' THEN 'Thursday' WHEN '5' THEN 'Friday' ELSE 'Saturday' END",
+}
+
+
+def visit_row(patient_id, visit):
+    return (patient_id, visit.visit_id, visit.visit_time.strftime('%Y-%m-%d'), visit.department, visit.chief_complaint)
+
+
+def note_rows(patient_id, visit):
+    return [(patient_id, visit.visit_id, note.note_id, note.note_type) for note in visit.notes]
+
+
+class SQLitePatients:
+    # Read-only mapping over the patients table, so code written against hospital.patients keeps working
+    def __init__(self, hospital):
+        self.hospital = hospital
+
+    def __contains__(self, patient_id):
+        return self.hospital.query_one("SELECT 1 FROM patients WHERE patient_id = ?", (patient_id,)) is not None
+
+    def __getitem__(self, patient_id):
+        patient = self.hospital.retrieve_patient(patient_id)
+        if patient is None:
+            raise KeyError(patient_id)
+        return patient
+
+    def get(self, patient_id, default=None):
+        patient = self.hospital.retrieve_patient(patient_id)
+        return default if patient is None else patient
+
+    def __len__(self):
+        return self.hospital.query_one("SELECT COUNT(*) FROM patients")[0]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return [row[0] for row in self.hospital.query_all("SELECT patient_id FROM patients ORDER BY rowid")]
+
+    def values(self):
+        for patient_id in self.keys():
+            patient = self.hospital.retrieve_patient(patient_id)
+            if patient is not None:
+                yield patient
+
+    def items(self):
+        for patient in self.values():
+            yield patient.patient_id, patient
+
+
+class SQLiteHospital:
+    def __init__(self, db_path, source_path=None):
+        # source_path is the CSV the database was imported from, read again by the notes migration
+        self.db_path = db_path
+        # Task runner workers share the connection; the lock keeps one statement in flight at a time
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        self.in_transaction = False
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.migrate(source_path)
+        with self.transaction() as connection:
+            if connection.execute("SELECT 1 FROM visit_rollups LIMIT 1").fetchone() is None:
+                connection.execute(FILL_ROLLUPS)
+        self.patients = SQLitePatients(self)
+        self.indexing = True
+        self.views = PatientViewCache()
+        self.data_version = None
+
+    def migrate(self, source_path):
+        with self.transaction() as connection:
+            existing = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visits'").fetchone()
+            version = connection.execute("PRAGMA user_version").fetchone()[0] if existing else SCHEMA_VERSION
+            if version < 1:
+                # Before the unique index goes on. The old index on visit_id alone also refused the
+                # same visit ID under two patients.
+                connection.execute(REMOVE_REPEATED_VISITS)
+                connection.execute("DROP INDEX IF EXISTS visits_visit_id")
+                version = 1
+        self.connection.executescript(SCHEMA)
+        with self.transaction() as connection:
+            if version < 2 and source_path is not None and os.path.exists(source_path):
+                for batch in iter_patient_batches(source_path):
+                    connection.executemany(BACKFILL_NOTE, [
+                        (row[0], row[7], row[11], row[12], row[0], row[7]) for row in batch if row[0] and row[11] and row[12]])
+                version = 2
+            # Without the CSV the notes are read back the next time it is given
+            connection.execute(f"PRAGMA user_version = {version}")
+
+    def close(self):
+        self.connection.close()
+
+    def query_one(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchone()
+
+    def query_all(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            if self.in_transaction:
+                yield self.connection
+                return
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.in_transaction = True
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            else:
+                self.connection.execute("COMMIT")
+            finally:
+                self.in_transaction = False
+
+    @contextmanager
+    def bulk_load(self):
+        # One transaction for the whole load instead of one per row
+        with self.transaction():
+            yield self
+
+    def clear(self):
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM notes")
+            connection.execute("DELETE FROM visits")
+            connection.execute("DELETE FROM patients")
+            connection.execute("DELETE FROM visit_rollups")
+        self.views.clear()
+
+    def add_patient(self, patient):
+        with self.transaction() as connection:
+            self.views.invalidate(patient.patient_id)
+            connection.execute(DELETE_NOTES, (patient.patient_id,))
+            connection.execute(DELETE_VISITS, (patient.patient_id,))
+            connection.execute(INSERT_PATIENT, (patient.patient_id, patient.gender, patient.race, patient.age,
+                                                patient.ethnicity, patient.insurance, patient.zip_code))
+            connection.executemany(INSERT_VISIT, [visit_row(patient.patient_id, visit) for visit in patient.visits])
+            for visit in patient.visits:
+                visit.patient = patient
+                connection.executemany(INSERT_NOTE, note_rows(patient.patient_id, visit))
+        patient.hospital = self
+
+    def add_patient_rows(self, rows):
+        # Parsed CSV rows as produced by patient_csv.iter_patient_batches
+        patients = []
+        visits = []
+        notes = []
+        for patient_id, gender, race, age, ethnicity, insurance, zip_code, visit_id, visit_time, department, chief_complaint, note_id, note_type in rows:
+            if patient_id:
+                patients.append((patient_id, gender, race, age, ethnicity, insurance, zip_code))
+                if visit_id and visit_time and department and chief_complaint:
+                    visits.append((patient_id, visit_id, visit_time.strftime('%Y-%m-%d'), department, chief_complaint))
+                    if note_id and note_type:
+                        notes.append((patient_id, visit_id, note_id, note_type))
+        with self.transaction() as connection:
+            connection.executemany("INSERT OR IGNORE INTO patients VALUES (?, ?, ?, ?, ?, ?, ?)", patients)
+            # A visit with several notes spans several rows
+            connection.executemany("INSERT OR IGNORE INTO visits VALUES (?, ?, ?, ?, ?)", visits)
+            connection.executemany("INSERT OR IGNORE INTO notes VALUES (?, ?, ?, ?)", notes)
+        self.views.clear()
+
+    def on_visit_added(self, patient, visit):
+        self.views.invalidate(patient.patient_id)
+        with self.transaction() as connection:
+            connection.execute(INSERT_VISIT, visit_row(patient.patient_id, visit))
+            connection.executemany(INSERT_NOTE, note_rows(patient.patient_id, visit))
+
+    def on_note_added(self, patient, visit, note):
+        self.views.invalidate(patient.patient_id)
+        with self.transaction() as connection:
+            connection.execute(INSERT_NOTE, (patient.patient_id, visit.visit_id, note.note_id, note.note_type))
+
+    def discard_patient(self, patient_id):
+        with self.transaction() as connection:
+            patient = self.retrieve_patient(patient_id)
+            if patient is not None:
+                self.views.invalidate(patient_id)
+                connection.execute(DELETE_NOTES, (patient_id,))
+                connection.execute(DELETE_VISITS, (patient_id,))
+                connection.execute(DELETE_PATIENT, (patient_id,))
+                patient.hospital = None
+        return patient
+
+    def remove_patient(self, patient_id):
+        if self.discard_patient(patient_id) is not None:
+            print("Patient and associated records removed successfully.")
+        else:
+            print("Patient not found.")
+
+    def retrieve_patient(self, patient_id):
+        with self.lock:
+            row = self.connection.execute(SELECT_PATIENT, (patient_id,)).fetchone()
+            if row is None:
+                return None
+            visits = self.connection.execute(SELECT_VISITS, (patient_id,)).fetchall()
+            notes = self.connection.execute(SELECT_NOTES, (patient_id,)).fetchall()
+        patient = Patient(patient_id, *row)
+        by_id = {}
+        for visit_id, visit_time, department, chief_complaint in visits:
+            visit = by_id[visit_id] = Visit(visit_id, parse_visit_date(visit_time), department, chief_complaint)
+            visit.patient = patient
+            patient.visits.append(visit)
+        for visit_id, note_id, note_type in notes:
+            visit = by_id.get(visit_id)
+            if visit is not None:
+                visit.notes = visit.notes + (Note(note_id, note_type),)
+        # Attached after the visits so that only new visits are written back
+        patient.hospital = self
+        return patient
+
+    def patient_view(self, patient_id):
+        # data_version moves when another program commits to the database, and then any cached
+        # view may be out of date
+        data_version = self.query_one("PRAGMA data_version")[0]
+        if data_version != self.data_version:
+            self.views.clear()
+            self.data_version = data_version
+        return self.views.get(patient_id, self.retrieve_patient)
+
+    def retrieve_note(self, note_id):
+        row = self.query_one("SELECT patient_id, visit_id FROM notes WHERE note_id = ?", (note_id,))
+        patient = self.retrieve_patient(row[0]) if row else None
+        visit = patient.find_visit(row[1]) if patient else None
+        note = visit.find_note(note_id) if visit else None
+        return (patient, visit, note) if note else None
+
+    def find_notes(self, note_type=None, department=None, start_date=None, end_date=None):
+        conditions = []
+        parameters = []
+        if note_type is not None:
+            conditions.append("n.note_type = ?")
+            parameters.append(note_type)
+        if department is not None:
+            conditions.append("v.department = ?")
+            parameters.append(department)
+        if start_date is not None:
+            conditions.append("v.visit_time >= ?")
+            parameters.append(start_date.strftime('%Y-%m-%d'))
+        if end_date is not None:
+            conditions.append("v.visit_time <= ?")
+            parameters.append(end_date.strftime('%Y-%m-%d'))
+        sql = "SELECT n.patient_id, n.visit_id, n.note_id FROM notes n JOIN visits v ON v.patient_id = n.patient_id AND v.visit_id = n.visit_id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        results = []
+        patients = {}
+        for patient_id, visit_id, note_id in self.query_all(sql + " ORDER BY n.rowid", parameters):
+            if patient_id not in patients:
+                patients[patient_id] = self.retrieve_patient(patient_id)
+            patient = patients[patient_id]
+            visit = patient.find_visit(visit_id) if patient else None
+            note = visit.find_note(note_id) if visit else None
+            if note is not None:
+                results.append((patient, visit, note))
+        return results
+
+    def complaint_counts(self):
+        return dict(self.query_all("SELECT chief_complaint, COUNT(*) FROM visits GROUP BY chief_complaint"))
+
+    def search_visits(self, query, department=None, start_date=None, end_date=None, prefix=False):
+        # Distinct complaints are matched in Python, the same way the in-memory index does, and
+        # the visits are then fetched through the complaint index
+        tokens = tokenize(query)
+        complaints = [complaint for complaint in self.complaint_counts() if complaint_matches(tokens, set(tokenize(complaint)), prefix)]
+        if not complaints:
+            return []
+        conditions = [f"chief_complaint IN ({', '.join('?' * len(complaints))})"]
+        parameters = list(complaints)
+        if department is not None:
+            conditions.append("department = ?")
+            parameters.append(department)
+        if start_date is not None:
+            conditions.append("visit_time >= ?")
+            parameters.append(start_date.strftime('%Y-%m-%d'))
+        if end_date is not None:
+            conditions.append("visit_time <= ?")
+            parameters.append(end_date.strftime('%Y-%m-%d'))
+        rows = self.query_all(f"SELECT patient_id, visit_id FROM visits WHERE {' AND '.join(conditions)} ORDER BY visit_time, rowid", parameters)
+        patients = {}
+        results = []
+        for patient_id, visit_id in rows:
+            if patient_id not in patients:
+                patients[patient_id] = self.retrieve_patient(patient_id)
+            visit = patients[patient_id].find_visit(visit_id) if patients[patient_id] else None
+            if visit is not None:
+                results.append(visit)
+        return results
+
+    def suggest_complaints(self, text, limit=10):
+        return suggest_from_counts(self.complaint_counts(), text, limit)
+
+    def count_visits_on_date(self, day):
+        return self.query_one("SELECT COUNT(*) FROM visits WHERE visit_time = ?", (day.strftime('%Y-%m-%d'),))[0]
+
+    def count_visits_between(self, start_date, end_date):
+        return self.query_one("SELECT COUNT(*) FROM visits WHERE visit_time BETWEEN ? AND ?",
+                              (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))[0]
+
+    def get_visit_histogram(self, start_date, end_date):
+        rows = self.query_all("SELECT visit_time, COUNT(*) FROM visits WHERE visit_time BETWEEN ? AND ? GROUP BY visit_time ORDER BY visit_time",
+                              (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
+        return [(date.fromisoformat(day), count) for day, count in rows]
+
+    def get_visit_trend(self, grain='month', start_date=None, end_date=None, department=None, insurance=None, split_by=()):
+        # Same answers as VisitRollups.trend, read from the visit_rollups table the triggers keep up to date
+        split_by = check_trend_arguments(grain, split_by)
+        if start_date is None or end_date is None:
+            low, high = self.query_one("SELECT MIN(day), MAX(day) FROM visit_rollups")
+            if low is None:
+                return {} if split_by else []
+            start_date = start_date if start_date is not None else date.fromisoformat(low)
+            end_date = end_date if end_date is not None else date.fromisoformat(high)
+        first = start_date.toordinal()
+        last = end_date.toordinal()
+        if first > last:
+            return {} if split_by else []
+        conditions = ["day BETWEEN ? AND ?"]
+        parameters = [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+        for name, wanted in (('department', department), ('insurance', insurance)):
+            if wanted is not None:
+                wanted = list(wanted) if isinstance(wanted, (list, tuple, set, frozenset)) else [wanted]
+                conditions.append(f"{name} IN ({', '.join('?' * len(wanted))})")
+                parameters.extend(wanted)
+        columns = [PERIOD_SQL[grain]] + list(split_by)
+        rows = self.query_all(f"SELECT {', '.join(columns)}, SUM(visits) FROM visit_rollups WHERE {' AND '.join(conditions)} "
+                              f"GROUP BY {', '.join(columns)}", parameters)
+        first_index = period_index(grain, first)
+        length = period_index(grain, last) - first_index + 1
+        series = {} if split_by else {(): [0] * length}
+        for period, *labels, visits in rows:
+            group = series.get(tuple(labels))
+            if group is None:
+                group = series[tuple(labels)] = [0] * length
+            group[period_index(grain, max(date.fromisoformat(period).toordinal(), first)) - first_index] += visits
+        return trend_result(grain, first_index, series, split_by)
+
+    def count_by(self, group_by, unit='visit', where=None, start_date=None, end_date=None):
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        group_by = tuple(group_by)
+        where = where or {}
+        for name in group_by + tuple(where):
+            if name not in VISIT_DIMENSIONS and name not in PATIENT_DIMENSIONS:
+                raise ValueError(f"Unknown dimension: {name}")
+        if unit not in ('visit', 'patient'):
+            raise ValueError(f"Unknown unit: {unit}")
+        visit_level = unit == 'visit' or start_date is not None or end_date is not None or any(
+            name in VISIT_DIMENSIONS for name in group_by + tuple(where))
+
+        conditions = []
+        parameters = []
+        for name, wanted in where.items():
+            wanted = list(wanted) if isinstance(wanted, (list, tuple, set, frozenset)) else [wanted]
+            wanted = [value.strftime('%Y-%m-%d') if isinstance(value, date) else value for value in wanted]
+            conditions.append(f"{DIMENSION_SQL[name]} IN ({', '.join('?' * len(wanted))})")
+            parameters.extend(wanted)
+        if start_date is not None:
+            conditions.append("v.visit_time >= ?")
+            parameters.append(start_date.strftime('%Y-%m-%d'))
+        if end_date is not None:
+            conditions.append("v.visit_time <= ?")
+            parameters.append(end_date.strftime('%Y-%m-%d'))
+
+        columns = [DIMENSION_SQL[name] for name in group_by]
+        if not visit_level:
+            counter = "COUNT(*)" if unit == 'visit' else "COUNT(DISTINCT p.patient_id)"
+            source = "patients p"
+        else:
+            counter = "COUNT(*)" if unit == 'visit' else "COUNT(DISTINCT v.patient_id)"
+            source = "visits v"
+            if any(name in PATIENT_DIMENSIONS for name in group_by + tuple(where)):
+                source += " JOIN patients p ON p.patient_id = v.patient_id"
+        sql = f"SELECT {', '.join(columns + [counter])} FROM {source}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        # First-seen order, matching the insertion-ordered dicts of the in-memory engine
+        sql += f" GROUP BY {', '.join(columns)} ORDER BY MIN({'v' if visit_level else 'p'}.rowid)"
+
+        counts = {}
+        for row in self.query_all(sql, parameters):
+            labels = tuple(date.fromisoformat(value) if name == 'day' else value for name, value in zip(group_by, row))
+            counts[labels if len(group_by) > 1 else labels[0]] = row[-1]
+        return counts
+
+    def get_patient_count_by_insurance(self):
+        return self.count_by('insurance', unit='patient')
+
+    def get_patient_count_by_demographics(self, attribute):
+        if attribute not in DIMENSION_SQL and attribute not in ('age', 'zip_code'):
+            raise ValueError(f"Unknown attribute: {attribute}")
+        column = DIMENSION_SQL.get(attribute, f'p.{attribute}')
+        return dict(self.query_all(f"SELECT {column}, COUNT(*) FROM patients p GROUP BY {column}"))
+
+    def get_patient_count_by_department(self):
+        return self.count_by('department')
+
+    def get_note_count_by_type(self):
+        return dict(self.query_all("SELECT note_type, COUNT(*) FROM notes GROUP BY note_type ORDER BY MIN(rowid)"))
@@ -0,0 +1,87 @@
+from collections import Counter
+from itertools import chain
+from operator import attrgetter
+
+PATIENT_DIMENSIONS = ('insurance', 'gender', 'race', 'ethnicity')
+
+
+def increment(counts, key):
+    counts[key] = counts.get(key, 0) + 1
+
+
+def decrement(counts, key):
+    count = counts.get(key, 0) - 1
+    if count > 0:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
+
+
+class StatisticsEngine:
+    def __init__(self):
+        self.patient_counts = {attribute: {} for attribute in PATIENT_DIMENSIONS}
+        self.department_counts = {}
+        self.note_type_counts = {}
+        self.total_patients = 0
+        self.total_visits = 0
+        self.total_notes = 0
+
+    def tracks(self, attribute):
+        return attribute in self.patient_counts
+
+    def count_patient(self, patient):
+        self.total_patients += 1
+        for attribute, counts in self.patient_counts.items():
+            increment(counts, getattr(patient, attribute))
+
+    def count_patients(self, patients):
+        # Bulk form of count_patient
+        self.total_patients += len(patients)
+        for attribute, counts in self.patient_counts.items():
+            for value, count in Counter(map(attrgetter(attribute), patients)).items():
+                counts[value] = counts.get(value, 0) + count
+
+    def count_visit(self, visit):
+        self.total_visits += 1
+        increment(self.department_counts, visit.department)
+        for note in visit.notes:
+            self.count_note(note)
+
+    def count_visits(self, visits):
+        # Bulk form of count_visit
+        self.total_visits += len(visits)
+        for department, count in Counter(map(attrgetter('department'), visits)).items():
+            self.department_counts[department] = self.department_counts.get(department, 0) + count
+        note_types = Counter(map(attrgetter('note_type'), chain.from_iterable(map(attrgetter('notes'), visits))))
+        for note_type, count in note_types.items():
+            self.total_notes += count
+            self.note_type_counts[note_type] = self.note_type_counts.get(note_type, 0) + count
+
+    def count_note(self, note):
+        self.total_notes += 1
+        increment(self.note_type_counts, note.note_type)
+
+    def add_patient(self, patient):
+        self.count_patient(patient)
+        for visit in patient.visits:
+            self.count_visit(visit)
+
+    def remove_patient(self, patient):
+        self.total_patients -= 1
+        for attribute, counts in self.patient_counts.items():
+            decrement(counts, getattr(patient, attribute))
+        for visit in patient.visits:
+            self.total_visits -= 1
+            decrement(self.department_counts, visit.department)
+            for note in visit.notes:
+                self.total_notes -= 1
+                decrement(self.note_type_counts, note.note_type)
+
+    def patient_count_by(self, attribute):
+        return dict(self.patient_counts[attribute])
+
+    def visit_count_by_department(self):
+        return dict(self.department_counts)
+
+    def note_count_by_type(self):
+        return dict(self.note_type_counts)
@@ -0,0 +1,124 @@
+import argparse
+import csv
+import random
+import string
+from datetime import date, timedelta
+
+# Weights loosely follow the shipped sample and a general hospital's case mix
+GENDERS = (('Male', 36), ('Female', 38), ('Non-binary', 4))
+RACES = (('White', 40), ('Black', 18), ('Asian', 12), ('Pacific Islanders', 6), ('Native Americans', 6), ('Unknown', 18))
+ETHNICITIES = (('Non-Hispanic', 55), ('Hispanic', 25), ('Other', 8), ('Unknown', 12))
+INSURANCES = (('Blueshield', 40), ('Medicaid', 20), ('None', 15), ('Unknown', 10))
+DEPARTMENTS = (
+    ('Emergency department', 30), ('Radiology', 12), ('Cardiology', 10), ('Surgery', 10), ('Pediatrics', 10),
+    ('Psychiatry', 7), ('Neorology', 6), ('Head and Neck', 7), ('Obstetrics and gynaecology', 8),
+)
+COMPLAINTS = (
+    ('chest pain', 12), ('back pain', 12), ('injury', 14), ('infection', 12), ('fever', 10), ('headache', 9),
+    ('fatigue', 8), ('bleeding', 6), ('shortness of breath', 7), ('abdominal pain', 10), ('Unknown', 10),
+)
+NOTE_TYPES = (('progress note', 40), ('admission note', 15), ('discharge note', 15), ('social work note', 15), ('oncology note', 15))
+# Most patients come once; a few come back many times
+VISITS_PER_PATIENT = ((1, 45), (2, 20), (3, 12), (4, 8), (5, 5), (6, 4), (8, 3), (12, 2), (20, 1))
+NOTES_PER_VISIT = ((0, 20), (1, 50), (2, 20), (3, 10))
+ROLES = (('clinician', 40), ('nurse', 40), ('admin', 10), ('management', 10))
+FIRST_DAY = date(2000, 1, 1)
+YEARS = 20
+# The layout of the shipped Project_patient_information.csv, leading index column included
+CSV_HEADER = ['', 'Patient_ID', 'Visit_ID', 'Visit_time', 'Visit_department', 'Race', 'Gender', 'Ethnicity', 'Age', 'Zip_code',
+              'Insurance', 'Chief_complaint', 'Note_ID', 'Note_type']
+CREDENTIALS_HEADER = ['', 'username', 'password', 'role']
+
+
+class WeightedChoice:
+    # rng.choices with precomputed cumulative weights, the hot path of the generator
+    def __init__(self, pairs):
+        self.values = [value for value, _ in pairs]
+        self.cum_weights = []
+        total = 0
+        for _, weight in pairs:
+            total += weight
+            self.cum_weights.append(total)
+
+    def pick(self, rng):
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+def age_and_insurance(rng, insurances):
+    age = min(100, int(rng.betavariate(2, 2.5) * 101))
+    # Nearly everyone 65 and over is on Medicare
+    if age >= 65 and rng.random() < 0.9:
+        return age, 'Medicare'
+    return age, insurances.pick(rng)
+
+
+def iter_synthetic_rows(rows, seed=0):
+    # Yields rows in CSV_HEADER order; the same rows and seed always give the same data
+    rng = random.Random(seed)
+    genders, races, ethnicities = WeightedChoice(GENDERS), WeightedChoice(RACES), WeightedChoice(ETHNICITIES)
+    insurances, departments, complaints = WeightedChoice(INSURANCES), WeightedChoice(DEPARTMENTS), WeightedChoice(COMPLAINTS)
+    note_types, visit_counts, note_counts = WeightedChoice(NOTE_TYPES), WeightedChoice(VISITS_PER_PATIENT), WeightedChoice(NOTES_PER_VISIT)
+    # Unpadded like the shipped file ('2002-5-21')
+    days = [FIRST_DAY + timedelta(days=offset) for offset in range((date(FIRST_DAY.year + YEARS, 1, 1) - FIRST_DAY).days)]
+    day_text = [f'{day.year}-{day.month}-{day.day}' for day in days]
+    written = 0
+    patient_number = visit_number = note_number = 0
+    while written < rows:
+        patient_id = str(100000 + patient_number)
+        patient_number += 1
+        age, insurance = age_and_insurance(rng, insurances)
+        race, gender, ethnicity, zip_code = races.pick(rng), genders.pick(rng), ethnicities.pick(rng), str(rng.randint(53001, 54990))
+        for day in sorted(rng.randrange(len(days)) for _ in range(visit_counts.pick(rng))):
+            visit_id = str(100000 + visit_number)
+            visit_number += 1
+            visit = (patient_id, visit_id, day_text[day], departments.pick(rng), race, gender, ethnicity, age, zip_code, insurance, complaints.pick(rng))
+            notes = note_counts.pick(rng)
+            if not notes:
+                yield (written,) + visit + ('', '')
+                written += 1
+            for _ in range(notes):
+                yield (written,) + visit + (str(100000 + note_number), note_types.pick(rng))
+                written += 1
+                note_number += 1
+                if written >= rows:
+                    return
+            if written >= rows:
+                return
+
+
+def write_synthetic_data(file_path, rows, seed=0, progress=None):
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for row in iter_synthetic_rows(rows, seed):
+            writer.writerow(row)
+            if progress and row[0] % 1_000_000 == 0:
+                progress(row[0], rows)
+
+
+def random_token(rng):
+    return ''.join(rng.choices(string.ascii_uppercase + string.digits, k=7))
+
+
+def write_synthetic_credentials(file_path, users, seed=0):
+    # Plain-text passwords, like the shipped file before migrate_credentials has run
+    rng = random.Random(seed)
+    roles = WeightedChoice(ROLES)
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CREDENTIALS_HEADER)
+        for i in range(users):
+            writer.writerow([i, random_token(rng), random_token(rng), roles.pick(rng)])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write deterministic synthetic patient and credential CSVs in the shipped layout.')
+    parser.add_argument('rows', type=int, help='patient CSV rows (one per visit note)')
+    parser.add_argument('--output', default='synthetic_patient_information.csv')
+    parser.add_argument('--credentials', help='also write a credentials CSV here')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_data(args.output, args.rows, args.seed, progress=lambda done, total: print(f"{done}/{total} rows"))
+    if args.credentials:
+        write_synthetic_credentials(args.credentials, args.users, args.seed)
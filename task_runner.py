@@ -0,0 +1,142 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import metrics
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class ReadWriteLock:
+    # Many readers or one writer; waiting writers block new readers so writes are not starved
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read_locked(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+class Task:
+    def __init__(self, runner, on_progress):
+        self.runner = runner
+        self.on_progress = on_progress
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise TaskCancelled()
+
+    def report_progress(self, *args):
+        # Called from the worker; doubles as a cancellation point for long loops
+        self.check_cancelled()
+        if self.on_progress:
+            self.runner.results.put((self, self.on_progress, args))
+
+
+class TaskRunner:
+    # Runs work on a thread pool and hands results back to the Tk thread through root.after polling
+    def __init__(self, root, max_workers=4, poll_interval=20):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = ReadWriteLock()
+        self.results = queue.Queue()
+        self.closed = False
+        self.root.after(self.poll_interval, self.poll)
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_progress=None, access=None, with_task=False):
+        # access='read' or 'write' takes the shared Hospital lock around func
+        task = Task(self, on_progress)
+
+        def run():
+            if task.cancelled.is_set():
+                return
+            metrics.profile_thread()
+            call_args = (task,) + args if with_task else args
+            try:
+                with metrics.timer(task_name):
+                    result = self.call(func, call_args, access)
+            except TaskCancelled:
+                return
+            except Exception as error:
+                self.results.put((task, on_error or self.report_error, (error,)))
+                return
+            if on_done:
+                self.results.put((task, on_done, (result,)))
+
+        task_name = 'task.' + getattr(func, '__name__', type(func).__name__)
+        self.executor.submit(run)
+        return task
+
+    def call(self, func, call_args, access):
+        if access == 'write':
+            with self.lock.write_locked():
+                return func(*call_args)
+        elif access == 'read':
+            with self.lock.read_locked():
+                return func(*call_args)
+        else:
+            return func(*call_args)
+
+    def poll(self):
+        # Always on the Tk thread, so callbacks may touch widgets
+        try:
+            while True:
+                try:
+                    task, callback, args = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                if task.cancelled.is_set():
+                    continue
+                # Time spent here is time the Tk thread is not handling events
+                with metrics.timer('tk.callback'):
+                    try:
+                        callback(*args)
+                    except Exception as error:
+                        # One failing callback (say, on a window already closed) must not stop delivery
+                        self.report_error(error)
+        finally:
+            if not self.closed:
+                self.root.after(self.poll_interval, self.poll)
+
+    def report_error(self, error):
+        print(f"Background task failed: {error!r}")
+
+    def shutdown(self, wait=True):
+        self.closed = True
+        self.executor.shutdown(wait=wait)
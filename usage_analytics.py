@@ -0,0 +1,209 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+from bisect import bisect_right
+
+FAILED_LOGIN = 'Failed Login Attempt'
+STATE_VERSION = 2
+FINGERPRINT_BYTES = 256
+
+
+def empty_state():
+    return {
+        'version': STATE_VERSION,
+        'started': False,
+        'fingerprint': None,  # fingerprint() of the file offset points into
+        'newest_segment': None,  # identity() of the newest rotated segment
+        'offset': 0,
+        'per_user_day': {},  # username -> {day: actions}
+        'failed_by_hour': {},  # 'YYYY-MM-DD HH' -> failed logins
+        'by_role': {},
+        'hours': [],  # sorted hour buckets of the live file ...
+        'hour_offsets': [],  # ... and the byte offset where each one starts
+    }
+
+
+def open_log(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def same_log(saved, current):
+    # Whether current is the file saved was taken from, perhaps grown since. Rows can repeat, so
+    # the first bytes alone are not enough and the inode has to match too.
+    return (saved['device'], saved['inode']) == (current['device'], current['inode']) and current['head'].startswith(saved['head'])
+
+
+class UsageAnalyzer:
+    # Reads the rows write_usage_statistics appends; only bytes past the saved offset are parsed
+    def __init__(self, log_path, state_path=None):
+        self.log_path = log_path
+        self.state_path = state_path or log_path + '.index.json'
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return empty_state()
+        return state if state.get('version') == STATE_VERSION else empty_state()
+
+    def save_state(self):
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.state, file)
+        os.replace(temp_path, self.state_path)
+
+    def fingerprint(self, path=None):
+        with open_log(path or self.log_path) as file:
+            head = file.read(FINGERPRINT_BYTES)
+            stat = os.fstat(file.fileno())
+        return {'device': stat.st_dev, 'inode': stat.st_ino, 'head': head.hex()}
+
+    def identity(self, path):
+        # Rotation renames segments, which keeps their inode, and each rotation makes a new .1
+        stat = os.stat(path)
+        return [stat.st_dev, stat.st_ino]
+
+    def rotated_segments(self):
+        # Newest first, as audit_log.AuditLogger.rotate numbers them
+        segments = []
+        for index in range(1, 1000):
+            path = next((path for path in (f'{self.log_path}.{index}', f'{self.log_path}.{index}.gz') if os.path.exists(path)), None)
+            if path is None:
+                break
+            segments.append(path)
+        return segments
+
+    def update(self):
+        state = self.state
+        live = os.path.exists(self.log_path)
+        segments = self.rotated_segments()
+        newest = self.identity(segments[0]) if segments else None
+        first = not state['started']
+        if first:
+            # Rows already rotated away before the first update are not counted
+            state['started'] = True
+            state['newest_segment'] = newest
+        size = os.path.getsize(self.log_path) if live else 0
+        fingerprint = self.fingerprint() if live else None
+        rows = 0
+        rotated = newest != state['newest_segment'] or (state['fingerprint'] is not None and (
+            not live or size < state['offset'] or not same_log(state['fingerprint'], fingerprint)))
+        if rotated:
+            # The log was rotated or truncated. Rows written since the last update may have been
+            # rotated away, so finish the segment that was live then, and any rotated after it,
+            # before starting on the new file. Those are the segments newer than the newest one then.
+            identities = [self.identity(path) for path in segments]
+            fresh = segments[:identities.index(state['newest_segment'])] if state['newest_segment'] in identities else segments
+            if fresh:
+                rows += self.read_rows(fresh[-1], state['offset'])[0]
+                for newer in reversed(fresh[:-1]):
+                    rows += self.read_rows(newer, 0)[0]
+            state['offset'] = 0
+            state['hours'] = []
+            state['hour_offsets'] = []
+        state['fingerprint'] = fingerprint
+        state['newest_segment'] = newest
+        if size > state['offset']:
+            read, state['offset'] = self.read_rows(self.log_path, state['offset'], live=True)
+            rows += read
+        elif not rotated and not first:
+            return 0
+        self.save_state()
+        return rows
+
+    def read_rows(self, path, offset, live=False):
+        # Returns the rows added and the offset after the last complete line
+        rows = 0
+        with open_log(path) as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break  # the writer has not finished this line yet
+                row = next(csv.reader([line.decode()]), None)
+                if row and len(row) >= 4:
+                    # Only the live file is indexed by hour for events_between
+                    self.add_row(row, offset if live else None)
+                    rows += 1
+                offset += len(line)
+        return rows, offset
+
+    def add_row(self, row, offset=None):
+        username, role, timestamp, action = row[:4]
+        state = self.state
+        hour = timestamp[:13]
+        if offset is not None and (not state['hours'] or hour > state['hours'][-1]):
+            state['hours'].append(hour)
+            state['hour_offsets'].append(offset)
+        days = state['per_user_day'].setdefault(username, {})
+        day = timestamp[:10]
+        days[day] = days.get(day, 0) + 1
+        state['by_role'][role] = state['by_role'].get(role, 0) + 1
+        if action == FAILED_LOGIN:
+            state['failed_by_hour'][hour] = state['failed_by_hour'].get(hour, 0) + 1
+
+    def actions_per_user_per_day(self, username=None):
+        self.update()
+        per_user_day = self.state['per_user_day']
+        users = [username] if username is not None else per_user_day
+        return {(user, day): count for user in users for day, count in sorted(per_user_day.get(user, {}).items())}
+
+    def failed_logins_by_hour(self, hour_of_day=False):
+        self.update()
+        counts = self.state['failed_by_hour']
+        if not hour_of_day:
+            return dict(sorted(counts.items()))
+        by_hour = {}
+        for hour, count in counts.items():
+            by_hour[int(hour[11:13])] = by_hour.get(int(hour[11:13]), 0) + count
+        return dict(sorted(by_hour.items()))
+
+    def most_active_roles(self, limit=None):
+        self.update()
+        return sorted(self.state['by_role'].items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def events_between(self, start, end):
+        # start and end are 'YYYY-MM-DD HH:MM:SS' strings or datetimes, inclusive; covers the live file
+        self.update()
+        start = start if isinstance(start, str) else start.strftime('%Y-%m-%d %H:%M:%S')
+        end = end if isinstance(end, str) else end.strftime('%Y-%m-%d %H:%M:%S')
+        hours = self.state['hours']
+        position = bisect_right(hours, start[:13]) - 1
+        offset = self.state['hour_offsets'][position] if position >= 0 else 0
+        events = []
+        if not os.path.exists(self.log_path):
+            return events
+        with open(self.log_path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break
+                row = next(csv.reader([line.decode()]), None)
+                if not row or len(row) < 4:
+                    continue
+                timestamp = row[2]
+                if timestamp[:13] > end[:13]:
+                    break
+                if start <= timestamp <= end:
+                    events.append(row[:4])
+        return events
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarise usage_statistics.csv.')
+    parser.add_argument('log_path', nargs='?', default='usage_statistics.csv')
+    args = parser.parse_args()
+    analyzer = UsageAnalyzer(args.log_path)
+    print(f"Processed {analyzer.update()} new rows.")
+    print("Most active roles:")
+    for role, count in analyzer.most_active_roles():
+        print(f"{role}: {count}")
+    print("\nFailed logins by hour of day:")
+    for hour, count in analyzer.failed_logins_by_hour(hour_of_day=True).items():
+        print(f"{hour:02d}:00: {count}")
+    print("\nActions per user per day:")
+    for (username, day), count in analyzer.actions_per_user_per_day().items():
+        print(f"{username} {day}: {count}")
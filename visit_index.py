@@ -0,0 +1,98 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+# Days of room left on either side of the held range, so visits a little outside it need no resize
+MARGIN_DAYS = 366
+
+
+class VisitDateIndex:
+    # Visits per day, plus a Fenwick tree of the same counts over a run of consecutive day
+    # ordinals. Every add and remove updates both, so range counts stay O(log days) however
+    # inserts and queries interleave, and queries never modify the index.
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})  # day ordinal -> number of visits
+        self.days = sorted(self.counts)  # distinct day ordinals, sorted
+        self.total = sum(self.counts.values())
+        self.first = 0  # ordinal at tree position 1
+        self.tree = array('q', [0])
+        if self.days:
+            self.build(self.days[0] - MARGIN_DAYS, self.days[-1] - self.days[0] + 1 + 2 * MARGIN_DAYS)
+
+    def __len__(self):
+        return self.total
+
+    def build(self, first, size):
+        # Linear-time construction from counts: each slot passes its sum on to its parent
+        tree = array('q', bytes(8 * (size + 1)))
+        for ordinal, count in self.counts.items():
+            tree[ordinal - first + 1] += count
+        for position in range(1, size + 1):
+            parent = position + (position & -position)
+            if parent <= size:
+                tree[parent] += tree[position]
+        self.first = first
+        self.tree = tree
+
+    def update(self, ordinal, delta):
+        position = ordinal - self.first + 1
+        size = len(self.tree) - 1
+        if position < 1 or position > size:
+            # Outside the tree: rebuild it with the range doubled, which counts already includes
+            low = min(ordinal, self.first if size else ordinal)
+            high = max(ordinal, self.first + size - 1 if size else ordinal)
+            span = high - low + 1
+            self.build(low - max(MARGIN_DAYS, span // 2), span + 2 * max(MARGIN_DAYS, span // 2))
+            return
+        tree = self.tree
+        while position <= size:
+            tree[position] += delta
+            position += position & -position
+
+    def prefix(self, ordinal):
+        # Visits on days up to and including ordinal
+        position = min(ordinal - self.first + 1, len(self.tree) - 1)
+        if position < 1:
+            return 0
+        tree = self.tree
+        total = 0
+        while position > 0:
+            total += tree[position]
+            position -= position & -position
+        return total
+
+    def add(self, visit_time):
+        ordinal = visit_time.toordinal()
+        count = self.counts.get(ordinal, 0)
+        if count == 0:
+            insort(self.days, ordinal)
+        self.counts[ordinal] = count + 1
+        self.total += 1
+        self.update(ordinal, 1)
+
+    def remove(self, visit_time):
+        ordinal = visit_time.toordinal()
+        count = self.counts.get(ordinal, 0)
+        if count == 0:
+            return
+        if count == 1:
+            del self.counts[ordinal]
+            del self.days[bisect_left(self.days, ordinal)]
+        else:
+            self.counts[ordinal] = count - 1
+        self.total -= 1
+        self.update(ordinal, -1)
+
+    def count_on(self, day):
+        return self.counts.get(day.toordinal(), 0)
+
+    def count_between(self, start, end):
+        # Inclusive of both start and end
+        if start > end:
+            return 0
+        return self.prefix(end.toordinal()) - self.prefix(start.toordinal() - 1)
+
+    def histogram(self, start, end):
+        first = bisect_left(self.days, start.toordinal())
+        last = bisect_right(self.days, end.toordinal())
+        return [(date.fromordinal(day), self.counts[day]) for day in self.days[first:last]]
@@ -0,0 +1,246 @@
+from array import array
+from collections import Counter
+from datetime import date
+from operator import add
+
+GRAINS = ('day', 'week', 'month', 'year')
+ROLLUP_DIMENSIONS = ('department', 'insurance')
+
+_coarser_indexes = {}  # day ordinal -> (week, month, year) indexes
+
+
+def coarser_indexes(ordinal):
+    # Periods are numbered consecutively within each grain: days by ordinal, weeks (Monday to
+    # Sunday) by (ordinal - 1) // 7, months as year * 12 + month - 1 and years by year
+    indexes = _coarser_indexes.get(ordinal)
+    if indexes is None:
+        day = date.fromordinal(ordinal)
+        indexes = _coarser_indexes[ordinal] = ((ordinal - 1) // 7, day.year * 12 + day.month - 1, day.year)
+    return indexes
+
+
+def period_index(grain, ordinal):
+    if grain == 'day':
+        return ordinal
+    return coarser_indexes(ordinal)[GRAINS.index(grain) - 1]
+
+
+def period_bounds(grain, index):
+    # First and last day ordinal of the period
+    if grain == 'day':
+        return index, index
+    if grain == 'week':
+        return index * 7 + 1, index * 7 + 7
+    if grain == 'month':
+        year, month = divmod(index, 12)
+        following = date(year + 1, 1, 1) if month == 11 else date(year, month + 2, 1)
+        return date(year, month + 1, 1).toordinal(), following.toordinal() - 1
+    return date(index, 1, 1).toordinal(), date(index, 12, 31).toordinal()
+
+
+def zeros(length):
+    return array('i', bytes(4 * length))
+
+
+def window(values, first, start, stop):
+    # values[i] belongs to period first + i; returns the periods start..stop as a list, 0 where not held
+    low = max(start, first)
+    high = min(stop, first + len(values) - 1)
+    if low > high:
+        return [0] * (stop - start + 1)
+    return [0] * (low - start) + values[low - first:high - first + 1].tolist() + [0] * (stop - high)
+
+
+def as_filter(value):
+    if value is None:
+        return None
+    return set(value) if isinstance(value, (list, tuple, set, frozenset)) else {value}
+
+
+def check_trend_arguments(grain, split_by):
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+    split_by = (split_by,) if isinstance(split_by, str) else tuple(split_by)
+    for name in split_by:
+        if name not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {name}")
+    return split_by
+
+
+def trend_result(grain, first_index, series, split_by):
+    # series is {group: [visits per period from first_index on]}
+    length = len(next(iter(series.values()))) if series else 0
+    if grain == 'day':
+        starts = [date.fromordinal(first_index + offset) for offset in range(length)]
+    else:
+        starts = [date.fromordinal(period_bounds(grain, first_index + offset)[0]) for offset in range(length)]
+    if not split_by:
+        return list(zip(starts, series.get((), [0] * length)))
+    return {group if len(split_by) > 1 else group[0]: list(zip(starts, visits)) for group, visits in series.items() if any(visits)}
+
+
+class RollupTable:
+    # One grain: per (department, insurance) cell, visit counts for consecutive periods in an int array
+    def __init__(self):
+        self.first = None  # index of the period at position 0
+        self.length = 0
+        self.cells = {}
+        self.totals = zeros(0)
+
+    def position(self, index):
+        if self.first is None:
+            self.first = index
+        if index < self.first:
+            padding = zeros(self.first - index)
+            for column in list(self.cells.values()) + [self.totals]:
+                column[0:0] = padding
+            self.length += self.first - index
+            self.first = index
+        elif index >= self.first + self.length:
+            padding = zeros(index - self.first - self.length + 1)
+            for column in list(self.cells.values()) + [self.totals]:
+                column.extend(padding)
+            self.length += len(padding)
+        return index - self.first
+
+    def add(self, index, cell, visits):
+        position = self.position(index)
+        column = self.cells.get(cell)
+        if column is None:
+            column = self.cells[cell] = zeros(self.length)
+        column[position] += visits
+        self.totals[position] += visits
+
+    def merged(self, coarser_index):
+        table = RollupTable()
+        if self.first is None:
+            return table
+        # Consecutive periods fall into consecutive coarser ones, so each coarser period is one slice
+        starts = []
+        for position in range(self.length):
+            index = coarser_index(self.first + position)
+            if not starts or starts[-1][0] != index:
+                starts.append((index, position))
+        slices = [(start, stop) for (_, start), (_, stop) in zip(starts, starts[1:] + [(None, self.length)])]
+        table.first = starts[0][0]
+        table.length = len(slices)
+        table.cells = {cell: array('i', [sum(column[start:stop]) for start, stop in slices]) for cell, column in self.cells.items()}
+        table.totals = array('i', [sum(self.totals[start:stop]) for start, stop in slices])
+        return table
+
+
+class VisitRollups:
+    # Visit counts per period x department x insurance at each grain. Days are counted from
+    # visits, weeks and months are merged from days and years from months; after that every
+    # change is applied to all grains at once.
+    def __init__(self):
+        self.tables = {grain: RollupTable() for grain in GRAINS}
+
+    def add_day(self, ordinal, department, insurance, visits=1):
+        # Bulk loads fill in the days only and call derive() once at the end
+        self.tables['day'].add(ordinal, (department, insurance), visits)
+
+    def add_days(self, ordinals, departments, insurances):
+        # Bulk form of add_day over parallel lists: one resize, then one update per distinct cell and day
+        if not ordinals:
+            return
+        table = self.tables['day']
+        table.position(min(ordinals))
+        table.position(max(ordinals))
+        first, cells, totals = table.first, table.cells, table.totals
+        for (department, insurance, ordinal), visits in Counter(zip(departments, insurances, ordinals)).items():
+            column = cells.get((department, insurance))
+            if column is None:
+                column = cells[(department, insurance)] = zeros(table.length)
+            column[ordinal - first] += visits
+        for ordinal, visits in Counter(ordinals).items():
+            totals[ordinal - first] += visits
+
+    def derive(self):
+        days = self.tables['day']
+        self.tables['week'] = days.merged(lambda ordinal: coarser_indexes(ordinal)[0])
+        self.tables['month'] = days.merged(lambda ordinal: coarser_indexes(ordinal)[1])
+        self.tables['year'] = self.tables['month'].merged(lambda month: month // 12)
+
+    def add(self, ordinal, department, insurance, visits):
+        cell = (department, insurance)
+        week, month, year = coarser_indexes(ordinal)
+        self.tables['day'].add(ordinal, cell, visits)
+        self.tables['week'].add(week, cell, visits)
+        self.tables['month'].add(month, cell, visits)
+        self.tables['year'].add(year, cell, visits)
+
+    def add_visit(self, visit, insurance):
+        self.add(visit.visit_time.toordinal(), visit.department, insurance, 1)
+
+    def remove_visit(self, visit, insurance):
+        self.add(visit.visit_time.toordinal(), visit.department, insurance, -1)
+
+    def load_days(self, first, columns):
+        # columns is {(department, insurance): visits per day from day ordinal first on}, all the same length
+        days = self.tables['day'] = RollupTable()
+        if columns:
+            days.first = first
+            days.length = len(next(iter(columns.values())))
+            days.cells = columns
+            days.totals = array('i', map(sum, zip(*columns.values())))
+        self.derive()
+
+    def day_range(self):
+        # First and last day with any visits, or None
+        days = self.tables['day']
+        totals = days.totals
+        low, high = 0, len(totals) - 1
+        while low <= high and not totals[low]:
+            low += 1
+        while high >= low and not totals[high]:
+            high -= 1
+        return (days.first + low, days.first + high) if low <= high else None
+
+    def trend(self, grain='month', start_date=None, end_date=None, department=None, insurance=None, split_by=()):
+        # [(period start, visits)], or {group: [(period start, visits)]} when split_by names
+        # department and/or insurance. Periods cut by start_date or end_date are summed from days.
+        split_by = check_trend_arguments(grain, split_by)
+        held = self.day_range()
+        if held is None and (start_date is None or end_date is None):
+            return {} if split_by else []
+        first = start_date.toordinal() if start_date is not None else held[0]
+        last = end_date.toordinal() if end_date is not None else held[1]
+        if first > last:
+            return {} if split_by else []
+        departments = as_filter(department)
+        insurances = as_filter(insurance)
+        table = self.tables[grain]
+        days = self.tables['day']
+
+        first_index = period_index(grain, first)
+        last_index = period_index(grain, last)
+        # Periods first_index..last_index, of which only the two at the ends can be cut short
+        whole_first = first_index if period_bounds(grain, first_index)[0] >= first else first_index + 1
+        whole_last = last_index if period_bounds(grain, last_index)[1] <= last else last_index - 1
+        edges = sorted({first_index, last_index} - set(range(whole_first, whole_last + 1)))
+
+        def fill(visits, column, day_column):
+            if whole_first <= whole_last and table.first is not None:
+                offset = whole_first - first_index
+                visits[offset:offset + whole_last - whole_first + 1] = map(
+                    add, visits[offset:offset + whole_last - whole_first + 1], window(column, table.first, whole_first, whole_last))
+            for index in edges:
+                low, high = period_bounds(grain, index)
+                if days.first is not None:
+                    visits[index - first_index] += sum(window(day_column, days.first, max(low, first), min(high, last)))
+
+        length = last_index - first_index + 1
+        series = {} if split_by else {(): [0] * length}
+        if departments is None and insurances is None and not split_by:
+            fill(series[()], table.totals, days.totals)
+        else:
+            for cell, day_column in days.cells.items():
+                if departments is not None and cell[0] not in departments or insurances is not None and cell[1] not in insurances:
+                    continue
+                group = tuple(cell[ROLLUP_DIMENSIONS.index(name)] for name in split_by)
+                visits = series.get(group)
+                if visits is None:
+                    visits = series[group] = [0] * length
+                fill(visits, table.cells.get(cell, ()), day_column)
+        return trend_result(grain, first_index, series, split_by)